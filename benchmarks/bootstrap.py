@@ -0,0 +1,61 @@
+import argparse
+import time
+
+import numpy as np
+
+from scipy.stats import bootstrap
+
+from airbnb_model.evaluation import PoissonBootstrap, bootstrap_metrics
+
+
+def _scipy_bootstrap(maes: np.ndarray, n_resamples: int, method: str) -> dict[str, tuple[float, float, float]]:
+    """What train() did before airbnb_model.evaluation: one scipy.stats.bootstrap call per metric"""
+    results = {}
+    for metric, losses in (("mae", maes), ("mse", maes**2)):
+        res = bootstrap((losses,), np.mean, n_resamples=n_resamples, method=method)
+        results[metric] = (np.mean(losses), res.confidence_interval.low, res.confidence_interval.high)
+
+    return results
+
+
+def _poisson_bootstrap(maes: np.ndarray, n_resamples: int, method: str) -> dict[str, tuple[float, float, float]]:
+    poisson = PoissonBootstrap(["mae", "mse"], n_resamples=n_resamples)
+    for chunk in np.array_split(maes, max(1, len(maes) // 10_000)):
+        poisson.update({"mae": chunk, "mse": chunk**2})
+
+    return poisson.confidence_intervals(method=method)
+
+
+def _setup_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Bootstrap CI benchmark")
+
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--n_resamples", type=int, default=1000)
+    parser.add_argument("--method", type=str, default="bca", choices=["percentile", "basic", "bca"])
+
+    return parser
+
+
+if __name__ == "__main__":
+    args = _setup_parser().parse_args()
+    rng = np.random.default_rng(42)
+
+    for n_samples in args.sizes:
+        # heavy-tailed absolute errors, like price residuals
+        maes = np.abs(rng.standard_t(3, n_samples)) * 20
+        print(f"{n_samples} test samples, {args.n_resamples} resamples, {args.method}:")
+        for name, func in (
+            ("scipy.stats.bootstrap", _scipy_bootstrap),
+            ("bootstrap_metrics", lambda m, r, c: bootstrap_metrics({"mae": m, "mse": m**2}, r, method=c)),
+            ("PoissonBootstrap", _poisson_bootstrap),
+        ):
+            start = time.perf_counter()
+            try:
+                results = func(maes, args.n_resamples, args.method)
+            except MemoryError:
+                # scipy's BCa jackknife materializes an n x (n - 1) index matrix
+                print(f"  {name:>22}: out of memory")
+                continue
+            elapsed = time.perf_counter() - start
+            intervals = ", ".join(f"{k} ({low:.3f}, {high:.3f})" for k, (_, low, high) in results.items())
+            print(f"  {name:>22}: {elapsed:8.3f} s  {intervals}")
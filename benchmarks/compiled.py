@@ -0,0 +1,50 @@
+import argparse
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from airbnb_model.compiled import compile_model_pipeline
+
+
+def _latencies_ms(predict_fn, record: dict, repeats: int) -> np.ndarray:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict_fn(record)
+        latencies.append(time.perf_counter() - start)
+
+    return np.array(latencies) * 1000
+
+
+def _setup_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Single-row latency of the compiled pipeline vs. Pipeline.predict")
+
+    parser.add_argument("--model_path", type=str, default="models/model.joblib")
+    parser.add_argument("--data_path", type=str, default="data/raw.parquet")
+    parser.add_argument("--repeats", type=int, default=1000)
+
+    return parser
+
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore", message="This Pipeline instance is not fitted yet", category=FutureWarning)
+    args = _setup_parser().parse_args()
+
+    model_pipeline = joblib.load(args.model_path)
+    compiled = compile_model_pipeline(model_pipeline)
+    data = pd.read_parquet(args.data_path).drop(columns="price")
+
+    expected = model_pipeline.predict(data)
+    actual = compiled.predict_columns(data)
+    print(f"max |Pipeline.predict - compiled| over {len(data)} rows: {np.abs(expected - actual).max():.2e}")
+
+    record = data.iloc[0].to_dict()
+    pipeline_ms = _latencies_ms(lambda r: model_pipeline.predict(pd.DataFrame([r])), record, args.repeats // 10)
+    compiled_ms = _latencies_ms(compiled.predict_one, record, args.repeats)
+
+    for name, latencies in (("Pipeline.predict", pipeline_ms), ("compiled", compiled_ms)):
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{name:>18}: p50 {p50:.3f} ms, p99 {p99:.3f} ms")
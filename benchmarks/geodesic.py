@@ -0,0 +1,90 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from geopy.distance import great_circle
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from airbnb_model.data.feature_pipeline import CreateLongitudeLatitudeFeatures
+
+
+class LegacyLongitudeLatitudeFeatures(BaseEstimator, TransformerMixin):
+    """Row-by-row implementation that CreateLongitudeLatitudeFeatures used before the vectorized engine"""
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X, y=None):
+        X.loc[:, "longitude_to_center"] = X.apply(lambda x: x["longitude"] - x["center_longitude"], axis=1)
+        X.loc[:, "latitude_to_center"] = X.apply(lambda x: x["latitude"] - x["center_latitude"], axis=1)
+
+        X.loc[:, "distance_to_center"] = X.apply(
+            lambda x: great_circle((x["latitude"], x["longitude"]), (x["center_latitude"], x["center_longitude"])).km,
+            axis=1,
+        )
+
+        return X
+
+
+def _make_coordinates(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame(
+        {
+            "longitude": 2.320041 + rng.normal(0, 0.05, n_rows),
+            "latitude": 48.85889 + rng.normal(0, 0.03, n_rows),
+            "center_longitude": np.full(n_rows, 2.320041),
+            "center_latitude": np.full(n_rows, 48.85889),
+        }
+    )
+
+
+def _time_transform(transformer: TransformerMixin, data: pd.DataFrame, repeats: int) -> tuple[float, pd.DataFrame]:
+    best, out = float("inf"), None
+    for _ in range(repeats):
+        X = data.copy()
+        start = time.perf_counter()
+        out = transformer.transform(X)
+        best = min(best, time.perf_counter() - start)
+
+    return best, out
+
+
+def _setup_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Geodesic feature benchmark")
+
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 10_000_000])
+    parser.add_argument("--legacy_max_rows", type=int, default=100_000, help="larger sizes are extrapolated")
+    parser.add_argument("--repeats", type=int, default=3)
+
+    return parser
+
+
+if __name__ == "__main__":
+    args = _setup_parser().parse_args()
+
+    print(f"{'rows':>12} {'legacy [s]':>12} {'haversine [s]':>14} {'ellipsoidal [s]':>16} {'speedup':>10}")
+    legacy_per_row = None
+    for n_rows in args.sizes:
+        data = _make_coordinates(n_rows)
+        haversine_time, haversine_out = _time_transform(
+            CreateLongitudeLatitudeFeatures("haversine"), data, args.repeats
+        )
+        ellipsoidal_time, _ = _time_transform(CreateLongitudeLatitudeFeatures("ellipsoidal"), data, args.repeats)
+
+        if n_rows <= args.legacy_max_rows:
+            legacy_time, legacy_out = _time_transform(LegacyLongitudeLatitudeFeatures(), data, 1)
+            legacy_per_row = legacy_time / n_rows
+            max_err = np.abs(legacy_out["distance_to_center"] - haversine_out["distance_to_center"]).max()
+            legacy_col = f"{legacy_time:12.4f}"
+            print(f"  max |haversine - geopy.great_circle| at {n_rows} rows: {max_err:.2e} km")
+        else:
+            legacy_time = legacy_per_row * n_rows if legacy_per_row else float("nan")
+            legacy_col = f"~{legacy_time:11.1f}"
+
+        print(
+            f"{n_rows:>12} {legacy_col:>12} {haversine_time:14.4f} {ellipsoidal_time:16.4f} "
+            f"{legacy_time / haversine_time:9.0f}x"
+        )
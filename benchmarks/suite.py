@@ -0,0 +1,281 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+import joblib
+import mlflow
+import numpy as np
+import sklearn
+import xgboost
+import yaml
+
+from sklearn.base import clone
+
+from airbnb_model.compiled import compile_model_pipeline
+from airbnb_model.data.feature_pipeline import create_data_pipeline, data_pipeline_options
+from airbnb_model.data.synthetic import CITY_CENTERS, api_records, make_listings
+from airbnb_model.model import create_model_pipeline
+
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SECTIONS = ("pipeline", "predict", "api")
+LOWER_IS_BETTER = ("_ms", "_s")
+HIGHER_IS_BETTER = ("_per_s",)
+
+
+def _percentiles_ms(latencies: list[float]) -> dict[str, float]:
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+def _timed(func: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    func()
+
+    return time.perf_counter() - start
+
+
+def _best_of(func: Callable[[], Any], repeats: int) -> float:
+    return min(_timed(func) for _ in range(repeats))
+
+
+def _load_configs() -> tuple[dict[str, Any], dict[str, Any]]:
+    with open(os.path.join(ROOT, "config", "train.yaml"), "r") as f:
+        train_config = yaml.load(f, Loader=yaml.FullLoader)
+    with open(os.path.join(ROOT, "config", "features.yaml"), "r") as f:
+        features_config = yaml.load(f, Loader=yaml.FullLoader)
+
+    return train_config, features_config
+
+
+def _benchmark_pipeline(data, model_config, features_config, repeats: int) -> dict[str, Any]:
+    """Fit and transform time (best of `repeats`) of every stage of the data pipeline, each on its own input"""
+    X, y = data.drop(columns="price"), data["price"]
+    data_pipeline = create_data_pipeline(
+        features_config, model_config["feature_slots"], **data_pipeline_options(model_config)
+    )
+
+    results = {"total": {"fit_s": _best_of(lambda: data_pipeline.fit(X, y), repeats)}}
+    results["total"]["transform_s"] = _best_of(lambda: data_pipeline.transform(X), repeats)
+
+    stage_input = X
+    for step_name, column_transformer in data_pipeline.steps:
+        for name, transformer, columns in column_transformer.transformers:
+            if transformer == "drop" or len(columns) == 0:
+                continue
+            stage = clone(transformer)
+            results[f"{step_name}.{name}"] = {
+                "fit_s": _best_of(lambda: stage.fit(stage_input[columns].copy(), y), repeats),
+                "transform_s": _best_of(lambda: stage.transform(stage_input[columns].copy()), repeats),
+            }
+        stage_input = column_transformer.transform(stage_input)
+
+    return results
+
+
+def _benchmark_predict(data, model_pipeline, batch_sizes: list[int], max_rows: int) -> dict[str, Any]:
+    """Latency of Pipeline.predict and of the compiled pipeline on batches of every size"""
+    X = data.drop(columns="price")
+    compiled = compile_model_pipeline(model_pipeline)
+    predictors = {"pipeline": model_pipeline.predict, "compiled": compiled.predict_columns}
+
+    results = {}
+    for name, predict in predictors.items():
+        for batch_size in batch_sizes:
+            batch = X.iloc[np.arange(batch_size) % len(X)]
+            # about max_rows rows per measurement, but at least 3 and at most 200 repeats
+            repeats = int(np.clip(max_rows // batch_size, 3, 200))
+            predict(batch)  # warm-up
+            latencies = [_timed(lambda: predict(batch)) for _ in range(repeats)]
+            results[f"{name}.batch_{batch_size}"] = {
+                **_percentiles_ms(latencies),
+                "rows_per_s": batch_size / float(np.median(latencies)),
+            }
+
+    return results
+
+
+async def _run_requests(app_module, records: list[dict], concurrency: int) -> tuple[list[float], float]:
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with app_module.lifespan(app_module.app):
+        transport = httpx.ASGITransport(app=app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+
+            async def _request(record: dict) -> None:
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/predict", json=record)
+                    latencies.append(time.perf_counter() - start)
+                    response.raise_for_status()
+
+            await _request(records[0])  # warm-up
+            latencies.clear()
+            start = time.perf_counter()
+            await asyncio.gather(*[_request(record) for record in records])
+            elapsed = time.perf_counter() - start
+
+    return latencies, elapsed
+
+
+def _benchmark_api(data, model_path: str, n_requests: int, concurrency: int, work_dir: str) -> dict[str, Any]:
+    """`POST /predict` through the whole FastAPI app with an in-process ASGI client"""
+    cities_path = os.path.join(work_dir, "cities.json")
+    with open(cities_path, "w") as f:
+        json.dump(CITY_CENTERS, f)
+    os.environ.update({"MODEL_URI": model_path, "MODEL_RELOAD_INTERVAL": "0", "CITY_CENTERS_PATH": cities_path})
+
+    sys.path.insert(0, os.path.join(ROOT, "src"))
+    import app as app_module
+
+    records = api_records(data.iloc[np.arange(n_requests) % len(data)])
+    latencies, elapsed = asyncio.run(_run_requests(app_module, records, concurrency))
+
+    return {
+        f"predict.concurrency_{concurrency}": {**_percentiles_ms(latencies), "requests_per_s": n_requests / elapsed}
+    }
+
+
+def _metadata(args: argparse.Namespace) -> dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "xgboost": xgboost.__version__,
+        "cpu_count": os.cpu_count(),
+        "args": vars(args),
+    }
+
+
+def _flatten(results: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}/"))
+        elif isinstance(value, (int, float)):
+            flat[f"{prefix}{key}"] = value
+
+    return flat
+
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """Metrics that got more than `threshold` times worse than in the baseline"""
+    current, previous = _flatten(results["results"]), _flatten(baseline["results"])
+
+    regressions = []
+    for key in sorted(current.keys() & previous.keys()):
+        new, old = current[key], previous[key]
+        if key.endswith(HIGHER_IS_BETTER):
+            ratio = old / new if new > 0 else float("inf")
+        elif key.endswith(LOWER_IS_BETTER):
+            ratio = new / old if old > 0 else 1.0
+        else:
+            continue
+        if ratio > threshold:
+            regressions.append(f"{key}: {old:.4g} -> {new:.4g} ({ratio:.2f}x worse)")
+
+    return regressions
+
+
+def _setup_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Pipeline, model and API benchmarks on synthetic listings")
+
+    parser.add_argument("--sections", type=str, nargs="+", default=list(SECTIONS), choices=SECTIONS)
+    parser.add_argument("--models", type=str, nargs="+", default=["xgboost", "ridge", "mlp"])
+    parser.add_argument("--n_rows", type=int, default=100_000, help="synthetic training listings")
+    parser.add_argument("--batch_sizes", type=int, nargs="+", default=[1, 32, 1_000, 100_000])
+    parser.add_argument("--max_rows", type=int, default=300_000, help="rows predicted per batch size measurement")
+    parser.add_argument("--n_requests", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--mlp_max_iter", type=int, default=20, help="MLP epochs, inference cost doesn't depend on it")
+    parser.add_argument("--repeats", type=int, default=3, help="data pipeline timings are the best of N runs")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default=None, help="JSON results, benchmarks/results/<commit>.json")
+    parser.add_argument("--baseline", type=str, default=None, help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+
+    return parser
+
+
+def main(args: argparse.Namespace) -> Optional[list[str]]:
+    warnings.filterwarnings("ignore", message="This Pipeline instance is not fitted yet", category=FutureWarning)
+    train_config, features_config = _load_configs()
+    data = make_listings(args.n_rows, seed=args.seed)
+    X, y = data.drop(columns="price"), data["price"]
+
+    output = {"metadata": _metadata(args), "results": {}}
+    with tempfile.TemporaryDirectory() as work_dir:
+        # the MLP logs its training curve, keep that out of the project's runs; MLflow releases newer than the
+        # pinned one refuse a file store unless it is allowed explicitly
+        os.environ.setdefault("MLFLOW_ALLOW_FILE_STORE", "true")
+        mlflow.set_tracking_uri(f"file://{os.path.join(work_dir, 'mlruns')}")
+        for model in args.models:
+            model_config = dict(train_config[model])
+            if model_config["type"] == "mlp":
+                model_config["max_iter"] = args.mlp_max_iter
+            results = output["results"].setdefault(model, {})
+
+            if "pipeline" in args.sections:
+                results["pipeline"] = _benchmark_pipeline(data, model_config, features_config, args.repeats)
+                print(f"{model} pipeline: {json.dumps(results['pipeline']['total'])}")
+
+            if "predict" in args.sections or ("api" in args.sections and model == args.models[0]):
+                model_pipeline = create_model_pipeline(model_config, features_config, model_config["feature_slots"])
+                results["fit_s"] = _timed(lambda: model_pipeline.fit(X, y))
+                model_path = os.path.join(work_dir, f"{model}.joblib")
+                joblib.dump(model_pipeline, model_path)
+
+            if "predict" in args.sections:
+                results["predict"] = _benchmark_predict(data, model_pipeline, args.batch_sizes, args.max_rows)
+                for key, value in results["predict"].items():
+                    print(f"{model} {key}: p50 {value['p50_ms']:.3f} ms, {value['rows_per_s']:,.0f} rows/s")
+
+            # the API serves a single model, the first one
+            if "api" in args.sections and model == args.models[0]:
+                results["api"] = _benchmark_api(data, model_path, args.n_requests, args.concurrency, work_dir)
+                for key, value in results["api"].items():
+                    print(f"{model} api {key}: p99 {value['p99_ms']:.3f} ms, {value['requests_per_s']:,.0f} req/s")
+
+    output_path = args.output or os.path.join(ROOT, "benchmarks", "results", f"{output['metadata']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(output, f, indent=2)
+    print(f"Results saved to {output_path}")
+
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            regressions = compare(output, json.load(f), args.threshold)
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        for regression in regressions:
+            print(f"  {regression}")
+        return regressions
+
+    return None
+
+
+if __name__ == "__main__":
+    regressions = main(_setup_parser().parse_args())
+    sys.exit(1 if regressions else 0)
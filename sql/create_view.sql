@@ -22,7 +22,8 @@ CREATE OR REPLACE VIEW public.vw_airbnb
     bt.bed_type_name,
     cp.cancel_policy_name,
     l.features,
-    l.amenities
+    l.amenities,
+    l.listing_id
    FROM listing l
      LEFT JOIN neighbourhood n ON l.neighbourhood_id = n.neighbourhood_id
      LEFT JOIN city ci ON l.city_id = ci.city_id
@@ -0,0 +1,81 @@
+import asyncio
+
+from typing import Any, Callable, Optional, Sequence
+
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """Collects concurrent single-item requests and runs them as one batched call in a worker thread.
+
+    A batch is flushed as soon as it holds `max_batch_size` items or `max_wait_ms` milliseconds have passed
+    since its first item arrived, whichever comes first. `stop` answers every request submitted before it.
+    """
+
+    def __init__(
+        self, predict_fn: Callable[[list[Any]], Sequence[Any]], max_batch_size: int = 64, max_wait_ms: float = 2.0
+    ) -> None:
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is not None:
+            # new submits are refused from here on, the worker flushes everything queued before the marker
+            worker, self._worker = self._worker, None
+            await self._queue.put((_STOP, None))
+            await worker
+
+    async def submit(self, item: Any) -> Any:
+        if self._worker is None:
+            raise RuntimeError("MicroBatcher is not running, call start() first")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+
+        return await future
+
+    async def _collect(self) -> list[tuple[Any, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait_ms / 1000
+
+        while len(batch) < self.max_batch_size and batch[-1][0] is not _STOP:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = await self._collect()
+            if batch[-1][0] is _STOP:
+                stopping, batch = True, batch[:-1]
+                if not batch:
+                    break
+            items = [item for item, _ in batch]
+
+            try:
+                results = await asyncio.to_thread(self.predict_fn, items)
+            except Exception as exc:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
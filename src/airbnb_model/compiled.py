@@ -0,0 +1,257 @@
+from typing import Any, Mapping, Sequence
+
+import numpy as np
+
+from numpy.typing import ArrayLike
+
+from airbnb_model.data.geodesic import geodesic_distance
+from airbnb_model.data.neighbourhood import NEIGHBOURHOOD_FEATURES
+
+
+class CompiledPipeline:
+    """Flat, NumPy-only inference plan equivalent to a fitted `create_model_pipeline` Pipeline.
+
+    Built with `compile_model_pipeline`. Scaler statistics and one-hot category-to-column maps are precomputed, so
+    a record maps straight to the model's feature vector without pandas or sklearn in the request path.
+    """
+
+    def __init__(
+        self,
+        blocks: list[tuple],
+        n_features: int,
+        sparse_output: bool,
+        distance_method: str,
+        model_kind: str,
+        model_params: dict[str, Any],
+        neighbourhood=None,
+    ) -> None:
+        self.blocks = blocks
+        self.n_features = n_features
+        self.sparse_output = sparse_output
+        self.distance_method = distance_method
+        self.model_kind = model_kind
+        self.model_params = model_params
+        self.neighbourhood = neighbourhood  # fitted NeighbourhoodFeatures (or its NeighbourhoodIndex), if used
+
+    def _column(self, columns: Mapping[str, ArrayLike], derived: dict[str, np.ndarray], name: str) -> np.ndarray:
+        if name in derived:
+            return derived[name]
+
+        return np.asarray(columns[name], dtype=np.float64)
+
+    def _derive(self, columns: Mapping[str, ArrayLike]) -> dict[str, np.ndarray]:
+        longitude = np.asarray(columns["longitude"], dtype=np.float64)
+        latitude = np.asarray(columns["latitude"], dtype=np.float64)
+        center_longitude = np.asarray(columns["center_longitude"], dtype=np.float64)
+        center_latitude = np.asarray(columns["center_latitude"], dtype=np.float64)
+
+        derived = {
+            "longitude_to_center": longitude - center_longitude,
+            "latitude_to_center": latitude - center_latitude,
+            "distance_to_center": geodesic_distance(
+                latitude, longitude, center_latitude, center_longitude, method=self.distance_method
+            ),
+        }
+        if self.neighbourhood is not None:
+            derived.update(self.neighbourhood.features(longitude, latitude))
+
+        return derived
+
+    def transform_columns(self, columns: Mapping[str, ArrayLike]) -> np.ndarray:
+        """Maps column arrays (a dict of arrays or a DataFrame) to the dense model feature matrix"""
+        return self._preprocess(columns, self._derive(columns))
+
+    def _preprocess(self, columns: Mapping[str, ArrayLike], derived: dict[str, np.ndarray]) -> np.ndarray:
+        n_rows = len(columns["longitude"])
+        X = np.zeros((n_rows, self.n_features), dtype=np.float64)
+
+        for kind, names, *params in self.blocks:
+            if kind == "scale":
+                offset, mean, scale = params
+                for i, name in enumerate(names):
+                    X[:, offset + i] = self._column(columns, derived, name)
+                X[:, offset : offset + len(names)] -= mean
+                X[:, offset : offset + len(names)] /= scale
+            elif kind == "onehot":
+                (category_maps,) = params
+                rows = np.arange(n_rows)
+                for name, category_map in zip(names, category_maps):
+                    # unknown and dropped categories map to -1 and leave the row all zeros
+                    cols = np.fromiter((category_map.get(value, -1) for value in columns[name]), np.int64, n_rows)
+                    known = cols >= 0
+                    X[rows[known], cols[known]] = 1.0
+            elif kind == "ordinal":
+                offset, category_maps = params
+                for i, (name, category_map) in enumerate(zip(names, category_maps)):
+                    # unknown categories are missing values, like in the fitted OrdinalEncoder
+                    X[:, offset + i] = np.fromiter(
+                        (category_map.get(value, np.nan) for value in columns[name]), np.float64, n_rows
+                    )
+            elif kind == "passthrough":
+                (offset,) = params
+                for i, name in enumerate(names):
+                    X[:, offset + i] = self._column(columns, derived, name)
+
+        return X
+
+    def transform(self, records: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        columns = {name: [record[name] for record in records] for name in records[0]}
+
+        return self.transform_columns(columns)
+
+    def _predict_matrix(self, X: np.ndarray) -> np.ndarray:
+        params = self.model_params
+        if self.model_kind == "xgboost":
+            if self.sparse_output:
+                # the fitted pipeline feeds XGBoost a CSR matrix, where non-stored zeros count as missing
+                X[X == 0] = np.nan
+            return params["booster"].inplace_predict(
+                X, iteration_range=params["iteration_range"], missing=np.nan, validate_features=False
+            )
+
+        if self.sparse_output:
+            # match the summation order of sklearn's sparse dot products exactly
+            from scipy import sparse
+
+            X = sparse.csr_matrix(X)
+
+        if self.model_kind == "linear":
+            return X @ params["coef"] + params["intercept"]
+        elif self.model_kind == "mlp":
+            activation = _ACTIVATIONS[params["activation"]]
+            for i, (coef, intercept) in enumerate(zip(params["coefs"], params["intercepts"])):
+                X = X @ coef + intercept
+                if i < len(params["coefs"]) - 1:
+                    X = activation(X)
+            return X.ravel()
+        else:
+            return params["estimator"].predict(X)
+
+    def predict_columns(self, columns: Mapping[str, ArrayLike]) -> np.ndarray:
+        return self._predict_matrix(self.transform_columns(columns))
+
+    def predict(self, records: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        return self._predict_matrix(self.transform(records))
+
+    def predict_one(self, record: Mapping[str, Any]) -> float:
+        return float(self.predict([record])[0])
+
+    def example_record(self) -> dict[str, Any]:
+        """Synthetic but valid input record (training means, first known categories), e.g. to warm up a model"""
+        record = {"longitude": 0.0, "latitude": 0.0, "center_longitude": 0.0, "center_latitude": 0.0}
+        for kind, names, *params in self.blocks:
+            if kind == "scale":
+                record.update({name: float(mean) for name, mean in zip(names, params[1])})
+            elif kind in ("onehot", "ordinal"):
+                category_maps = params[0] if kind == "onehot" else params[1]
+                record.update({name: next(iter(category_map), "") for name, category_map in zip(names, category_maps)})
+            else:
+                record.update({name: 0.0 for name in names})
+
+        # derived features are computed from the coordinates above
+        for name in ("longitude_to_center", "latitude_to_center", "distance_to_center", *NEIGHBOURHOOD_FEATURES):
+            record.pop(name, None)
+
+        return record
+
+
+_ACTIVATIONS = {
+    "identity": lambda X: X,
+    "relu": lambda X: np.maximum(X, 0),
+    "tanh": np.tanh,
+    "logistic": lambda X: 1 / (1 + np.exp(-X)),
+}
+
+
+def _compile_preprocessing(preprocessing) -> tuple[list[tuple], int]:
+    from sklearn.preprocessing import OneHotEncoder, OrdinalEncoder, StandardScaler
+
+    from airbnb_model.data.feature_pipeline import FeatureSelector
+
+    blocks, offset = [], 0
+    for name, transformer, columns in preprocessing.transformers_:
+        if transformer == "drop" or len(columns) == 0:
+            continue
+        elif isinstance(transformer, StandardScaler):
+            n = len(columns)
+            mean = transformer.mean_ if transformer.mean_ is not None else np.zeros(n)
+            scale = transformer.scale_ if transformer.scale_ is not None else np.ones(n)
+            blocks.append(("scale", list(columns), offset, mean, scale))
+            offset += n
+        elif isinstance(transformer, OneHotEncoder):
+            if transformer._infrequent_enabled:
+                raise NotImplementedError("Infrequent categories are not supported by the compiled pipeline")
+            category_maps = []
+            for i, categories in enumerate(transformer.categories_):
+                drop = transformer.drop_idx_[i] if transformer.drop_idx_ is not None else None
+                kept = [category for j, category in enumerate(categories) if j != drop]
+                category_maps.append({category: offset + j for j, category in enumerate(kept)})
+                offset += len(kept)
+            blocks.append(("onehot", list(columns), category_maps))
+        elif isinstance(transformer, OrdinalEncoder):
+            unknown_value = transformer.unknown_value
+            if transformer._infrequent_enabled or (unknown_value is not None and not np.isnan(unknown_value)):
+                raise NotImplementedError(
+                    "Only OrdinalEncoder(unknown_value=np.nan) is supported by the compiled pipeline"
+                )
+            category_maps = [
+                {category: float(code) for code, category in enumerate(categories)}
+                for categories in transformer.categories_
+            ]
+            blocks.append(("ordinal", list(columns), offset, category_maps))
+            offset += len(columns)
+        elif isinstance(transformer, FeatureSelector):
+            # keep FeatureSelector's own (set intersection) column order
+            selected = list(transformer.feature_names.intersection(columns))
+            blocks.append(("passthrough", selected, offset))
+            offset += len(selected)
+        else:
+            raise NotImplementedError(f"Cannot compile preprocessing step '{name}' ({type(transformer).__name__})")
+
+    return blocks, offset
+
+
+def _compile_model(model) -> tuple[str, dict[str, Any]]:
+    from sklearn.linear_model._base import LinearModel
+    from sklearn.neural_network import MLPRegressor
+    from xgboost import XGBRegressor
+
+    from airbnb_model.mlp import StreamingMLPRegressor
+
+    if isinstance(model, XGBRegressor):
+        try:
+            iteration_range = (0, model.best_iteration + 1)
+        except AttributeError:
+            iteration_range = (0, 0)
+        return "xgboost", {"booster": model.get_booster(), "iteration_range": iteration_range}
+    elif isinstance(model, LinearModel) and np.ndim(model.coef_) == 1:
+        return "linear", {"coef": model.coef_, "intercept": model.intercept_}
+    elif isinstance(model, (MLPRegressor, StreamingMLPRegressor)) and model.out_activation_ == "identity":
+        return "mlp", {"coefs": model.coefs_, "intercepts": model.intercepts_, "activation": model.activation}
+    else:
+        return "estimator", {"estimator": model}
+
+
+def compile_model_pipeline(model_pipeline) -> CompiledPipeline:
+    """Turns a fitted `create_model_pipeline` Pipeline into a `CompiledPipeline`"""
+    from airbnb_model.data.feature_pipeline import CreateLongitudeLatitudeFeatures
+
+    data_pipeline = model_pipeline.named_steps["data_pipeline"]
+    feature_engineering = data_pipeline.named_steps["feature_engineering"]
+    preprocessing = data_pipeline.named_steps["preprocessing"]
+
+    long_lat_creator = feature_engineering.named_transformers_["feature_engineering"].steps[0][1]
+    assert isinstance(long_lat_creator, CreateLongitudeLatitudeFeatures), "Unexpected feature engineering step"
+
+    blocks, n_features = _compile_preprocessing(preprocessing)
+    model_kind, model_params = _compile_model(model_pipeline.named_steps["model"])
+
+    return CompiledPipeline(
+        blocks=blocks,
+        n_features=n_features,
+        sparse_output=preprocessing.sparse_output_,
+        distance_method=long_lat_creator.distance_method,
+        model_kind=model_kind,
+        model_params=model_params,
+        neighbourhood=feature_engineering.named_transformers_.get("neighbourhood"),
+    )
@@ -0,0 +1,100 @@
+import logging
+import threading
+
+from typing import Optional
+
+import numpy as np
+
+from numpy.typing import ArrayLike
+
+from airbnb_model.data.geodesic import haversine_distance
+
+
+logger = logging.getLogger(__name__)
+
+CITY_QUERY = "SELECT city_name, center_longitude, center_latitude FROM city ORDER BY city_id"
+
+
+class _Snapshot:
+    """Immutable view of the city table: a name index and the center coordinates as arrays"""
+
+    def __init__(self, rows: list[tuple[str, float, float]]) -> None:
+        self.names = [name for name, _, _ in rows]
+        self.centers = {name: (float(longitude), float(latitude)) for name, longitude, latitude in rows}
+
+        self.longitudes = np.array([longitude for _, longitude, _ in rows], dtype=np.float64)
+        self.latitudes = np.array([latitude for _, _, latitude in rows], dtype=np.float64)
+
+
+class CityStore:
+    """City centers from the `city` table, refreshed periodically through a connection pool.
+
+    Lookups are served from an in-memory snapshot that is replaced as a whole on refresh, so they never touch the
+    database and never see a half-loaded table.
+    """
+
+    def __init__(self, pool=None, refresh_interval: float = 300.0) -> None:
+        self.pool = pool
+        self.refresh_interval = refresh_interval
+
+        self._snapshot = _Snapshot([])
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __contains__(self, city: str) -> bool:
+        return city in self._snapshot.centers
+
+    def __len__(self) -> int:
+        return len(self._snapshot.names)
+
+    @property
+    def cities(self) -> list[str]:
+        return list(self._snapshot.names)
+
+    def center(self, city: str) -> tuple[float, float]:
+        """(longitude, latitude) of the city center, raises KeyError for unknown cities"""
+        return self._snapshot.centers[city]
+
+    def nearest(self, longitude: ArrayLike, latitude: ArrayLike) -> tuple[list[str], np.ndarray]:
+        """Names of the closest city centers to the given coordinates and the distances to them in km"""
+        snapshot = self._snapshot
+        if not snapshot.names:
+            raise LookupError("The city store is empty")
+
+        # a handful of cities -> a (points, cities) distance matrix beats building a spatial index
+        distances = haversine_distance(
+            np.atleast_1d(latitude)[:, None], np.atleast_1d(longitude)[:, None], snapshot.latitudes, snapshot.longitudes
+        )
+        indices = distances.argmin(axis=1)
+
+        return [snapshot.names[i] for i in indices], distances[np.arange(len(indices)), indices]
+
+    def load(self, rows: list[tuple[str, float, float]]) -> None:
+        """Replaces all cities with `(city_name, center_longitude, center_latitude)` rows"""
+        self._snapshot = _Snapshot(rows)
+        logger.info("Loaded %d cities", len(rows))
+
+    def refresh(self) -> None:
+        with self.pool.connection() as conn:
+            rows = conn.execute(CITY_QUERY).fetchall()
+
+        self.load(rows)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Refreshing cities failed, keeping %d cities", len(self))
+
+    def start(self) -> None:
+        if self.pool is not None and self.refresh_interval > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="city-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,36 @@
+import os
+
+import psycopg
+
+from psycopg.types.numeric import FloatLoader
+
+
+def _connection_kwargs() -> dict[str, str]:
+    return {
+        "dbname": os.environ["DB_NAME"],
+        "user": os.environ["DB_USER"],
+        "password": os.environ["DB_PASSWORD"],
+        "host": os.environ["DB_URI"],
+        "port": os.environ["DB_PORT"],
+    }
+
+
+def _configure(conn: psycopg.Connection) -> None:
+    # numeric columns (coordinates, city centers) as floats instead of per-value Decimal objects
+    conn.adapters.register_loader("numeric", FloatLoader)
+
+
+def connect(**kwargs) -> psycopg.Connection:
+    conn = psycopg.connect(**_connection_kwargs(), **kwargs)
+    _configure(conn)
+
+    return conn
+
+
+def connection_pool(min_size: int = 1, max_size: int = 2, **kwargs):
+    """Pool of connections for long-running services, connections are opened in the background"""
+    from psycopg_pool import ConnectionPool
+
+    return ConnectionPool(
+        kwargs=_connection_kwargs(), min_size=min_size, max_size=max_size, configure=_configure, open=True, **kwargs
+    )
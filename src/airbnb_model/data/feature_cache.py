@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import shutil
+
+from typing import Any, Optional, Union
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from scipy import sparse
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from airbnb_model.data.feature_pipeline import create_data_pipeline, data_pipeline_options, parse_target_from_config
+from airbnb_model.profiling import StepProfiler, profile
+
+
+# bump when the data pipeline code changes the features it produces, cached entries of other formats are ignored
+FEATURE_CACHE_FORMAT = 1
+
+Matrix = Union[np.ndarray, sparse.csr_matrix]
+FeatureSet = tuple[Pipeline, Matrix, Matrix, np.ndarray, np.ndarray]
+
+_memory_cache: dict[str, FeatureSet] = {}
+
+
+def feature_cache_key(
+    dataset_version: str,
+    train_config: dict[str, Any],
+    model_config: dict[str, Any],
+    features_config: dict[str, Any],
+    validation_fraction: Optional[float] = None,
+) -> str:
+    payload = {
+        "format": FEATURE_CACHE_FORMAT,
+        # fitted transformers are pickled with the cache and their output may change between sklearn releases
+        "sklearn_version": sklearn.__version__,
+        "dataset_version": dataset_version,
+        "seed": train_config["seed"],
+        "test_size": train_config["test_size"],
+        "features_config": features_config,
+        "feature_slots": sorted(model_config["feature_slots"]),
+        "data_pipeline_options": data_pipeline_options(model_config),
+    }
+    if validation_fraction is not None:
+        payload["validation_fraction"] = validation_fraction
+
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _save_matrix(path: str, X: Matrix) -> None:
+    if sparse.issparse(X):
+        sparse.save_npz(f"{path}.npz", sparse.csr_matrix(X), compressed=False)
+    else:
+        np.save(f"{path}.npy", np.ascontiguousarray(X))
+
+
+def _load_matrix(path: str) -> Matrix:
+    if os.path.exists(f"{path}.npz"):
+        return sparse.load_npz(f"{path}.npz").tocsr()
+
+    return np.load(f"{path}.npy", mmap_mode="r")
+
+
+def _save(cache_path: str, feature_set: FeatureSet) -> None:
+    data_pipeline, X_train, X_test, y_train, y_test = feature_set
+
+    tmp_path = f"{cache_path}.tmp{os.getpid()}"
+    os.makedirs(tmp_path, exist_ok=True)
+    joblib.dump(data_pipeline, os.path.join(tmp_path, "data_pipeline.joblib"))
+    _save_matrix(os.path.join(tmp_path, "X_train"), X_train)
+    _save_matrix(os.path.join(tmp_path, "X_test"), X_test)
+    np.save(os.path.join(tmp_path, "y_train.npy"), y_train)
+    np.save(os.path.join(tmp_path, "y_test.npy"), y_test)
+
+    try:
+        os.rename(tmp_path, cache_path)
+    except OSError:
+        # another process stored the same features first
+        shutil.rmtree(tmp_path)
+
+
+def _load(cache_path: str) -> FeatureSet:
+    return (
+        joblib.load(os.path.join(cache_path, "data_pipeline.joblib")),
+        _load_matrix(os.path.join(cache_path, "X_train")),
+        _load_matrix(os.path.join(cache_path, "X_test")),
+        np.load(os.path.join(cache_path, "y_train.npy"), mmap_mode="r"),
+        np.load(os.path.join(cache_path, "y_test.npy"), mmap_mode="r"),
+    )
+
+
+def _compute(
+    train_config: dict[str, Any],
+    model_config: dict[str, Any],
+    features_config: dict[str, Any],
+    profiler: Optional[StepProfiler] = None,
+    validation_fraction: Optional[float] = None,
+) -> FeatureSet:
+    data = pd.read_parquet(train_config["data_path"])
+
+    target_col = parse_target_from_config(features_config)
+    df = data.drop(target_col, axis=1)
+    target = data[target_col]
+    X_train, X_test, y_train, y_test = train_test_split(
+        df, target, test_size=train_config["test_size"], random_state=train_config["seed"]
+    )
+    if validation_fraction is not None:
+        # the test split is left out, the training split is divided into fit and validation rows
+        X_train, X_test, y_train, y_test = train_test_split(
+            X_train, y_train, test_size=validation_fraction, random_state=train_config["seed"]
+        )
+
+    data_pipeline = create_data_pipeline(
+        features_config, model_config["feature_slots"], **data_pipeline_options(model_config)
+    )
+    with profile(data_pipeline, profiler, "pipeline/data_pipeline"):
+        Xt_train = data_pipeline.fit_transform(X_train, y_train)
+        Xt_test = data_pipeline.transform(X_test)
+
+    return data_pipeline, Xt_train, Xt_test, y_train.to_numpy(), y_test.to_numpy()
+
+
+def load_features(
+    dataset_version: str,
+    train_config: dict[str, Any],
+    model_config: dict[str, Any],
+    features_config: dict[str, Any],
+    cache_dir: Optional[str] = None,
+    profiler: Optional[StepProfiler] = None,
+    validation_fraction: Optional[float] = None,
+) -> FeatureSet:
+    """Fitted data pipeline and transformed train / test split, shared by all models with the same feature setup.
+
+    With `validation_fraction`, the train split is split again and the fit / validation parts are returned in place
+    of train / test, with the data pipeline (and its neighbourhood prices) fitted on the fit part only.
+
+    Results are memoized in memory and, if `cache_dir` is given, on disk (memory-mapped on load) so that other
+    processes can reuse them. A `profiler` only sees the data pipeline if the features weren't cached yet.
+    """
+    key = feature_cache_key(dataset_version, train_config, model_config, features_config, validation_fraction)
+    if key in _memory_cache:
+        return _memory_cache[key]
+
+    cache_path = os.path.join(cache_dir, key) if cache_dir is not None else None
+    if cache_path is not None and os.path.isdir(cache_path):
+        feature_set = _load(cache_path)
+    else:
+        feature_set = _compute(train_config, model_config, features_config, profiler, validation_fraction)
+        if cache_path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            _save(cache_path, feature_set)
+
+    _memory_cache[key] = feature_set
+
+    return feature_set
@@ -1,11 +1,21 @@
 from typing import Any
 
-from geopy.distance import great_circle
+import numpy as np
+import pandas as pd
+
 from sklearn.base import BaseEstimator, TransformerMixin
 from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder
+from sklearn.neighbors import KDTree
 from sklearn.pipeline import Pipeline
 
+from airbnb_model.data.geodesic import geodesic_distance
+from airbnb_model.data.neighbourhood import NEIGHBOURHOOD_FEATURES, neighbourhood_features, unit_vectors
+
+
+# onehot: one-hot columns, CSR output if sparse enough; sparse: one-hot, always CSR; native: category codes
+CATEGORICAL_ENCODINGS = ("onehot", "sparse", "native")
+
 
 class FeatureSelector(BaseEstimator, TransformerMixin):
     def __init__(self, feature_names: list[str]) -> None:
@@ -23,16 +33,21 @@ class FeatureSelector(BaseEstimator, TransformerMixin):
 
 
 class CreateLongitudeLatitudeFeatures(BaseEstimator, TransformerMixin):
+    def __init__(self, distance_method: str = "haversine") -> None:
+        self.distance_method = distance_method
+
     def fit(self, X, y=None):
         return self
 
     def transform(self, X, y=None):
-        X.loc[:, "longitude_to_center"] = X.apply(lambda x: x["longitude"] - x["center_longitude"], axis=1)
-        X.loc[:, "latitude_to_center"] = X.apply(lambda x: x["latitude"] - x["center_latitude"], axis=1)
-
-        X.loc[:, "distance_to_center"] = X.apply(
-            lambda x: great_circle((x["latitude"], x["longitude"]), (x["center_latitude"], x["center_longitude"])).km,
-            axis=1,
+        longitude, latitude = X["longitude"].to_numpy(dtype=float), X["latitude"].to_numpy(dtype=float)
+        center_longitude = X["center_longitude"].to_numpy(dtype=float)
+        center_latitude = X["center_latitude"].to_numpy(dtype=float)
+
+        X.loc[:, "longitude_to_center"] = longitude - center_longitude
+        X.loc[:, "latitude_to_center"] = latitude - center_latitude
+        X.loc[:, "distance_to_center"] = geodesic_distance(
+            latitude, longitude, center_latitude, center_longitude, method=self.distance_method
         )
 
         return X
@@ -41,6 +56,48 @@ class CreateLongitudeLatitudeFeatures(BaseEstimator, TransformerMixin):
         return self
 
 
+class NeighbourhoodFeatures(BaseEstimator, TransformerMixin):
+    """Median price and density (listings per km²) of the `n_neighbors` nearest training listings.
+
+    The training coordinates are indexed at fit time in a KDTree over 3D unit vectors, whose chord distance orders
+    neighbours exactly like the great-circle distance but queries several times faster than a haversine BallTree.
+    In `fit_transform` every training listing is left out of its own neighbourhood, otherwise its median price
+    would leak the target.
+    """
+
+    def __init__(self, n_neighbors: int = 10, chunk_size: int = 100_000) -> None:
+        self.n_neighbors = n_neighbors
+        self.chunk_size = chunk_size
+
+    def fit(self, X, y=None):
+        assert y is not None, "NeighbourhoodFeatures needs the target (price) to fit"
+        assert len(X) > self.n_neighbors, "NeighbourhoodFeatures needs more listings than n_neighbors"
+
+        self.tree_ = KDTree(unit_vectors(X["longitude"], X["latitude"]))
+        self.prices_ = np.asarray(y, dtype=np.float32)
+        return self
+
+    def features(self, longitude, latitude, exclude_self: bool = False) -> dict[str, np.ndarray]:
+        return neighbourhood_features(
+            self.tree_, self.prices_, self.n_neighbors, longitude, latitude, exclude_self, self.chunk_size
+        )
+
+    def _to_frame(self, X, exclude_self: bool) -> pd.DataFrame:
+        return pd.DataFrame(self.features(X["longitude"], X["latitude"], exclude_self), index=X.index)
+
+    def transform(self, X, y=None):
+        return self._to_frame(X, exclude_self=False)
+
+    def fit_transform(self, X, y=None, **fit_params):
+        return self.fit(X, y)._to_frame(X, exclude_self=True)
+
+    def get_feature_names_out(self, input_features=None):
+        return np.array(NEIGHBOURHOOD_FEATURES, dtype=object)
+
+    def set_output(self, *, transform=None):
+        return self
+
+
 def _parse_features_config(features_config: dict[str, Any], feature_slots: list[str]) -> tuple[list[str], ...]:
     slots = set(feature_slots)
 
@@ -58,28 +115,75 @@ def parse_target_from_config(features_config: dict[str, Any]) -> str:
     return target_list[0]
 
 
-def create_data_pipeline(features_config: dict[str, Any], feature_slots: list[str]) -> Pipeline:
+def data_pipeline_options(model_config: dict[str, Any]) -> dict[str, Any]:
+    """Model config entries that change the data pipeline, passed to `create_data_pipeline` as keyword arguments"""
+    return {
+        "distance_method": model_config.get("distance_method", "haversine"),
+        "n_neighbors": model_config.get("n_neighbors", 10),
+        "categorical_encoding": model_config.get("categorical_encoding", "onehot"),
+    }
+
+
+def feature_types(features_config: dict[str, Any], feature_slots: list[str]) -> list[str]:
+    """XGBoost feature types ("q" numerical, "c" categorical) of the data pipeline output with native encoding"""
+    numerical_features, categorical_features, logical_features = _parse_features_config(features_config, feature_slots)
+
+    return ["q"] * len(numerical_features) + ["c"] * len(categorical_features) + ["q"] * len(logical_features)
+
+
+def _categorical_encoder(categorical_encoding: str) -> tuple[BaseEstimator, float]:
+    """Encoder of the categorical features and the matching ColumnTransformer `sparse_threshold`"""
+    if categorical_encoding == "native":
+        # codes as floats, unknown categories become missing values
+        encoder = OrdinalEncoder(handle_unknown="use_encoded_value", unknown_value=np.nan, encoded_missing_value=np.nan)
+        return encoder, 0.0
+    elif categorical_encoding == "onehot":
+        return OneHotEncoder(drop="first", handle_unknown="ignore"), 0.3
+    elif categorical_encoding == "sparse":
+        # the dense blocks are stacked into the CSR output instead of densifying the one-hot block
+        return OneHotEncoder(drop="first", handle_unknown="ignore"), 1.0
+    else:
+        raise ValueError(
+            f"Unknown categorical encoding '{categorical_encoding}', expected one of {CATEGORICAL_ENCODINGS}"
+        )
+
+
+def create_data_pipeline(
+    features_config: dict[str, Any],
+    feature_slots: list[str],
+    distance_method: str = "haversine",
+    n_neighbors: int = 10,
+    categorical_encoding: str = "onehot",
+) -> Pipeline:
     numerical_features, categorical_features, logical_features = _parse_features_config(features_config, feature_slots)
 
     long_lat_features = Pipeline(
         [
-            ("feaure_creator", CreateLongitudeLatitudeFeatures()),
+            ("feaure_creator", CreateLongitudeLatitudeFeatures(distance_method)),
             ("post_select", FeatureSelector(["longitude_to_center", "latitude_to_center", "distance_to_center"])),
         ]
     )
     cols = ["longitude", "latitude", "center_longitude", "center_latitude"]
+    feature_engineering_steps = [("feature_engineering", long_lat_features, cols)]
+    # the spatial index is only built when a model actually uses the neighbourhood features
+    if set(NEIGHBOURHOOD_FEATURES).intersection(feature_slots):
+        feature_engineering_steps.append(
+            ("neighbourhood", NeighbourhoodFeatures(n_neighbors), ["longitude", "latitude"])
+        )
     feature_engineering_pipeline = ColumnTransformer(
-        [("feature_engineering", long_lat_features, cols)], remainder="passthrough", verbose_feature_names_out=False
+        feature_engineering_steps, remainder="passthrough", verbose_feature_names_out=False
     )
     feature_engineering_pipeline.set_output(transform="pandas")
 
+    categorical_encoder, sparse_threshold = _categorical_encoder(categorical_encoding)
     preprocessing_pipeline = ColumnTransformer(
         [
             ("numerical", StandardScaler(), numerical_features),
-            ("categorical", OneHotEncoder(drop="first", handle_unknown="ignore"), categorical_features),
+            ("categorical", categorical_encoder, categorical_features),
             ("logical", FeatureSelector(logical_features), logical_features),
         ],
         remainder="drop",
+        sparse_threshold=sparse_threshold,
     )
     data_pipeline = Pipeline(
         [
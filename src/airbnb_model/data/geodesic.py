@@ -0,0 +1,104 @@
+import numpy as np
+
+from numpy.typing import ArrayLike
+
+
+# same constants as geopy, so results are directly comparable
+EARTH_RADIUS_KM = 6371.009
+WGS84_A_KM = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_B_KM = (1 - WGS84_F) * WGS84_A_KM
+
+METHODS = ("haversine", "ellipsoidal")
+
+
+def haversine_distance(lat1: ArrayLike, lon1: ArrayLike, lat2: ArrayLike, lon2: ArrayLike) -> np.ndarray:
+    """Great-circle distance in km on a sphere of radius `EARTH_RADIUS_KM`.
+
+    Matches `geopy.distance.great_circle(...).km` to within 1e-9 km (float64 rounding only). The central angle is
+    taken with `arctan2` like geopy does, the haversine `arcsin` loses ~0.2 m of precision near antipodal points.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(arr, dtype=np.float64)) for arr in (lat1, lon1, lat2, lon2))
+
+    sin_lat1, cos_lat1 = np.sin(lat1), np.cos(lat1)
+    sin_lat2, cos_lat2 = np.sin(lat2), np.cos(lat2)
+    sin_lon_diff, cos_lon_diff = np.sin(lon2 - lon1), np.cos(lon2 - lon1)
+
+    sin_sigma = np.hypot(cos_lat2 * sin_lon_diff, cos_lat1 * sin_lat2 - sin_lat1 * cos_lat2 * cos_lon_diff)
+    cos_sigma = sin_lat1 * sin_lat2 + cos_lat1 * cos_lat2 * cos_lon_diff
+    return EARTH_RADIUS_KM * np.arctan2(sin_sigma, cos_sigma)
+
+
+def ellipsoidal_distance(
+    lat1: ArrayLike, lon1: ArrayLike, lat2: ArrayLike, lon2: ArrayLike, max_iter: int = 200, tol: float = 1e-12
+) -> np.ndarray:
+    """Vincenty's inverse solution on the WGS-84 ellipsoid, in km.
+
+    Matches `geopy.distance.geodesic(...).km` to within 1e-6 km (1 mm), except for nearly antipodal points (within
+    ~0.7 degrees of each other's antipode): Vincenty's iteration does not converge there and the last iterate is
+    returned, which can be off by up to 100 km.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(arr, dtype=np.float64)) for arr in (lat1, lon1, lat2, lon2))
+    lat1, lon1, lat2, lon2 = np.broadcast_arrays(lat1, lon1, lat2, lon2)
+
+    u1 = np.arctan((1 - WGS84_F) * np.tan(lat1))
+    u2 = np.arctan((1 - WGS84_F) * np.tan(lat2))
+    sin_u1, cos_u1 = np.sin(u1), np.cos(u1)
+    sin_u2, cos_u2 = np.sin(u2), np.cos(u2)
+
+    lon_diff = lon2 - lon1
+    lambda_ = lon_diff.copy()
+    active = np.ones(lambda_.shape, dtype=bool)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(max_iter):
+            sin_lambda, cos_lambda = np.sin(lambda_), np.cos(lambda_)
+            sin_sigma = np.hypot(cos_u2 * sin_lambda, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lambda)
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lambda
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+
+            # coincident points have sin_sigma == 0, equatorial lines have cos_sq_alpha == 0
+            sin_alpha = np.where(sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lambda / sin_sigma)
+            cos_sq_alpha = 1 - sin_alpha**2
+            cos_2sigma_m = np.where(cos_sq_alpha == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos_sq_alpha)
+
+            c = WGS84_F / 16 * cos_sq_alpha * (4 + WGS84_F * (4 - 3 * cos_sq_alpha))
+            lambda_next = lon_diff + (1 - c) * WGS84_F * sin_alpha * (
+                sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m**2))
+            )
+
+            converged = np.abs(lambda_next - lambda_) <= tol
+            lambda_ = np.where(active, lambda_next, lambda_)
+            active &= ~converged
+            if not active.any():
+                break
+
+        u_sq = cos_sq_alpha * (WGS84_A_KM**2 - WGS84_B_KM**2) / WGS84_B_KM**2
+        big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+        big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+        delta_sigma = (
+            big_b
+            * sin_sigma
+            * (
+                cos_2sigma_m
+                + big_b
+                / 4
+                * (
+                    cos_sigma * (-1 + 2 * cos_2sigma_m**2)
+                    - big_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma**2) * (-3 + 4 * cos_2sigma_m**2)
+                )
+            )
+        )
+
+    return WGS84_B_KM * big_a * (sigma - delta_sigma)
+
+
+def geodesic_distance(
+    lat1: ArrayLike, lon1: ArrayLike, lat2: ArrayLike, lon2: ArrayLike, method: str = "haversine"
+) -> np.ndarray:
+    if method == "haversine":
+        return haversine_distance(lat1, lon1, lat2, lon2)
+    elif method == "ellipsoidal":
+        return ellipsoidal_distance(lat1, lon1, lat2, lon2)
+    else:
+        raise ValueError(f"Unknown geodesic method '{method}', expected one of {METHODS}")
@@ -0,0 +1,200 @@
+import io
+import time
+
+from typing import Any, Iterator
+
+import pandas as pd
+import psycopg
+
+from psycopg import sql
+
+
+CHUNK_SIZE = 50_000
+STAGING_TABLE = "listing_staging"
+
+# column of the Airbnb listings export -> column of the `raw` table
+SOURCE_COLUMNS = {
+    "ID": "id",
+    "Neighbourhood Cleansed": "neighbourhood",
+    "Property Type": "property_type",
+    "Room Type": "room_type",
+    "Accommodates": "accommodates",
+    "Bathrooms": "bathrooms",
+    "Bedrooms": "bedrooms",
+    "Beds": "beds",
+    "Bed Type": "bed_type",
+    "Price": "price",
+    "Minimum Nights": "minimum_nights",
+    "Cancellation Policy": "cancel_policy",
+    "Features": "features",
+    "Amenities": "amenities",
+    "Longitude": "longitude",
+    "Latitude": "latitude",
+}
+NUMERIC_COLUMNS = ["accommodates", "bathrooms", "bedrooms", "beds", "minimum_nights", "price"]
+
+# `raw` column -> (dimension table, id column, name column); upserted by name, referenced by id from `listing`
+DIMENSIONS = {
+    "neighbourhood": ("neighbourhood", "neighbourhood_id", "neighbourhood_name"),
+    "room_type": ("roomtype", "room_type_id", "room_type_name"),
+    "property_type": ("propertytype", "property_type_id", "property_type_name"),
+    "bed_type": ("bedtype", "bed_type_id", "bed_type_name"),
+    "cancel_policy": ("cancelpolicy", "cancel_policy_id", "cancel_policy_name"),
+}
+
+LISTING_COLUMNS = [
+    "city_id",
+    "room_type_id",
+    "neighbourhood_id",
+    "longitude",
+    "latitude",
+    "price",
+    "minimum_nights",
+    "listing_given_id",
+    "property_type_id",
+    "accommodates",
+    "bathrooms",
+    "bedrooms",
+    "beds",
+    "bed_type_id",
+    "cancel_policy_id",
+    "features",
+    "amenities",
+]
+
+
+def _read_chunks(csv_path: str, city: str, chunk_size: int, sep: str) -> Iterator[pd.DataFrame]:
+    for chunk in pd.read_csv(csv_path, sep=sep, usecols=list(SOURCE_COLUMNS), chunksize=chunk_size):
+        chunk = chunk.rename(columns=SOURCE_COLUMNS)
+        chunk["city"] = city
+        # same convention as the notebook load: -1 marks a missing number, make_dataset turns it back into NaN
+        chunk[NUMERIC_COLUMNS] = chunk[NUMERIC_COLUMNS].apply(pd.to_numeric, errors="coerce").fillna(-1).astype(int)
+
+        yield chunk
+
+
+def _create_staging_table(conn: psycopg.Connection) -> None:
+    # same column types as `listing` but no constraints; emptied by every commit
+    conn.execute(
+        sql.SQL(
+            "CREATE TEMP TABLE IF NOT EXISTS {} ON COMMIT DELETE ROWS AS SELECT {} FROM listing WITH NO DATA"
+        ).format(sql.Identifier(STAGING_TABLE), sql.SQL(", ").join(map(sql.Identifier, LISTING_COLUMNS)))
+    )
+
+
+def _load_city_ids(conn: psycopg.Connection) -> dict[str, int]:
+    return {name: city_id for city_id, name in conn.execute("SELECT city_id, city_name FROM city")}
+
+
+def _upsert_dimension(conn: psycopg.Connection, column: str, names: list[str], ids: dict[str, int]) -> None:
+    """Inserts the names missing from the `ids` cache in one statement and adds their ids to the cache"""
+    missing = [name for name in names if name not in ids]
+    if not missing:
+        return
+
+    table, id_column, name_column = DIMENSIONS[column]
+    conn.execute(
+        sql.SQL("INSERT INTO {table} ({name}) SELECT unnest(%s::text[]) ON CONFLICT ({name}) DO NOTHING").format(
+            table=sql.Identifier(table), name=sql.Identifier(name_column)
+        ),
+        (missing,),
+    )
+    rows = conn.execute(
+        sql.SQL("SELECT {id}, {name} FROM {table} WHERE {name} = ANY(%s)").format(
+            id=sql.Identifier(id_column), name=sql.Identifier(name_column), table=sql.Identifier(table)
+        ),
+        (missing,),
+    )
+    ids.update({name: id_ for id_, name in rows})
+
+
+def _merge_query() -> sql.Composed:
+    columns = sql.SQL(", ").join(map(sql.Identifier, LISTING_COLUMNS))
+    updated = [column for column in LISTING_COLUMNS if column != "listing_given_id"]
+
+    # unchanged listings are not rewritten; xmax = 0 only for rows this statement inserted
+    return sql.SQL(
+        "INSERT INTO listing ({columns}) SELECT {columns} FROM {staging} "
+        "ON CONFLICT (listing_given_id) DO UPDATE SET {assignments} "
+        "WHERE ({current}) IS DISTINCT FROM ({excluded}) "
+        "RETURNING (xmax = 0)"
+    ).format(
+        columns=columns,
+        staging=sql.Identifier(STAGING_TABLE),
+        assignments=sql.SQL(", ").join(
+            sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(column)) for column in updated
+        ),
+        current=sql.SQL(", ").join(sql.SQL("listing.{}").format(sql.Identifier(column)) for column in updated),
+        excluded=sql.SQL(", ").join(sql.SQL("EXCLUDED.{}").format(sql.Identifier(column)) for column in updated),
+    )
+
+
+def _merge_batch(
+    conn: psycopg.Connection, chunk: pd.DataFrame, city_ids: dict[str, int], dimension_ids: dict[str, dict[str, int]]
+) -> tuple[int, int]:
+    """COPYs one chunk into the staging table and merges it into `listing`, returns (inserted, updated) rows"""
+    with conn.transaction():
+        for column in DIMENSIONS:
+            _upsert_dimension(conn, column, chunk[column].unique().tolist(), dimension_ids[column])
+
+    listings = pd.DataFrame(
+        {
+            "city_id": chunk["city"].map(city_ids),
+            **{DIMENSIONS[column][1]: chunk[column].map(dimension_ids[column]) for column in DIMENSIONS},
+            "listing_given_id": chunk["id"].astype("int64"),
+            **{column: chunk[column] for column in LISTING_COLUMNS if column in chunk.columns},
+        }
+    )[LISTING_COLUMNS]
+
+    buffer = io.StringIO()
+    listings.to_csv(buffer, index=False, header=False)
+
+    # the dimension ids above are committed on their own, so a failed merge never leaves stale ids in the cache
+    with conn.transaction(), conn.cursor() as cur:
+        with cur.copy(sql.SQL("COPY {} FROM STDIN (FORMAT csv)").format(sql.Identifier(STAGING_TABLE))) as copy:
+            copy.write(buffer.getvalue())
+        inserted = [row[0] for row in cur.execute(_merge_query())]
+
+    return sum(inserted), len(inserted) - sum(inserted)
+
+
+def ingest(
+    conn: psycopg.Connection, csv_path: str, city: str, chunk_size: int = CHUNK_SIZE, sep: str = ";"
+) -> dict[str, Any]:
+    """Loads an Airbnb listings export into `listing` chunk by chunk, returns row counts and throughput.
+
+    Each chunk is bulk loaded with COPY into a staging table and merged into `listing` on `listing_given_id`:
+    new listings are inserted, changed ones updated, so the same file can be loaded again safely. Dimension ids are
+    cached in memory and only names not seen before are upserted. `city` must already be in the `city` table, since
+    its center can't be derived from the listings. Rows without an id, a location or one of the dimensions are
+    skipped, as `listing` requires them.
+    """
+    conn.autocommit = True
+    _create_staging_table(conn)
+    city_ids = _load_city_ids(conn)
+    if city not in city_ids:
+        raise ValueError(f"City '{city}' is not in the city table, add it with its center first")
+    dimension_ids = {column: {} for column in DIMENSIONS}
+
+    stats = {"rows": 0, "skipped": 0, "inserted": 0, "updated": 0}
+    start = time.perf_counter()
+    for chunk in _read_chunks(csv_path, city, chunk_size, sep):
+        valid = chunk.dropna(subset=["id", "longitude", "latitude", *DIMENSIONS])
+        # a listing may only be merged once per statement, the last occurrence in the chunk wins
+        valid = valid.drop_duplicates(subset="id", keep="last")
+        inserted, updated = _merge_batch(conn, valid, city_ids, dimension_ids)
+
+        stats["rows"] += len(chunk)
+        stats["skipped"] += len(chunk) - len(valid)
+        stats["inserted"] += inserted
+        stats["updated"] += updated
+        elapsed = time.perf_counter() - start
+        print(
+            f"{stats['rows']} rows, {stats['inserted']} inserted, {stats['updated']} updated, "
+            f"{stats['skipped']} skipped, {stats['rows'] / elapsed:,.0f} rows/s"
+        )
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+
+    return stats
@@ -1,51 +1,249 @@
+import hashlib
+import json
 import os
 
-from typing import Any
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
 
-import numpy as np
 import pandas as pd
 import psycopg
+import pyarrow as pa
+import pyarrow.parquet as pq
 
+from psycopg import sql
 
-def make_dataset(out_path: str, features_config: dict[str, Any]) -> None:
-    # for presentation purposes only, you should check data version, not just used cached one
-    if os.path.exists(out_path):
-        return
+from airbnb_model.data.db import connect
 
-    conn = psycopg.connect(
-        database=os.environ["DB_NAME"],
-        user=os.environ["DB_USER"],
-        password=os.environ["DB_PASSWORD"],
-        host=os.environ["DB_URI"],
-        port=os.environ["DB_PORT"],
+
+VIEW_NAME = "vw_airbnb"
+CHUNK_SIZE = 50_000
+MANIFEST_SUFFIX = ".manifest.json"
+# bump when the Parquet layout or the row filter changes: 2 = dictionary-encoded categorical columns,
+# 3 = rows with a missing value in any view column are dropped, not only in the feature columns
+SNAPSHOT_FORMAT = 3
+
+_INTEGER_TYPES = {"int2", "int4", "int8"}
+_FLOAT_TYPES = {"float4", "float8", "numeric", "money"}
+
+
+def _parse_money(values: pd.Series) -> pd.Series:
+    # money is returned as text such as "$1,234.00"
+    return pd.to_numeric(values.str.replace(r"[$,]", "", regex=True), errors="coerce")
+
+
+def _select_columns(conn: psycopg.Connection, features_config: dict[str, Any]) -> list[str]:
+    with conn.cursor() as cur:
+        cur.execute(sql.SQL("SELECT * FROM {} LIMIT 0").format(sql.Identifier(VIEW_NAME)))
+        available = {column.name for column in cur.description}
+
+    return [feat for feat in features_config.keys() if feat in available]
+
+
+def _column_types(conn: psycopg.Connection, description: list[psycopg.Column]) -> dict[str, str]:
+    types = {}
+    for column in description:
+        type_info = conn.adapters.types.get(column.type_code)
+        type_name = type_info.name if type_info is not None else ""
+        if type_name in _INTEGER_TYPES:
+            types[column.name] = "int64"
+        elif type_name in _FLOAT_TYPES:
+            types[column.name] = "float64"
+        else:
+            types[column.name] = "category"
+
+    return types
+
+
+def _clean_chunk(chunk: pd.DataFrame, columns: list[str], column_types: dict[str, str]) -> pd.DataFrame:
+    """Drops the rows with a missing value in any view column, then keeps `columns` with their `column_types`"""
+    for column, type_ in column_types.items():
+        if type_ == "float64" and chunk[column].dtype == object:
+            chunk[column] = _parse_money(chunk[column])
+
+    chunk = chunk.replace(-1, float("nan"))
+    chunk = chunk.dropna()  # oops -> you should handle missing data, this is for presentation purposes only
+
+    return chunk[columns].astype({column: column_types[column] for column in columns})
+
+
+def _stream_chunks(
+    conn: psycopg.Connection,
+    columns: list[str],
+    chunk_size: int,
+    min_listing_id: Optional[int] = None,
+    max_listing_id: Optional[int] = None,
+) -> Iterator[tuple[pd.DataFrame, dict[str, str]]]:
+    # all view columns are read, a row missing any of them is dropped even if it isn't a feature
+    query = sql.SQL("SELECT * FROM {} WHERE TRUE").format(sql.Identifier(VIEW_NAME))
+    params = ()
+    if min_listing_id is not None:
+        query += sql.SQL(" AND listing_id > %s")
+        params += (min_listing_id,)
+    if max_listing_id is not None:
+        query += sql.SQL(" AND listing_id <= %s")
+        params += (max_listing_id,)
+
+    # named cursor -> rows stay on the server and are fetched chunk by chunk
+    with conn.cursor(name="make_dataset") as cur:
+        cur.execute(query, params)
+        column_types = None
+        while rows := cur.fetchmany(chunk_size):
+            if column_types is None:
+                column_types = _column_types(conn, cur.description)
+            chunk = pd.DataFrame.from_records(rows, columns=[column.name for column in cur.description])
+            yield _clean_chunk(chunk, columns, column_types), column_types
+
+
+def _arrow_schema(columns: list[str], column_types: dict[str, str]) -> pa.Schema:
+    arrow_types = {"int64": pa.int64(), "float64": pa.float64(), "category": pa.dictionary(pa.int32(), pa.string())}
+
+    return pa.schema([(column, arrow_types[column_types[column]]) for column in columns])
+
+
+def _source_fingerprint(conn: psycopg.Connection, max_listing_id: Optional[int] = None) -> dict[str, Any]:
+    """Row count, max listing_id and an order-independent checksum of the view rows (up to `max_listing_id`)"""
+    query = sql.SQL(
+        "SELECT count(*), coalesce(max(listing_id), 0), coalesce(sum(hashtext(v::text)::bigint), 0)::text FROM {} v"
+    ).format(sql.Identifier(VIEW_NAME))
+    params = ()
+    if max_listing_id is not None:
+        query += sql.SQL(" WHERE listing_id <= %s")
+        params = (max_listing_id,)
+
+    num_rows, max_id, checksum = conn.execute(query, params).fetchone()
+
+    return {"num_rows": num_rows, "max_listing_id": max_id, "checksum": checksum}
+
+
+def _features_hash(features_config: dict[str, Any]) -> str:
+    payload = json.dumps({"features_config": features_config, "format": SNAPSHOT_FORMAT}, sort_keys=True)
+
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def _dataset_version(fingerprint: dict[str, Any], features_hash: str) -> str:
+    payload = json.dumps({"fingerprint": fingerprint, "features_hash": features_hash}, sort_keys=True)
+
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+def manifest_path(out_path: str) -> str:
+    return f"{out_path}{MANIFEST_SUFFIX}"
+
+
+def read_manifest(out_path: str) -> Optional[dict[str, Any]]:
+    if not (os.path.exists(out_path) and os.path.exists(manifest_path(out_path))):
+        return None
+
+    with open(manifest_path(out_path), "r") as f:
+        return json.load(f)
+
+
+def _write_manifest(out_path: str, manifest: dict[str, Any]) -> None:
+    with open(f"{manifest_path(out_path)}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(f"{manifest_path(out_path)}.tmp", manifest_path(out_path))
+
+
+def _extract(
+    conn: psycopg.Connection,
+    out_path: str,
+    columns: list[str],
+    chunk_size: int,
+    base_path: Optional[str] = None,
+    min_listing_id: Optional[int] = None,
+    max_listing_id: Optional[int] = None,
+) -> int:
+    """Streams the view rows in (`min_listing_id`, `max_listing_id`] into `out_path`, after the rows of `base_path`"""
+    tmp_path = f"{out_path}.tmp"
+    writer, num_rows = None, 0
+    try:
+        if base_path is not None:
+            base = pq.ParquetFile(base_path)
+            writer = pq.ParquetWriter(tmp_path, base.schema_arrow)
+            for i in range(base.num_row_groups):
+                row_group = base.read_row_group(i)
+                writer.write_table(row_group)
+                num_rows += row_group.num_rows
+
+        for chunk, column_types in _stream_chunks(conn, columns, chunk_size, min_listing_id, max_listing_id):
+            if writer is None:
+                writer = pq.ParquetWriter(tmp_path, _arrow_schema(columns, column_types))
+            writer.write_table(pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False))
+            num_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        raise ValueError(f"{VIEW_NAME} returned no rows")
+
+    os.replace(tmp_path, out_path)
+
+    return num_rows
+
+
+def make_dataset(out_path: str, features_config: dict[str, Any], chunk_size: int = CHUNK_SIZE) -> str:
+    """Extracts `vw_airbnb` to `out_path` unless the cached snapshot is still current, returns the dataset version.
+
+    The snapshot is described by a manifest next to the Parquet file. When only new listings were added since the
+    snapshot, just those are extracted and appended; any other change in the source triggers a full re-extract.
+    """
+    manifest = read_manifest(out_path)
+    features_hash = _features_hash(features_config)
+
+    with connect() as conn:
+        fingerprint = _source_fingerprint(conn)
+        version = _dataset_version(fingerprint, features_hash)
+        if manifest is not None and manifest["version"] == version:
+            return version
+
+        columns = _select_columns(conn, features_config)
+        # listings stored after the fingerprint belong to the next snapshot, its max_listing_id is the watermark
+        max_listing_id = fingerprint["max_listing_id"]
+        append = (
+            manifest is not None
+            and manifest["features_hash"] == features_hash
+            and fingerprint["max_listing_id"] > manifest["fingerprint"]["max_listing_id"]
+            and _source_fingerprint(conn, manifest["fingerprint"]["max_listing_id"]) == manifest["fingerprint"]
+        )
+        if append:
+            num_rows = _extract(
+                conn, out_path, columns, chunk_size, out_path, manifest["fingerprint"]["max_listing_id"], max_listing_id
+            )
+        else:
+            num_rows = _extract(conn, out_path, columns, chunk_size, max_listing_id=max_listing_id)
+
+    _write_manifest(
+        out_path,
+        {
+            "version": version,
+            "format": SNAPSHOT_FORMAT,
+            "features_hash": features_hash,
+            "fingerprint": fingerprint,
+            "num_rows": num_rows,
+            "incremental": append,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
     )
 
-    data = pd.read_sql("SELECT * FROM vw_airbnb", con=conn)
-    conn.close()
-
-    data["price"] = data["price"].apply(lambda x: float(x.replace("$", "").replace(",", "")))
-    data = data.replace(-1, np.nan)
-    data = data.dropna()  # oops -> you should handle missing data, this is for presentation purposes only
-
-    features_to_keep = [feat for feat in features_config.keys() if feat in set(data.columns)]
-    data = data[features_to_keep]
-
-    # data = data.rename(
-    #     columns={
-    #         "neighbourhood_name": "neighbourhood",
-    #         "property_type_name": "prop_type",
-    #         "room_type_name": "room_type",
-    #         "accommodates": "num_people",
-    #         "bed_type_name": "bed_type",
-    #         "minimum_nights": "min_nights",
-    #         "longitude": "lon",
-    #         "latitude": "lat",
-    #     }
-    # )
-    # data = data.drop(["city_id", "cancel_policy_name", "features", "listing_given_id", "amenities"], axis=1)
-
-    # this should be in DB, ups
-    # data["center_longitude"] = 2.320041
-    # data["center_latitude"] = 48.85889
-
-    data.to_parquet(out_path)
+    return version
+
+
+def new_listings(
+    features_config: dict[str, Any], after_listing_id: int, chunk_size: int = CHUNK_SIZE
+) -> tuple[pd.DataFrame, int]:
+    """Listings of `vw_airbnb` with a `listing_id` above `after_listing_id`, and the highest `listing_id` read.
+
+    Listings stored while the rows are read are left for the next call, so the returned id is a safe watermark.
+    """
+    with connect() as conn:
+        (max_listing_id,) = conn.execute(
+            sql.SQL("SELECT coalesce(max(listing_id), 0) FROM {}").format(sql.Identifier(VIEW_NAME))
+        ).fetchone()
+        columns = _select_columns(conn, features_config)
+        chunks = [chunk for chunk, _ in _stream_chunks(conn, columns, chunk_size, after_listing_id, max_listing_id)]
+
+    data = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+
+    return data, max(max_listing_id, after_listing_id)
@@ -0,0 +1,75 @@
+import numpy as np
+
+from numpy.typing import ArrayLike
+
+from airbnb_model.data.geodesic import EARTH_RADIUS_KM
+
+
+NEIGHBOURHOOD_FEATURES = ("knn_median_price", "knn_density")
+MIN_RADIUS_KM = 0.001  # listings at identical coordinates would otherwise have an infinite density
+
+
+def unit_vectors(longitude: ArrayLike, latitude: ArrayLike) -> np.ndarray:
+    longitude, latitude = np.radians(np.asarray(longitude, dtype=float)), np.radians(np.asarray(latitude, dtype=float))
+
+    return np.column_stack(
+        [np.cos(latitude) * np.cos(longitude), np.cos(latitude) * np.sin(longitude), np.sin(latitude)]
+    )
+
+
+def neighbourhood_features(
+    tree,
+    prices: np.ndarray,
+    n_neighbors: int,
+    longitude: ArrayLike,
+    latitude: ArrayLike,
+    exclude_self: bool = False,
+    chunk_size: int = 100_000,
+) -> dict[str, np.ndarray]:
+    """Median price and density of the nearest listings in `tree`, a KD-tree over the listings' `unit_vectors`.
+
+    Works with sklearn's KDTree and scipy's cKDTree. With `exclude_self`, the queried points are the indexed
+    listings themselves and each one is left out of its own neighbourhood.
+    """
+    points = unit_vectors(longitude, latitude)
+    k = n_neighbors
+    median_price, density = np.empty(len(points)), np.empty(len(points))
+
+    for start in range(0, len(points), chunk_size):
+        stop = min(start + chunk_size, len(points))
+        distances, indices = tree.query(points[start:stop], k=k + exclude_self)
+        # cKDTree drops the neighbour axis for k=1
+        distances, indices = distances.reshape(stop - start, -1), indices.reshape(stop - start, -1)
+        if exclude_self:
+            # drop the listing itself, or the farthest neighbour if a duplicate location came first
+            is_self = indices == np.arange(start, stop)[:, None]
+            drop = np.where(is_self.any(axis=1), is_self.argmax(axis=1), k)
+            keep = np.ones(indices.shape, dtype=bool)
+            keep[np.arange(stop - start), drop] = False
+            distances, indices = distances[keep].reshape(-1, k), indices[keep].reshape(-1, k)
+
+        median_price[start:stop] = np.median(prices[indices], axis=1)
+        # chord length between unit vectors -> great-circle distance
+        radius = np.maximum(2 * np.arcsin(distances[:, -1] / 2) * EARTH_RADIUS_KM, MIN_RADIUS_KM)
+        density[start:stop] = k / (np.pi * radius**2)
+
+    return {"knn_median_price": median_price, "knn_density": density}
+
+
+class NeighbourhoodIndex:
+    """The spatial index of a fitted `NeighbourhoodFeatures` without sklearn, for the exported inference runtime"""
+
+    def __init__(self, points: np.ndarray, prices: np.ndarray, n_neighbors: int, chunk_size: int = 100_000) -> None:
+        from scipy.spatial import cKDTree
+
+        self.points = points
+        self.prices = prices
+        self.n_neighbors = n_neighbors
+        self.chunk_size = chunk_size
+
+        self.tree = cKDTree(points)
+
+    def features(self, longitude: ArrayLike, latitude: ArrayLike) -> dict[str, np.ndarray]:
+        return neighbourhood_features(
+            self.tree, self.prices, self.n_neighbors, longitude, latitude, chunk_size=self.chunk_size
+        )
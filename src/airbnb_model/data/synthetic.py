@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+
+CITY_CENTERS = {"Paris": (2.320041, 48.85889)}
+
+PROPERTY_TYPES = ["Apartment", "Condominium", "House", "Loft", "Townhouse", "Boutique hotel"]
+ROOM_TYPES = ["Entire home/apt", "Private room", "Shared room"]
+BED_TYPES = ["Real Bed", "Pull-out Sofa", "Futon", "Couch", "Airbed"]
+
+
+def make_listings(n_rows: int, n_neighbourhoods: int = 80, seed: int = 42) -> pd.DataFrame:
+    """Listings with the columns and dtypes of a `make_dataset` snapshot of `vw_airbnb` (Paris only)"""
+    rng = np.random.default_rng(seed)
+    center_longitude, center_latitude = CITY_CENTERS["Paris"]
+
+    neighbourhoods = np.array([f"Neighbourhood {i}" for i in range(n_neighbourhoods)])
+    neighbourhood = rng.integers(0, n_neighbourhoods, n_rows)
+    # neighbourhoods are clustered around their own centers, so location carries price information
+    neighbourhood_longitude = center_longitude + rng.normal(0, 0.04, n_neighbourhoods)
+    neighbourhood_latitude = center_latitude + rng.normal(0, 0.025, n_neighbourhoods)
+    neighbourhood_premium = rng.normal(0, 25, n_neighbourhoods)
+
+    accommodates = rng.integers(1, 9, n_rows)
+    bedrooms = np.clip(accommodates // 2 + rng.integers(-1, 2, n_rows), 0, None)
+    room_type = rng.choice(len(ROOM_TYPES), n_rows, p=[0.8, 0.18, 0.02])
+    price = (
+        40
+        + 18 * accommodates
+        + 15 * bedrooms
+        - 35 * room_type
+        + neighbourhood_premium[neighbourhood]
+        + rng.gamma(2.0, 10.0, n_rows)
+    )
+
+    data = pd.DataFrame(
+        {
+            "neighbourhood_name": neighbourhoods[neighbourhood],
+            "property_type_name": rng.choice(PROPERTY_TYPES, n_rows, p=[0.75, 0.1, 0.05, 0.05, 0.03, 0.02]),
+            "room_type_name": np.array(ROOM_TYPES)[room_type],
+            "bed_type_name": rng.choice(BED_TYPES, n_rows, p=[0.9, 0.05, 0.02, 0.02, 0.01]),
+            "accommodates": accommodates,
+            "bathrooms": rng.integers(1, 3, n_rows),
+            "bedrooms": bedrooms,
+            "beds": np.maximum(1, accommodates // 2 + rng.integers(0, 2, n_rows)),
+            "minimum_nights": rng.integers(1, 8, n_rows),
+            "longitude": neighbourhood_longitude[neighbourhood] + rng.normal(0, 0.008, n_rows),
+            "latitude": neighbourhood_latitude[neighbourhood] + rng.normal(0, 0.005, n_rows),
+            "center_longitude": np.full(n_rows, center_longitude),
+            "center_latitude": np.full(n_rows, center_latitude),
+            "price": np.round(np.maximum(price, 10), 0),
+        }
+    )
+    categorical = ["neighbourhood_name", "property_type_name", "room_type_name", "bed_type_name"]
+
+    return data.astype({column: "category" for column in categorical})
+
+
+def api_records(data: pd.DataFrame) -> list[dict]:
+    """Request bodies for `POST /predict`"""
+    columns = [column for column in data.columns if column not in ("price", "center_longitude", "center_latitude")]
+    records = data[columns].astype({column: object for column in data[columns].select_dtypes("category")})
+
+    return [{"city": "Paris", **record} for record in records.to_dict("records")]
@@ -0,0 +1,125 @@
+from typing import Optional
+
+import numpy as np
+
+from numpy.typing import ArrayLike
+from scipy.special import ndtr, ndtri
+
+
+CI_METHODS = ("percentile", "basic", "bca")
+MAX_CHUNK_ELEMENTS = 2**22  # resample indices held in memory at once (32 MB of int64)
+
+
+def _acceleration(centered_moments: tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    """BCa acceleration of the mean from the 2nd and 3rd central power sums (closed form of the jackknife)"""
+    m2, m3 = centered_moments
+    with np.errstate(invalid="ignore", divide="ignore"):
+        acceleration = m3 / (6 * m2**1.5)
+
+    return np.nan_to_num(acceleration)
+
+
+def _interval(
+    theta_hat: np.ndarray,
+    theta_star: np.ndarray,
+    confidence_level: float,
+    method: str,
+    acceleration: Optional[np.ndarray] = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    alpha = (1 - confidence_level) / 2
+
+    if method == "percentile":
+        low, high = np.quantile(theta_star, [alpha, 1 - alpha], axis=0)
+    elif method == "basic":
+        q_low, q_high = np.quantile(theta_star, [alpha, 1 - alpha], axis=0)
+        low, high = 2 * theta_hat - q_high, 2 * theta_hat - q_low
+    elif method == "bca":
+        # same bias correction as scipy.stats.bootstrap: ties count as half
+        below = (theta_star < theta_hat).mean(axis=0) + (theta_star == theta_hat).mean(axis=0) / 2
+        z0 = ndtri(below)
+        z_alpha = ndtri(np.array([alpha, 1 - alpha]))[:, None]
+        levels = ndtr(z0 + (z0 + z_alpha) / (1 - acceleration * (z0 + z_alpha)))
+        levels = np.nan_to_num(levels, nan=0.5)
+        low = np.array([np.quantile(theta_star[:, j], levels[0, j]) for j in range(theta_star.shape[1])])
+        high = np.array([np.quantile(theta_star[:, j], levels[1, j]) for j in range(theta_star.shape[1])])
+    else:
+        raise ValueError(f"Unknown CI method '{method}', expected one of {CI_METHODS}")
+
+    return low, high
+
+
+def bootstrap_metrics(
+    losses: dict[str, ArrayLike],
+    n_resamples: int = 1000,
+    confidence_level: float = 0.95,
+    method: str = "bca",
+    chunk_size: Optional[int] = None,
+    random_state: Optional[int] = None,
+) -> dict[str, tuple[float, float, float]]:
+    """Bootstrap confidence intervals of several mean metrics (e.g. MAE, MSE) from their per-sample losses.
+
+    All metrics are computed from one shared matrix of resample indices, generated `chunk_size` resamples at a time
+    so memory stays bounded. Returns `{metric: (estimate, low, high)}`.
+    """
+    names = list(losses)
+    L = np.column_stack([np.asarray(losses[name], dtype=np.float64) for name in names])
+    n, m = L.shape
+    if chunk_size is None:
+        chunk_size = max(1, min(n_resamples, MAX_CHUNK_ELEMENTS // n))
+
+    rng = np.random.default_rng(random_state)
+    theta_star = np.empty((n_resamples, m))
+    for start in range(0, n_resamples, chunk_size):
+        stop = min(start + chunk_size, n_resamples)
+        idx = rng.integers(0, n, size=(stop - start, n))
+        for j in range(m):
+            theta_star[start:stop, j] = L[idx, j].mean(axis=1)
+
+    theta_hat = L.mean(axis=0)
+    centered = L - theta_hat
+    acceleration = _acceleration(((centered**2).sum(axis=0), (centered**3).sum(axis=0)))
+    low, high = _interval(theta_hat, theta_star, confidence_level, method, acceleration)
+
+    return {name: (float(theta_hat[j]), float(low[j]), float(high[j])) for j, name in enumerate(names)}
+
+
+class PoissonBootstrap:
+    """Streaming bootstrap of mean metrics for test sets that don't fit in memory.
+
+    Each `update` call weights the incoming samples with Poisson(1) counts per resample and only keeps running
+    weighted sums, so memory depends on `n_resamples` and the chunk size, not on the number of samples.
+    """
+
+    def __init__(self, metrics: list[str], n_resamples: int = 1000, random_state: Optional[int] = None) -> None:
+        self.metrics = metrics
+        self.n_resamples = n_resamples
+
+        self._rng = np.random.default_rng(random_state)
+        self._weighted_sums = np.zeros((n_resamples, len(metrics)))
+        self._weights = np.zeros(n_resamples)
+        self._n = 0
+        self._power_sums = np.zeros((3, len(metrics)))
+
+    def update(self, losses: dict[str, ArrayLike]) -> None:
+        L = np.column_stack([np.asarray(losses[name], dtype=np.float64) for name in self.metrics])
+
+        weights = self._rng.poisson(1.0, size=(self.n_resamples, L.shape[0])).astype(np.float64)
+        self._weighted_sums += weights @ L
+        self._weights += weights.sum(axis=1)
+
+        self._n += L.shape[0]
+        self._power_sums += np.stack([L.sum(axis=0), (L**2).sum(axis=0), (L**3).sum(axis=0)])
+
+    def confidence_intervals(
+        self, confidence_level: float = 0.95, method: str = "percentile"
+    ) -> dict[str, tuple[float, float, float]]:
+        s1, s2, s3 = self._power_sums / self._n
+        theta_hat = s1
+        theta_star = self._weighted_sums / self._weights[:, None]
+
+        # central power sums from raw moments
+        m2 = self._n * (s2 - s1**2)
+        m3 = self._n * (s3 - 3 * s1 * s2 + 2 * s1**3)
+        low, high = _interval(theta_hat, theta_star, confidence_level, method, _acceleration((m2, m3)))
+
+        return {name: (float(theta_hat[j]), float(low[j]), float(high[j])) for j, name in enumerate(self.metrics)}
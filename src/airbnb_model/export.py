@@ -0,0 +1,170 @@
+import json
+import os
+import shutil
+
+from typing import Any
+
+import numpy as np
+
+from airbnb_model.compiled import CompiledPipeline
+from airbnb_model.data.neighbourhood import NeighbourhoodIndex
+
+
+EXPORT_FORMAT = 1
+SPEC_NAME = "spec.json"
+ARRAYS_NAME = "arrays.npz"
+BOOSTER_NAME = "model.ubj"
+
+
+def is_exported(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, SPEC_NAME))
+
+
+def _json_value(value: Any) -> Any:
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _export_blocks(blocks: list[tuple], arrays: dict[str, np.ndarray]) -> list[dict[str, Any]]:
+    specs = []
+    for i, (kind, names, *params) in enumerate(blocks):
+        spec = {"kind": kind, "names": list(names)}
+        if kind == "scale":
+            offset, mean, scale = params
+            arrays[f"block{i}_mean"], arrays[f"block{i}_scale"] = np.asarray(mean), np.asarray(scale)
+            spec["offset"] = offset
+        elif kind == "onehot":
+            (category_maps,) = params
+            # [category, column] pairs, JSON object keys would turn every category into a string
+            spec["categories"] = [[[_json_value(c), int(j)] for c, j in m.items()] for m in category_maps]
+        elif kind == "ordinal":
+            offset, category_maps = params
+            spec["offset"] = offset
+            spec["categories"] = [[[_json_value(c), float(code)] for c, code in m.items()] for m in category_maps]
+        elif kind == "passthrough":
+            (spec["offset"],) = params
+        specs.append(spec)
+
+    return specs
+
+
+def _export_model(compiled: CompiledPipeline, arrays: dict[str, np.ndarray], path: str) -> dict[str, Any]:
+    params = compiled.model_params
+    if compiled.model_kind == "xgboost":
+        params["booster"].save_model(os.path.join(path, BOOSTER_NAME))
+        return {"iteration_range": list(params["iteration_range"])}
+    elif compiled.model_kind == "linear":
+        arrays["coef"], arrays["intercept"] = np.asarray(params["coef"]), np.asarray(params["intercept"])
+        return {}
+    elif compiled.model_kind == "mlp":
+        for i, (coef, intercept) in enumerate(zip(params["coefs"], params["intercepts"])):
+            arrays[f"layer{i}_coef"], arrays[f"layer{i}_intercept"] = coef, intercept
+        return {"activation": params["activation"], "n_layers": len(params["coefs"])}
+    else:
+        estimator = type(params["estimator"]).__name__
+        raise NotImplementedError(f"Models of type {estimator} can't be exported, only XGBoost, linear and MLP")
+
+
+def _export_neighbourhood(neighbourhood, arrays: dict[str, np.ndarray]) -> dict[str, Any]:
+    if isinstance(neighbourhood, NeighbourhoodIndex):
+        points, prices = neighbourhood.points, neighbourhood.prices
+    else:
+        # a fitted NeighbourhoodFeatures, the KDTree keeps its points in their original order
+        points, prices = np.asarray(neighbourhood.tree_.data), neighbourhood.prices_
+    arrays["neighbourhood_points"], arrays["neighbourhood_prices"] = points, prices
+
+    return {"n_neighbors": neighbourhood.n_neighbors, "chunk_size": neighbourhood.chunk_size}
+
+
+def export_model(compiled: CompiledPipeline, path: str) -> None:
+    """Writes a compiled pipeline to the directory `path`, which `load_exported` reads without sklearn or joblib.
+
+    The directory holds a JSON spec of the preprocessing and the model, the arrays as an uncompressed `.npz` and,
+    for XGBoost, the booster in its own UBJ format. An existing export at `path` is replaced.
+    """
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    os.makedirs(tmp_path)
+
+    arrays = {}
+    spec = {
+        "format": EXPORT_FORMAT,
+        "n_features": compiled.n_features,
+        "sparse_output": bool(compiled.sparse_output),
+        "distance_method": compiled.distance_method,
+        "blocks": _export_blocks(compiled.blocks, arrays),
+        "model_kind": compiled.model_kind,
+        "model": _export_model(compiled, arrays, tmp_path),
+        "neighbourhood": (
+            _export_neighbourhood(compiled.neighbourhood, arrays) if compiled.neighbourhood is not None else None
+        ),
+    }
+    np.savez(os.path.join(tmp_path, ARRAYS_NAME), **arrays)
+    # the spec is written last, its presence marks a complete export
+    with open(os.path.join(tmp_path, SPEC_NAME), "w") as f:
+        json.dump(spec, f, indent=2)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+
+
+def _load_blocks(specs: list[dict[str, Any]], arrays: dict[str, np.ndarray]) -> list[tuple]:
+    blocks = []
+    for i, spec in enumerate(specs):
+        kind, names = spec["kind"], spec["names"]
+        if kind == "scale":
+            blocks.append((kind, names, spec["offset"], arrays[f"block{i}_mean"], arrays[f"block{i}_scale"]))
+        elif kind == "onehot":
+            blocks.append((kind, names, [dict(pairs) for pairs in spec["categories"]]))
+        elif kind == "ordinal":
+            blocks.append((kind, names, spec["offset"], [dict(pairs) for pairs in spec["categories"]]))
+        elif kind == "passthrough":
+            blocks.append((kind, names, spec["offset"]))
+
+    return blocks
+
+
+def _load_model(spec: dict[str, Any], arrays: dict[str, np.ndarray], path: str) -> dict[str, Any]:
+    if spec["model_kind"] == "xgboost":
+        from xgboost import Booster
+
+        booster = Booster(model_file=os.path.join(path, BOOSTER_NAME))
+        return {"booster": booster, "iteration_range": tuple(spec["model"]["iteration_range"])}
+    elif spec["model_kind"] == "linear":
+        intercept = arrays["intercept"]
+        return {"coef": arrays["coef"], "intercept": intercept if intercept.ndim else float(intercept)}
+    elif spec["model_kind"] == "mlp":
+        n_layers = spec["model"]["n_layers"]
+        return {
+            "coefs": [arrays[f"layer{i}_coef"] for i in range(n_layers)],
+            "intercepts": [arrays[f"layer{i}_intercept"] for i in range(n_layers)],
+            "activation": spec["model"]["activation"],
+        }
+    else:
+        raise ValueError(f"Unknown exported model kind '{spec['model_kind']}'")
+
+
+def load_exported(path: str) -> CompiledPipeline:
+    """Reads a model written by `export_model`; needs NumPy, plus SciPy and XGBoost only if the model uses them"""
+    with open(os.path.join(path, SPEC_NAME), "r") as f:
+        spec = json.load(f)
+    if spec["format"] != EXPORT_FORMAT:
+        raise ValueError(f"{path} has export format {spec['format']}, this version reads format {EXPORT_FORMAT}")
+
+    with np.load(os.path.join(path, ARRAYS_NAME), allow_pickle=False) as npz:
+        arrays = dict(npz)
+
+    neighbourhood = None
+    if spec["neighbourhood"] is not None:
+        neighbourhood = NeighbourhoodIndex(
+            arrays["neighbourhood_points"], arrays["neighbourhood_prices"], **spec["neighbourhood"]
+        )
+
+    return CompiledPipeline(
+        blocks=_load_blocks(spec["blocks"], arrays),
+        n_features=spec["n_features"],
+        sparse_output=spec["sparse_output"],
+        distance_method=spec["distance_method"],
+        model_kind=spec["model_kind"],
+        model_params=_load_model(spec, arrays, path),
+        neighbourhood=neighbourhood,
+    )
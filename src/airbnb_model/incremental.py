@@ -0,0 +1,71 @@
+import json
+import os
+
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from sklearn.base import BaseEstimator
+from sklearn.pipeline import Pipeline
+
+from airbnb_model import tracking
+
+
+STATE_SUFFIX = ".state.json"
+DEFAULT_UPDATE_ROUNDS = 50
+DEFAULT_UPDATE_EPOCHS = 20
+UPDATABLE_MODELS = ("xgboost", "mlp")  # model types `update_model` can continue training
+
+
+def state_path(model_path: str) -> str:
+    return f"{model_path}{STATE_SUFFIX}"
+
+
+def read_state(model_path: str) -> Optional[dict[str, Any]]:
+    """Training state saved next to a model: the `listing_id` watermark of the data it has seen and its history"""
+    if not (os.path.exists(model_path) and os.path.exists(state_path(model_path))):
+        return None
+
+    with open(state_path(model_path), "r") as f:
+        return json.load(f)
+
+
+def write_state(model_path: str, state: dict[str, Any]) -> None:
+    with open(f"{state_path(model_path)}.tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(f"{state_path(model_path)}.tmp", state_path(model_path))
+
+
+def update_scaler(data_pipeline: Pipeline, X: pd.DataFrame) -> None:
+    """Folds `X` into the mean and variance of the fitted StandardScaler, without revisiting the old data"""
+    preprocessing = data_pipeline.named_steps["preprocessing"]
+    columns = next(columns for name, _, columns in preprocessing.transformers_ if name == "numerical")
+    if len(columns) == 0:
+        return
+
+    engineered = data_pipeline.named_steps["feature_engineering"].transform(X)
+    preprocessing.named_transformers_["numerical"].partial_fit(engineered[columns])
+
+
+def update_model(model: BaseEstimator, model_config: dict[str, Any], X, y) -> None:
+    """Continues training a fitted model on new data: more boosting rounds for XGBoost, more epochs for the MLP"""
+    if model_config["type"] == "xgboost":
+        rounds = model_config.get("update_rounds", DEFAULT_UPDATE_ROUNDS)
+        booster = model.get_booster()
+        model.set_params(n_estimators=rounds)
+        model.fit(X, y, xgb_model=booster)
+        model.set_params(n_estimators=model.get_booster().num_boosted_rounds())
+    elif model_config["type"] == "mlp":
+        # partial_fit keeps the Adam state of the saved model and runs one epoch per call, it can't early stop
+        early_stopping = model.early_stopping
+        model.set_params(early_stopping=False)
+        if model.best_loss_ is None:
+            # early stopping tracks validation scores instead, the training loss bookkeeping starts here
+            model.best_loss_ = np.inf
+        for epoch in range(model_config.get("update_epochs", DEFAULT_UPDATE_EPOCHS)):
+            model.partial_fit(X, y)
+            tracking.log_metric("update_training_loss", model.loss_, step=epoch)
+        model.set_params(early_stopping=early_stopping)
+    else:
+        raise NotImplementedError(f"{model_config['type']} models can't be updated incrementally, retrain them")
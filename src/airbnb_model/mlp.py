@@ -0,0 +1,360 @@
+import os
+
+from typing import Any, Callable, Iterator, Optional
+
+import numpy as np
+
+from scipy import sparse
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.metrics import r2_score
+from sklearn.model_selection import train_test_split
+from threadpoolctl import threadpool_limits
+
+from airbnb_model import tracking
+
+
+# a source of training data: called with a random generator once per epoch, yields (X, y) chunks
+Chunks = Callable[[np.random.Generator], Iterator[tuple[Any, np.ndarray]]]
+
+_ACTIVATIONS = {
+    "identity": lambda X: X,
+    "relu": lambda X: np.maximum(X, 0, out=X),
+    "tanh": lambda X: np.tanh(X, out=X),
+    "logistic": lambda X: np.divide(1, 1 + np.exp(-X, out=X), out=X),
+}
+
+# derivative of the activation, expressed through the activation's output A, applied to the backpropagated delta
+_DERIVATIVES = {
+    "identity": lambda A, delta: None,
+    "relu": lambda A, delta: np.multiply(delta, A > 0, out=delta),
+    "tanh": lambda A, delta: np.multiply(delta, 1 - A**2, out=delta),
+    "logistic": lambda A, delta: np.multiply(delta, A * (1 - A), out=delta),
+}
+
+
+def _rows(X, start: int, stop: int):
+    """Rows `start:stop` of a dense, memory-mapped or sparse matrix, in memory"""
+    if sparse.issparse(X):
+        return sparse.csr_matrix(X[start:stop], dtype=np.float64)
+
+    return np.asarray(X[start:stop], dtype=np.float64)
+
+
+def array_chunks(X, y, chunk_size: int, rows: Optional[np.ndarray] = None) -> Chunks:
+    """Training data from a matrix, read `chunk_size` contiguous rows at a time in random chunk order.
+
+    Memory-mapped matrices (e.g. from the feature cache) are thereby streamed from disk; only `rows`, if given,
+    are used for training.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    mask = None
+    if rows is not None:
+        mask = np.zeros(X.shape[0], dtype=bool)
+        mask[rows] = True
+
+    def chunks(rng: np.random.Generator) -> Iterator[tuple[Any, np.ndarray]]:
+        starts = np.arange(0, X.shape[0], chunk_size)
+        for start in rng.permutation(starts):
+            stop = min(start + chunk_size, X.shape[0])
+            X_chunk, y_chunk = _rows(X, start, stop), y[start:stop]
+            if mask is not None:
+                X_chunk, y_chunk = X_chunk[mask[start:stop]], y_chunk[mask[start:stop]]
+            if len(y_chunk):
+                yield X_chunk, y_chunk
+
+    return chunks
+
+
+def parquet_chunks(path: str, data_pipeline, target_col: str, chunk_size: int = 65_536) -> Chunks:
+    """Training data from a Parquet file of listings, transformed by a fitted `data_pipeline` one chunk at a time.
+
+    Row groups are read in random order, so the file is never loaded whole and neither is its feature matrix.
+    """
+    import pyarrow.parquet as pq
+
+    def chunks(rng: np.random.Generator) -> Iterator[tuple[Any, np.ndarray]]:
+        parquet_file = pq.ParquetFile(path)
+        for row_group in rng.permutation(parquet_file.num_row_groups):
+            data = parquet_file.read_row_group(int(row_group)).to_pandas()
+            for start in range(0, len(data), chunk_size):
+                chunk = data.iloc[start : start + chunk_size]
+                yield data_pipeline.transform(chunk.drop(target_col, axis=1)), chunk[target_col].to_numpy(np.float64)
+
+    return chunks
+
+
+class StreamingMLPRegressor(RegressorMixin, BaseEstimator):
+    """NumPy MLP regressor trained with mini-batch Adam on data streamed in chunks, a drop-in for `MLPRegressor`.
+
+    Sparse input is multiplied as CSR and never densified; the dense layers use the multi-threaded BLAS of NumPy,
+    limited to `n_threads` if given. Every epoch is logged while training runs; turn `log_training` off for many fits
+    in one MLflow run (e.g. sklearn's GridSearchCV), whose params can't change. With `early_stopping`, the weights of
+    the best validation epoch are kept and, if `checkpoint_path` is set, written to disk whenever they improve. The
+    fitted attributes match `MLPRegressor`'s, so compiling, exporting and `partial_fit` updates work the same way.
+    """
+
+    def __init__(
+        self,
+        hidden_layer_sizes: tuple[int, ...] = (100,),
+        activation: str = "relu",
+        alpha: float = 0.0001,
+        batch_size: int = 200,
+        learning_rate_init: float = 0.001,
+        beta_1: float = 0.9,
+        beta_2: float = 0.999,
+        epsilon: float = 1e-8,
+        max_iter: int = 200,
+        tol: float = 1e-4,
+        shuffle: bool = True,
+        early_stopping: bool = False,
+        validation_fraction: float = 0.1,
+        n_iter_no_change: int = 10,
+        chunk_size: int = 65_536,
+        n_threads: Optional[int] = None,
+        checkpoint_path: Optional[str] = None,
+        log_training: bool = True,
+        random_state: Optional[int] = None,
+    ) -> None:
+        self.hidden_layer_sizes = hidden_layer_sizes
+        self.activation = activation
+        self.alpha = alpha
+        self.batch_size = batch_size
+        self.learning_rate_init = learning_rate_init
+        self.beta_1 = beta_1
+        self.beta_2 = beta_2
+        self.epsilon = epsilon
+        self.max_iter = max_iter
+        self.tol = tol
+        self.shuffle = shuffle
+        self.early_stopping = early_stopping
+        self.validation_fraction = validation_fraction
+        self.n_iter_no_change = n_iter_no_change
+        self.chunk_size = chunk_size
+        self.n_threads = n_threads
+        self.checkpoint_path = checkpoint_path
+        self.log_training = log_training
+        self.random_state = random_state
+
+    def _initialize(self, n_features: int) -> None:
+        rng = np.random.default_rng(self.random_state)
+        sizes = [n_features, *self.hidden_layer_sizes, 1]
+        # Glorot uniform initialization, as in MLPRegressor
+        factor = 2 if self.activation == "logistic" else 6
+        self.coefs_, self.intercepts_ = [], []
+        for fan_in, fan_out in zip(sizes[:-1], sizes[1:]):
+            bound = np.sqrt(factor / (fan_in + fan_out))
+            self.coefs_.append(rng.uniform(-bound, bound, (fan_in, fan_out)))
+            self.intercepts_.append(rng.uniform(-bound, bound, fan_out))
+
+        self.n_features_in_ = n_features
+        self.n_outputs_ = 1
+        self.n_layers_ = len(sizes)
+        self.out_activation_ = "identity"
+        self.n_iter_ = 0
+        self.t_ = 0
+        self.loss_curve_ = []
+        self.best_loss_ = np.inf
+        self.validation_scores_ = None
+        self.best_validation_score_ = None
+        self._reset_optimizer()
+
+    def _reset_optimizer(self) -> None:
+        self._rng = np.random.default_rng(self.random_state)
+        self._step = 0
+        self._moments = [np.zeros_like(p) for p in self._parameters()]
+        self._velocities = [np.zeros_like(p) for p in self._parameters()]
+
+    def _parameters(self) -> list[np.ndarray]:
+        return [*self.coefs_, *self.intercepts_]
+
+    def _forward(self, X) -> list:
+        activations = [X]
+        for i, (coef, intercept) in enumerate(zip(self.coefs_, self.intercepts_)):
+            A = activations[-1] @ coef
+            A += intercept
+            if i < len(self.coefs_) - 1:
+                A = _ACTIVATIONS[self.activation](A)
+            activations.append(A)
+
+        return activations
+
+    def _batch_step(self, X, y: np.ndarray) -> float:
+        """One Adam step on a mini-batch, returns its loss (squared error / 2 plus the L2 penalty)"""
+        n = X.shape[0]
+        activations = self._forward(X)
+        delta = activations[-1] - y[:, None]
+        loss = 0.5 * float(np.mean(delta**2))
+        loss += 0.5 * self.alpha * sum(float(np.vdot(coef, coef)) for coef in self.coefs_) / n
+
+        coef_grads, intercept_grads = [None] * len(self.coefs_), [None] * len(self.coefs_)
+        delta /= n
+        for i in range(len(self.coefs_) - 1, -1, -1):
+            # sparse X.T @ delta only touches the stored entries of the first layer's input
+            coef_grads[i] = np.asarray(activations[i].T @ delta) + self.alpha * self.coefs_[i] / n
+            intercept_grads[i] = delta.sum(axis=0)
+            if i > 0:
+                delta = delta @ self.coefs_[i].T
+                _DERIVATIVES[self.activation](activations[i], delta)
+
+        self._step += 1
+        learning_rate = self.learning_rate_init * np.sqrt(1 - self.beta_2**self._step) / (1 - self.beta_1**self._step)
+        for param, grad, m, v in zip(self._parameters(), coef_grads + intercept_grads, self._moments, self._velocities):
+            m *= self.beta_1
+            m += (1 - self.beta_1) * grad
+            v *= self.beta_2
+            v += (1 - self.beta_2) * grad**2
+            param -= learning_rate * m / (np.sqrt(v) + self.epsilon)
+
+        return loss
+
+    def _epoch(self, chunks: Chunks) -> float:
+        total_loss, n_rows = 0.0, 0
+        for X, y in chunks(self._rng):
+            order = self._rng.permutation(len(y)) if self.shuffle else np.arange(len(y))
+            for start in range(0, len(y), self.batch_size):
+                batch = order[start : start + self.batch_size]
+                total_loss += self._batch_step(X[batch], y[batch]) * len(batch)
+                n_rows += len(batch)
+        if n_rows == 0:
+            raise ValueError("No training rows")
+
+        self.n_iter_ += 1
+        self.t_ += n_rows
+        self.loss_ = total_loss / n_rows
+        self.loss_curve_.append(self.loss_)
+
+        return self.loss_
+
+    def _save_checkpoint(self) -> None:
+        arrays = {f"coef{i}": coef for i, coef in enumerate(self.coefs_)}
+        arrays.update({f"intercept{i}": intercept for i, intercept in enumerate(self.intercepts_)})
+        tmp_path = f"{self.checkpoint_path}.tmp{os.getpid()}.npz"
+        np.savez(tmp_path, epoch=self.n_iter_, **arrays)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def load_checkpoint(self, path: str) -> "StreamingMLPRegressor":
+        """Loads the weights of a checkpoint, e.g. of an interrupted `fit`; the optimizer state starts fresh"""
+        with np.load(path) as checkpoint:
+            n_layers = sum(name.startswith("coef") for name in checkpoint.files)
+            coefs = [checkpoint[f"coef{i}"] for i in range(n_layers)]
+            intercepts = [checkpoint[f"intercept{i}"] for i in range(n_layers)]
+            epoch = int(checkpoint["epoch"])
+
+        self._initialize(coefs[0].shape[0])
+        self.coefs_, self.intercepts_ = coefs, intercepts
+        self.n_iter_ = epoch
+        self._reset_optimizer()
+
+        return self
+
+    def _fit(self, chunks: Chunks, n_features: int, X_val=None, y_val=None) -> "StreamingMLPRegressor":
+        self._initialize(n_features)
+        if self.early_stopping:
+            self.validation_scores_ = []
+            self.best_validation_score_ = -np.inf
+        best_params, no_improvement = None, 0
+
+        with threadpool_limits(limits=self.n_threads, user_api="blas"):
+            for epoch in range(self.max_iter):
+                loss = self._epoch(chunks)
+                metrics = {"training_loss": loss}
+
+                if self.early_stopping:
+                    y_pred = self._predict(X_val)
+                    score = r2_score(y_val, y_pred)
+                    self.validation_scores_.append(score)
+                    metrics["validation_loss"] = 0.5 * float(np.mean((y_val - y_pred) ** 2))
+                    no_improvement = no_improvement + 1 if score < self.best_validation_score_ + self.tol else 0
+                    if score > self.best_validation_score_:
+                        self.best_validation_score_ = score
+                        best_params = [p.copy() for p in self._parameters()]
+                        if self.checkpoint_path is not None:
+                            self._save_checkpoint()
+                else:
+                    no_improvement = no_improvement + 1 if loss > self.best_loss_ - self.tol else 0
+                    if loss < self.best_loss_:
+                        self.best_loss_ = loss
+                        if self.checkpoint_path is not None:
+                            self._save_checkpoint()
+
+                if self.log_training:
+                    tracking.log_metrics(metrics, step=epoch)
+                if no_improvement > self.n_iter_no_change:
+                    break
+
+        if best_params is not None:
+            # keep the weights of the best validation epoch, like MLPRegressor
+            n_layers = len(self.coefs_)
+            self.coefs_, self.intercepts_ = best_params[:n_layers], best_params[n_layers:]
+            self._reset_optimizer()
+
+        if self.log_training:
+            self._log_summary()
+
+        return self
+
+    def _log_summary(self) -> None:
+        metrics = {
+            "final_training_loss": self.loss_curve_[-1],
+            "n_epochs": len(self.loss_curve_),
+            "converged": self.n_iter_ < self.max_iter,
+        }
+        if self.validation_scores_:
+            metrics["best_validation_score"] = self.best_validation_score_
+        tracking.log_metrics(metrics)
+        tracking.log_params(
+            {
+                "n_layers": self.n_layers_,
+                "total_parameters": sum(coef.size for coef in self.coefs_),
+                "n_features_in": self.n_features_in_,
+                "n_outputs": self.n_outputs_,
+            }
+        )
+
+    def fit(self, X, y) -> "StreamingMLPRegressor":
+        """Fits on a dense, memory-mapped or sparse matrix, reading `chunk_size` rows into memory at a time"""
+        rows = np.arange(X.shape[0])
+        X_val = y_val = None
+        if self.early_stopping:
+            rows, val_rows = train_test_split(rows, test_size=self.validation_fraction, random_state=self.random_state)
+            val_rows = np.sort(val_rows)
+            X_val, y_val = X[val_rows], np.asarray(y, dtype=np.float64)[val_rows]
+
+        return self._fit(array_chunks(X, y, self.chunk_size, rows), X.shape[1], X_val, y_val)
+
+    def fit_chunks(self, chunks: Chunks, n_features: int, validation_data=None) -> "StreamingMLPRegressor":
+        """Fits on data that doesn't fit in memory, e.g. `parquet_chunks`; early stopping needs `validation_data`"""
+        if self.early_stopping and validation_data is None:
+            raise ValueError("early_stopping needs validation_data=(X_val, y_val) when fitting on chunks")
+        X_val, y_val = validation_data if validation_data is not None else (None, None)
+
+        return self._fit(chunks, n_features, X_val, None if y_val is None else np.asarray(y_val, dtype=np.float64))
+
+    def partial_fit(self, X, y) -> "StreamingMLPRegressor":
+        """One more epoch over `X`, continuing from the fitted weights and optimizer state"""
+        if not hasattr(self, "coefs_"):
+            self._initialize(X.shape[1])
+        if not hasattr(self, "_moments"):
+            self._reset_optimizer()
+
+        with threadpool_limits(limits=self.n_threads, user_api="blas"):
+            loss = self._epoch(array_chunks(X, y, self.chunk_size))
+        self.best_loss_ = min(self.best_loss_, loss)
+
+        return self
+
+    def _predict(self, X) -> np.ndarray:
+        if sparse.issparse(X):
+            X = sparse.csr_matrix(X, dtype=np.float64)
+        else:
+            X = np.asarray(X, dtype=np.float64)
+
+        return self._forward(X)[-1].ravel()
+
+    def predict(self, X) -> np.ndarray:
+        if X.shape[0] <= self.chunk_size:
+            return self._predict(X)
+
+        with threadpool_limits(limits=self.n_threads, user_api="blas"):
+            starts = range(0, X.shape[0], self.chunk_size)
+            return np.concatenate([self._predict(_rows(X, start, start + self.chunk_size)) for start in starts])
@@ -1,24 +1,25 @@
-from typing import Any
+import os
+import shutil
 
-from typing import Any
+from typing import Any, Optional
+
+import joblib
 
 from sklearn.base import BaseEstimator
 from sklearn.linear_model import Ridge
 from sklearn.neural_network import MLPRegressor
 from sklearn.pipeline import Pipeline
-from xgboost import XGBRegressor
-import mlflow
+from xgboost import XGBModel, XGBRegressor
 
-from airbnb_model.data.feature_pipeline import create_data_pipeline
+from airbnb_model import tracking
+from airbnb_model.data.feature_pipeline import create_data_pipeline, data_pipeline_options, feature_types
+from airbnb_model.mlp import StreamingMLPRegressor
 from airbnb_model.utils import _filter_config
 
 
 class MLPRegressorWithLogging(MLPRegressor):
     """MLPRegressor that logs training loss to MLflow during training"""
-    
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        
+
     def fit(self, X, y):
         # Override fit to log losses during training
         result = super().fit(X, y)
@@ -26,10 +27,10 @@ class MLPRegressorWithLogging(MLPRegressor):
         # Log training loss curve to MLflow (always available)
         if hasattr(self, 'loss_curve_') and self.loss_curve_ is not None:
             for epoch, loss in enumerate(self.loss_curve_):
-                mlflow.log_metric("training_loss", loss, step=epoch)
+                tracking.log_metric("training_loss", loss, step=epoch)
             
             # Log final training info
-            mlflow.log_metrics({
+            tracking.log_metrics({
                 "final_training_loss": self.loss_curve_[-1],
                 "n_epochs": len(self.loss_curve_),
                 "converged": self.n_iter_ < self.max_iter
@@ -39,12 +40,12 @@ class MLPRegressorWithLogging(MLPRegressor):
         if (hasattr(self, 'validation_scores_') and 
             self.validation_scores_ is not None):
             for epoch, val_loss in enumerate(self.validation_scores_):
-                mlflow.log_metric("validation_loss", val_loss, step=epoch)
+                tracking.log_metric("validation_loss", val_loss, step=epoch)
                 
-            mlflow.log_metric("final_validation_loss", self.validation_scores_[-1])
+            tracking.log_metric("final_validation_loss", self.validation_scores_[-1])
         
         # Log model architecture info
-        mlflow.log_params({
+        tracking.log_params({
             "n_layers": len(self.hidden_layer_sizes) + 1,
             "total_parameters": sum([layer.size for layer in self.coefs_]),
             "n_features_in": self.n_features_in_,
@@ -56,11 +57,14 @@ class MLPRegressorWithLogging(MLPRegressor):
 
 def _create_model(model_config: dict[str, Any]) -> BaseEstimator:
     if model_config["type"] == "xgboost":
-        model_config = _filter_config(model_config, XGBRegressor)
+        model_config = _filter_config(model_config, XGBModel)
         return XGBRegressor(**model_config)
     elif model_config["type"] == "ridge":
         model_config = _filter_config(model_config, Ridge)
         return Ridge(**model_config)
+    elif model_config["type"] == "mlp" and model_config.get("backend", "sklearn") == "streaming":
+        model_config = _filter_config(model_config, StreamingMLPRegressor)
+        return StreamingMLPRegressor(**model_config)
     elif model_config["type"] == "mlp":
         model_config = _filter_config(model_config, MLPRegressorWithLogging)
         return MLPRegressorWithLogging(**model_config)
@@ -69,13 +73,42 @@ def _create_model(model_config: dict[str, Any]) -> BaseEstimator:
 
 
 def create_model_pipeline(
-    model_config: dict[str, Any], features_config: dict[str, Any], feature_slots: list[str]
+    model_config: dict[str, Any],
+    features_config: dict[str, Any],
+    feature_slots: list[str],
+    data_pipeline: Optional[Pipeline] = None,
 ) -> Pipeline:
+    """Data pipeline followed by the model; pass an already fitted `data_pipeline` to reuse it"""
+    if data_pipeline is None:
+        data_pipeline = create_data_pipeline(features_config, feature_slots, **data_pipeline_options(model_config))
+
+    if data_pipeline_options(model_config)["categorical_encoding"] == "native":
+        assert model_config["type"] == "xgboost", "Native categorical encoding is only supported by XGBoost"
+        model_config = {
+            **model_config,
+            "enable_categorical": True,
+            "feature_types": feature_types(features_config, feature_slots),
+        }
+
     model_pipeline = Pipeline(
         [
-            ("data_pipeline", create_data_pipeline(features_config, feature_slots)),
+            ("data_pipeline", data_pipeline),
             ("model", _create_model(model_config)),
         ]
     )
 
     return model_pipeline
+
+
+def save_model_pipeline(model_pipeline: Pipeline, path: str) -> None:
+    """Writes the pipeline to a temporary file and moves it to `path`, readers never see a half-written model"""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    joblib.dump(model_pipeline, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def copy_model(src_path: str, dst_path: str) -> None:
+    """Copies a saved model to `dst_path` atomically, like `save_model_pipeline`"""
+    tmp_path = f"{dst_path}.tmp{os.getpid()}"
+    shutil.copyfile(src_path, tmp_path)
+    os.replace(tmp_path, dst_path)
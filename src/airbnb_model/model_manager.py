@@ -0,0 +1,159 @@
+import glob
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+from airbnb_model.compiled import CompiledPipeline, compile_model_pipeline
+from airbnb_model.export import SPEC_NAME, is_exported, load_exported
+
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_PREFIX = "models:/"
+
+
+class ModelManager:
+    """Serves the current model and swaps in new versions in the background without dropping requests.
+
+    `model_uri` is either a path to a joblib file, a directory written by `export_model` or an MLflow registry URI
+    (`models:/<name>@<alias>` or `models:/<name>/<version>`). Loaded pipelines are compiled and warmed up with a
+    synthetic prediction before they replace the active model; in-flight requests keep using the model they started
+    with. Exported models are loaded without importing joblib or sklearn.
+    """
+
+    def __init__(
+        self,
+        model_uri: str,
+        mmap_mode: Optional[str] = "r",
+        reload_interval: float = 30.0,
+        on_load: Optional[Callable[[CompiledPipeline], None]] = None,
+    ) -> None:
+        self.model_uri = model_uri
+        self.mmap_mode = mmap_mode
+        self.reload_interval = reload_interval
+        self.on_load = on_load  # called with every new model after the warm-up, before it goes live
+
+        self._active: Optional[tuple[CompiledPipeline, dict[str, Any]]] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def active(self) -> tuple[CompiledPipeline, dict[str, Any]]:
+        """The model together with its info, read at once so both belong to the same version"""
+        return self._active
+
+    @property
+    def model(self) -> CompiledPipeline:
+        return self._active[0]
+
+    @property
+    def info(self) -> dict[str, Any]:
+        return self._active[1]
+
+    @property
+    def version(self) -> str:
+        return self._active[1]["version"]
+
+    def _resolve_version(self) -> str:
+        if self.model_uri.startswith(REGISTRY_PREFIX):
+            from mlflow import MlflowClient
+
+            name, _, alias = self.model_uri[len(REGISTRY_PREFIX) :].partition("@")
+            if alias:
+                return str(MlflowClient().get_model_version_by_alias(name, alias).version)
+            return self.model_uri.rsplit("/", 1)[-1]
+
+        # an export is replaced as a whole, its spec is the last file written
+        path = os.path.join(self.model_uri, SPEC_NAME) if is_exported(self.model_uri) else self.model_uri
+        stat = os.stat(path)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def _load_model(self, download_dir: str, version: str) -> CompiledPipeline:
+        if self.model_uri.startswith(REGISTRY_PREFIX):
+            import mlflow
+
+            local_dir = mlflow.artifacts.download_artifacts(artifact_uri=self.model_uri, dst_path=download_dir)
+            specs = glob.glob(os.path.join(local_dir, "**", SPEC_NAME), recursive=True)
+            paths = [os.path.dirname(spec) for spec in specs] or glob.glob(
+                os.path.join(local_dir, "**", "*.joblib"), recursive=True
+            )
+            if len(paths) != 1:
+                raise ValueError(f"Expected a single exported or .joblib model in {self.model_uri}, found {len(paths)}")
+            path = paths[0]
+        else:
+            path = self.model_uri
+
+        if is_exported(path):
+            return load_exported(path)
+
+        import joblib
+
+        if self.mmap_mode is not None and not self.model_uri.startswith(REGISTRY_PREFIX):
+            # trainers replace the file at `model_uri`, a mapping of it would break (SIGBUS) if it is ever written in
+            # place; the private copy stays mapped after its directory is removed
+            local_path = os.path.join(download_dir, f"{version}.joblib")
+            shutil.copyfile(path, local_path)
+            path = local_path
+
+        # arrays are memory-mapped, so forked workers share one copy through the page cache
+        return compile_model_pipeline(joblib.load(path, mmap_mode=self.mmap_mode))
+
+    def load(self) -> bool:
+        """Loads, compiles and warms up the model if its version changed, returns whether a new model was swapped in"""
+        with self._lock:
+            version = self._resolve_version()
+            if self._active is not None and self._active[1]["version"] == version:
+                return False
+
+            start = time.perf_counter()
+            with tempfile.TemporaryDirectory() as download_dir:
+                model = self._load_model(download_dir, version)
+            load_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            model.predict_one(model.example_record())
+            warmup_seconds = time.perf_counter() - start
+            if self.on_load is not None:
+                self.on_load(model)
+
+            info = {
+                "model_uri": self.model_uri,
+                "version": version,
+                "load_seconds": load_seconds,
+                "warmup_seconds": warmup_seconds,
+                "loaded_at": datetime.now(timezone.utc).isoformat(),
+            }
+            # a single reference assignment -> requests see either the old or the new model, never a mix
+            self._active = (model, info)
+
+        logger.info("Loaded model %s version %s in %.3f s", self.model_uri, version, load_seconds)
+
+        return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.reload_interval):
+            try:
+                self.load()
+            except Exception:
+                logger.exception("Reloading model %s failed, keeping version %s", self.model_uri, self.version)
+
+    def start(self) -> None:
+        if self._active is None:
+            self.load()
+        if self.reload_interval > 0 and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="model-reload", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,171 @@
+import json
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any, Callable, Mapping, Optional, Sequence
+
+
+COORDINATE_FIELDS = ("longitude", "latitude")
+
+
+def quantize(record: Mapping[str, Any], precision: Optional[int] = None) -> dict[str, Any]:
+    """The record with its coordinates rounded to `precision` decimals (4 ~ 11 m), unchanged if `precision` is None"""
+    if precision is None:
+        return dict(record)
+
+    return {
+        name: round(float(value), precision) if name in COORDINATE_FIELDS else value for name, value in record.items()
+    }
+
+
+def canonical_key(record: Mapping[str, Any], model_version: str, precision: Optional[int] = None) -> str:
+    """Cache key of a request record: its sorted fields, with the coordinates quantized if `precision` is set"""
+    canonical = quantize(record, precision)
+
+    return f"{model_version}:{json.dumps(canonical, sort_keys=True, separators=(',', ':'))}"
+
+
+class InMemoryBackend:
+    """Per-process LRU cache with a time-to-live"""
+
+    shared = False
+
+    def __init__(self, max_size: int = 10_000, ttl: float = 300.0) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._entries: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_many(self, keys: Sequence[str]) -> list[Optional[float]]:
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None or entry[1] < now:
+                    values.append(None)
+                    continue
+                self._entries.move_to_end(key)
+                values.append(entry[0])
+
+        return values
+
+    def set_many(self, items: Mapping[str, float]) -> None:
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisBackend:
+    """Cache shared by all workers of a deployment; Redis evicts entries by TTL (and LRU with `maxmemory-policy`)"""
+
+    shared = True
+
+    def __init__(self, url: str, ttl: float = 300.0, prefix: str = "airbnb-price:") -> None:
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("RedisBackend requires the redis package, install it with `pip install redis`") from e
+
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def __len__(self) -> int:
+        # all keys of the Redis database, give the cache a database of its own for an exact count; counting the
+        # prefixed keys would scan the whole keyspace
+        return self._client.dbsize()
+
+    def get_many(self, keys: Sequence[str]) -> list[Optional[float]]:
+        values = self._client.mget([self.prefix + key for key in keys])
+
+        return [None if value is None else float(value) for value in values]
+
+    def set_many(self, items: Mapping[str, float]) -> None:
+        pipeline = self._client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipeline.set(self.prefix + key, repr(value), px=int(self.ttl * 1000))
+        pipeline.execute()
+
+    def clear(self) -> None:
+        for keys in _chunks(list(self._client.scan_iter(match=f"{self.prefix}*")), 1000):
+            self._client.delete(*keys)
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class PredictionCache:
+    """Serves repeated predictions from a backend and sends only the misses to the model.
+
+    By default only identical records share an entry, so the cache never changes an answer. With `precision`, the
+    coordinates are rounded to that many decimals for the key and for the model: every request within a cell of the
+    coordinate grid then gets the same answer, cached or not, which can differ slightly from the unrounded one.
+
+    Keys include the model version, so a new model never sees predictions of the old one. A per-process backend
+    is also cleared on a version change to free memory; a shared backend lets the old entries expire by TTL.
+    """
+
+    def __init__(self, backend, precision: Optional[int] = None) -> None:
+        self.backend = backend
+        self.precision = precision
+
+        self.hits = 0
+        self.misses = 0
+        self._model_version: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def predict(
+        self,
+        records: Sequence[Mapping[str, Any]],
+        predict_fn: Callable[[list[Mapping[str, Any]]], Sequence[float]],
+        model_version: str,
+    ) -> list[float]:
+        with self._lock:
+            if model_version != self._model_version:
+                if self._model_version is not None and not self.backend.shared:
+                    self.backend.clear()
+                self._model_version = model_version
+
+        keys = [canonical_key(record, model_version, self.precision) for record in records]
+        values = self.backend.get_many(keys)
+        missing = [i for i, value in enumerate(values) if value is None]
+
+        if missing:
+            # predict what the key describes, so a cached value doesn't depend on which request filled it
+            predictions = predict_fn([quantize(records[i], self.precision) for i in missing])
+            for i, prediction in zip(missing, predictions):
+                values[i] = float(prediction)
+            self.backend.set_many({keys[i]: values[i] for i in missing})
+
+        with self._lock:
+            self.hits += len(records) - len(missing)
+            self.misses += len(missing)
+
+        return values
+
+    def stats(self) -> dict[str, Any]:
+        requests = self.hits + self.misses
+
+        return {
+            "backend": type(self.backend).__name__,
+            "size": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+        }
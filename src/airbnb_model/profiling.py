@@ -0,0 +1,212 @@
+import bisect
+import functools
+import threading
+import time
+import tracemalloc
+
+from contextlib import contextmanager
+from typing import Any, Iterator, Mapping, Optional
+
+
+SECONDS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+ROWS_BUCKETS = (1, 8, 32, 128, 512, 2048, 8192, 32768, 131072, 524288)
+MEMORY_BUCKETS = tuple(4**i * 1024 for i in range(11))  # 1 KiB to 1 GiB
+
+PROFILED_METHODS = ("fit", "fit_transform", "transform", "predict")
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def exposition(self, name: str, labels: str) -> list[str]:
+        lines, cumulative = [], 0
+        for bound, count in zip((*self.buckets, "+Inf"), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+
+        return lines
+
+
+class StepProfiler:
+    """Collects wall time, rows and (optionally) traced memory growth of instrumented pipeline steps.
+
+    Use `profile` for a scoped measurement (e.g. one training run) or `instrument` for long-lived models. Nothing is
+    measured, and nothing costs anything, for estimators that were never instrumented.
+    """
+
+    _METRICS = {"seconds": SECONDS_BUCKETS, "rows": ROWS_BUCKETS, "memory_delta_bytes": MEMORY_BUCKETS}
+
+    def __init__(self, track_memory: bool = False) -> None:
+        self.track_memory = track_memory
+
+        self._histograms: dict[tuple[str, str], dict[str, _Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, step: str, method: str, seconds: float, rows: int, memory_delta: int = 0) -> None:
+        with self._lock:
+            histograms = self._histograms.get((step, method))
+            if histograms is None:
+                metrics = self._METRICS if self.track_memory else {"seconds": SECONDS_BUCKETS, "rows": ROWS_BUCKETS}
+                histograms = {metric: _Histogram(buckets) for metric, buckets in metrics.items()}
+                self._histograms[(step, method)] = histograms
+            histograms["seconds"].observe(seconds)
+            histograms["rows"].observe(rows)
+            if self.track_memory:
+                histograms["memory_delta_bytes"].observe(memory_delta)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Totals per `step.method`: number of calls, seconds, rows and (if tracked) memory growth"""
+        with self._lock:
+            return {
+                f"{step}.{method}": {"calls": histograms["seconds"].count}
+                | {metric: histogram.sum for metric, histogram in histograms.items()}
+                for (step, method), histograms in self._histograms.items()
+            }
+
+    def prometheus(self, prefix: str = "pipeline_step") -> str:
+        """Histograms in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for metric in self._METRICS:
+                series = [(key, h[metric]) for key, h in self._histograms.items() if metric in h]
+                if not series:
+                    continue
+                name = f"{prefix}_{metric}"
+                lines.append(f"# HELP {name} {metric.replace('_', ' ')} per call of a pipeline step")
+                lines.append(f"# TYPE {name} histogram")
+                for (step, method), histogram in series:
+                    lines.extend(histogram.exposition(name, f'step="{step}",method="{method}"'))
+
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+def _num_rows(X: Any) -> int:
+    if hasattr(X, "shape"):
+        return X.shape[0]
+    if isinstance(X, Mapping):
+        return len(next(iter(X.values()))) if X else 0
+
+    return len(X)
+
+
+def _wrap(obj: Any, attr: str, step: str, method: str, profiler: StepProfiler) -> None:
+    original = getattr(obj, attr)
+
+    @functools.wraps(original)
+    def wrapper(X, *args, **kwargs):
+        memory_before = tracemalloc.get_traced_memory()[0] if profiler.track_memory else 0
+        start = time.perf_counter()
+        result = original(X, *args, **kwargs)
+        seconds = time.perf_counter() - start
+        memory_delta = tracemalloc.get_traced_memory()[0] - memory_before if profiler.track_memory else 0
+        profiler.record(step, method, seconds, _num_rows(X), memory_delta)
+
+        return result
+
+    # an instance attribute shadows the class method until it is deleted again
+    setattr(obj, attr, wrapper)
+
+
+def _named_steps(estimator: Any, name: str) -> Iterator[tuple[str, Any]]:
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+
+    yield name, estimator
+    if isinstance(estimator, Pipeline):
+        children = [(step_name, step) for step_name, step in estimator.steps]
+    elif isinstance(estimator, ColumnTransformer):
+        # fitted transformers if available; ColumnTransformer.fit clones its children, so their fit isn't seen
+        children = [(child, transformer) for child, transformer, _ in getattr(estimator, "transformers_", [])]
+        children = children or [(child, transformer) for child, transformer, _ in estimator.transformers]
+    else:
+        children = []
+
+    for child_name, child in children:
+        if child is not None and not isinstance(child, str):
+            yield from _named_steps(child, f"{name}/{child_name}")
+
+
+def instrument(estimator: Any, profiler: StepProfiler, name: str = "pipeline") -> list[tuple[Any, str]]:
+    """Times `fit`, `fit_transform`, `transform` and `predict` of a Pipeline / ColumnTransformer and all its steps.
+
+    A `CompiledPipeline` is instrumented under the step names of the Pipeline it was compiled from: `data_pipeline`
+    with its `feature_engineering` and `preprocessing` stages, and `model`. Returns the patched `(object, method)`
+    pairs for `uninstrument`.
+    """
+    from airbnb_model.compiled import CompiledPipeline
+
+    if isinstance(estimator, CompiledPipeline):
+        stages = [
+            ("transform_columns", f"{name}/data_pipeline", "transform"),
+            ("_derive", f"{name}/data_pipeline/feature_engineering", "transform"),
+            ("_preprocess", f"{name}/data_pipeline/preprocessing", "transform"),
+            ("_predict_matrix", f"{name}/model", "predict"),
+        ]
+        for attr, step, method in stages:
+            _wrap(estimator, attr, step, method, profiler)
+        return [(estimator, attr) for attr, _, _ in stages]
+
+    patched = []
+    for step_name, step in _named_steps(estimator, name):
+        for method in PROFILED_METHODS:
+            if hasattr(type(step), method) and hasattr(step, method) and method not in vars(step):
+                _wrap(step, method, step_name, method, profiler)
+                patched.append((step, method))
+
+    return patched
+
+
+def uninstrument(patched: list[tuple[Any, str]]) -> None:
+    for obj, method in patched:
+        vars(obj).pop(method, None)
+
+
+@contextmanager
+def profile(estimator: Any, profiler: Optional[StepProfiler], name: str = "pipeline") -> Iterator[StepProfiler]:
+    """Instruments `estimator` for the duration of the block, a no-op without a profiler.
+
+    Instrumented estimators can't be pickled, so save them after the block.
+    """
+    if profiler is None:
+        yield None
+        return
+
+    started_tracing = profiler.track_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    patched = instrument(estimator, profiler, name)
+    try:
+        yield profiler
+    finally:
+        uninstrument(patched)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+def log_profile(profiler: StepProfiler) -> None:
+    """Logs the totals of every profiled step to the active MLflow run"""
+    from airbnb_model import tracking
+
+    metrics = {
+        f"profile/{key}/{metric}": value
+        for key, totals in profiler.summary().items()
+        for metric, value in totals.items()
+    }
+    if metrics:
+        tracking.log_metrics(metrics)
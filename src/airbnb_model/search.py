@@ -0,0 +1,40 @@
+import math
+
+from typing import Callable, TypeVar
+
+
+Candidate = TypeVar("Candidate")
+
+
+def halving_schedule(eta: int, min_fraction: float) -> list[float]:
+    """Budget fractions of the rungs below the full budget, e.g. eta=3, min_fraction=0.1 -> [0.111, 0.333]"""
+    assert eta >= 2, "eta must be at least 2"
+    assert 0 < min_fraction <= 1, "min_fraction must be in (0, 1]"
+
+    n_rungs = math.floor(math.log(1 / min_fraction, eta) + 1e-9)
+
+    return [eta ** (rung - n_rungs) for rung in range(n_rungs)]
+
+
+def successive_halving(
+    candidates: list[Candidate],
+    evaluate: Callable[[Candidate, float, int], float],
+    eta: int = 3,
+    min_fraction: float = 0.1,
+) -> list[Candidate]:
+    """Prunes candidates with successive halving and returns the survivors to be trained on the full budget.
+
+    `evaluate(candidate, fraction, rung)` trains `candidate` on the given fraction of its budget and returns a loss.
+    After every rung only the best `1 / eta` of the candidates are kept.
+    """
+    survivors = list(candidates)
+    for rung, fraction in enumerate(halving_schedule(eta, min_fraction)):
+        if len(survivors) <= 1:
+            break
+
+        losses = [evaluate(candidate, fraction, rung) for candidate in survivors]
+        n_keep = max(1, math.ceil(len(survivors) / eta))
+        ranking = sorted(range(len(survivors)), key=lambda i: losses[i])
+        survivors = [survivors[i] for i in sorted(ranking[:n_keep])]
+
+    return survivors
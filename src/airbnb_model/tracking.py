@@ -0,0 +1,227 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+import mlflow
+
+from mlflow import MlflowClient
+from mlflow.entities import Metric, Param, RunTag
+
+
+# limits of a single MlflowClient.log_batch call
+MAX_METRICS_PER_BATCH = 1000
+MAX_PARAMS_TAGS_PER_BATCH = 100
+MAX_ENTITIES_PER_BATCH = 1000
+FLUSH_INTERVAL = 1.0  # seconds a logged value may wait before it is written
+
+_CLOSE = object()
+
+logger = logging.getLogger(__name__)
+
+
+class RunLogger:
+    """Buffers the params, metrics and tags of one MLflow run and writes them with `log_batch` on a background thread.
+
+    The latest value of every param and metric is also kept in memory, so results can be read back without asking the
+    tracking server. `flush` waits until everything logged so far is written and raises if writing failed.
+    """
+
+    def __init__(
+        self,
+        run_id: str,
+        experiment_id: Optional[str] = None,
+        client: Optional[MlflowClient] = None,
+        flush_interval: float = FLUSH_INTERVAL,
+    ) -> None:
+        self.run_id = run_id
+        self.experiment_id = experiment_id
+        self.client = client or MlflowClient()
+        self.flush_interval = flush_interval
+
+        self.params: dict[str, str] = {}
+        self.metrics: dict[str, float] = {}
+        self.tags: dict[str, str] = {}
+
+        self._queue: queue.Queue = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=f"mlflow-logger-{run_id}", daemon=True)
+        self._thread.start()
+
+    def log_param(self, key: str, value: Any) -> None:
+        self.log_params({key: value})
+
+    def log_params(self, params: dict[str, Any]) -> None:
+        for key, value in params.items():
+            value = str(value)
+            if key in self.params:
+                # MLflow params are immutable, catch a conflicting value here instead of in the background
+                if self.params[key] != value:
+                    raise ValueError(f"Param '{key}' was already logged as '{self.params[key]}', not '{value}'")
+                continue
+            self.params[key] = value
+            self._queue.put(Param(key, value))
+
+    def log_metric(self, key: str, value: float, step: int = 0) -> None:
+        self.log_metrics({key: value}, step)
+
+    def log_metrics(self, metrics: dict[str, float], step: int = 0) -> None:
+        timestamp = int(time.time() * 1000)
+        for key, value in metrics.items():
+            self.metrics[key] = float(value)
+            self._queue.put(Metric(key, float(value), timestamp, step))
+
+    def set_tag(self, key: str, value: Any) -> None:
+        self.set_tags({key: value})
+
+    def set_tags(self, tags: dict[str, Any]) -> None:
+        for key, value in tags.items():
+            self.tags[key] = str(value)
+            self._queue.put(RunTag(key, str(value)))
+
+    def _write(self, metrics: list[Metric], params: list[Param], tags: list[RunTag]) -> None:
+        while metrics or params or tags:
+            batch_params, params = params[:MAX_PARAMS_TAGS_PER_BATCH], params[MAX_PARAMS_TAGS_PER_BATCH:]
+            batch_tags, tags = tags[:MAX_PARAMS_TAGS_PER_BATCH], tags[MAX_PARAMS_TAGS_PER_BATCH:]
+            n_metrics = min(MAX_METRICS_PER_BATCH, MAX_ENTITIES_PER_BATCH - len(batch_params) - len(batch_tags))
+            batch_metrics, metrics = metrics[:n_metrics], metrics[n_metrics:]
+            self.client.log_batch(
+                self.run_id, metrics=batch_metrics, params=batch_params, tags=batch_tags, synchronous=True
+            )
+
+    def _run(self) -> None:
+        metrics, params, tags = [], [], []
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, Metric):
+                metrics.append(item)
+            elif isinstance(item, Param):
+                params.append(item)
+            elif isinstance(item, RunTag):
+                tags.append(item)
+            if isinstance(item, (Metric, Param, RunTag)):
+                deadline = deadline or time.monotonic() + self.flush_interval
+                if len(metrics) < MAX_METRICS_PER_BATCH:
+                    continue
+
+            # the interval passed, a batch is full or a flush / close was requested
+            try:
+                self._write(metrics, params, tags)
+            except Exception as exc:
+                self._error = self._error or exc
+            metrics, params, tags = [], [], []
+            deadline = None
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _CLOSE:
+                return
+
+    def flush(self) -> None:
+        if not self._closed:
+            done = threading.Event()
+            self._queue.put(done)
+            done.wait()
+
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError(f"Logging to MLflow run {self.run_id} failed") from error
+
+    def close(self) -> None:
+        """Writes everything still buffered and stops the background thread"""
+        if not self._closed:
+            self._queue.put(_CLOSE)
+            self._thread.join()
+            self._closed = True
+        self.flush()
+
+
+# loggers of the runs started with `start_run`, innermost last, like MLflow's own stack of active runs
+_loggers: list[RunLogger] = []
+
+
+def _close_all() -> None:
+    while _loggers:
+        _loggers.pop().close()
+
+
+# the `start_run` context closes its logger even on exceptions; this covers exits that skip it
+atexit.register(_close_all)
+
+
+def _close(run_logger: RunLogger) -> None:
+    if run_logger in _loggers:
+        _loggers.remove(run_logger)
+    run_logger.close()
+
+
+@contextmanager
+def start_run(**kwargs) -> Iterator[RunLogger]:
+    """`mlflow.start_run` with buffered logging: the module's `log_*` functions write to this run until it ends.
+
+    Everything logged is written before the run is ended, also when the block raises; a failure to write then is
+    logged, and the block's exception is raised.
+    """
+    with mlflow.start_run(**kwargs) as run:
+        run_logger = RunLogger(run.info.run_id, run.info.experiment_id)
+        _loggers.append(run_logger)
+        try:
+            yield run_logger
+        except BaseException:
+            # a logging error must not replace the exception that ends the run
+            try:
+                _close(run_logger)
+            except Exception:
+                logger.exception("Writing the buffered values of MLflow run %s failed", run_logger.run_id)
+            raise
+        _close(run_logger)
+
+
+def active_logger() -> Optional[RunLogger]:
+    return _loggers[-1] if _loggers else None
+
+
+# outside of `start_run` the calls go straight to MLflow, which keeps the behaviour of plain `mlflow.start_run` code
+
+
+def log_param(key: str, value: Any) -> None:
+    log_params({key: value})
+
+
+def log_params(params: dict[str, Any]) -> None:
+    run_logger = active_logger()
+    if run_logger is None:
+        mlflow.log_params(params)
+    else:
+        run_logger.log_params(params)
+
+
+def log_metric(key: str, value: float, step: int = 0) -> None:
+    log_metrics({key: value}, step)
+
+
+def log_metrics(metrics: dict[str, float], step: int = 0) -> None:
+    run_logger = active_logger()
+    if run_logger is None:
+        mlflow.log_metrics(metrics, step=step)
+    else:
+        run_logger.log_metrics(metrics, step)
+
+
+def set_tags(tags: dict[str, Any]) -> None:
+    run_logger = active_logger()
+    if run_logger is None:
+        mlflow.set_tags(tags)
+    else:
+        run_logger.set_tags(tags)
@@ -5,7 +5,11 @@ from typing import Any, Callable
 
 def _filter_config(config: dict[str, Any], func: Callable) -> dict[str, Any]:
     sig = inspect.signature(func)
-    filter_keys = [param.name for param in sig.parameters.values() if param.kind == param.POSITIONAL_OR_KEYWORD]
+    filter_keys = [
+        param.name
+        for param in sig.parameters.values()
+        if param.kind in (param.POSITIONAL_OR_KEYWORD, param.KEYWORD_ONLY)
+    ]
     filtered_config = {filter_key: config[filter_key] for filter_key in filter_keys if filter_key in config}
 
     return filtered_config
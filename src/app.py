@@ -1,19 +1,71 @@
-import joblib
-import pandas as pd
+import json
+import os
+
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
 import pydantic
 
-from fastapi import FastAPI
-from fastapi.encoders import jsonable_encoder
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+from airbnb_model.batching import MicroBatcher
+from airbnb_model.data.city_store import CityStore
+from airbnb_model.data.db import connection_pool
+from airbnb_model.model_manager import ModelManager
+from airbnb_model.prediction_cache import InMemoryBackend, PredictionCache, RedisBackend
+from airbnb_model.profiling import StepProfiler, instrument
+
+
+MAX_BATCH_SIZE = int(os.environ.get("PREDICT_MAX_BATCH_SIZE", 64))
+BATCH_WINDOW_MS = float(os.environ.get("PREDICT_BATCH_WINDOW_MS", 2.0))  # 0 disables micro-batching
+MAX_REQUEST_INSTANCES = int(os.environ.get("PREDICT_MAX_REQUEST_INSTANCES", 10_000))
+# a joblib file or an MLflow registry URI like models:/airbnb-price@production
+MODEL_URI = os.environ.get("MODEL_URI", os.path.join(os.path.dirname(__file__), "..", "models", "model.joblib"))
+MODEL_RELOAD_INTERVAL = float(os.environ.get("MODEL_RELOAD_INTERVAL", 30.0))  # seconds, 0 disables hot-reload
+MODEL_MMAP_MODE = os.environ.get("MODEL_MMAP_MODE", "r") or None
+# empty disables the cache, "memory" keeps it per worker, a redis:// URL shares it between workers
+PREDICTION_CACHE = os.environ.get("PREDICTION_CACHE", "")
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 10_000))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", 300.0))  # seconds
+# lat/lon decimals the cache rounds to (4 ~ 11 m), empty keys on the exact coordinates
+PREDICTION_CACHE_PRECISION = (
+    int(os.environ["PREDICTION_CACHE_PRECISION"]) if os.environ.get("PREDICTION_CACHE_PRECISION") else None
+)
+CITY_REFRESH_INTERVAL = float(os.environ.get("CITY_REFRESH_INTERVAL", 300.0))  # seconds, 0 disables refreshing
+# JSON file {"<city>": [<longitude>, <latitude>]} used instead of the database, e.g. for benchmarks
+CITY_CENTERS_PATH = os.environ.get("CITY_CENTERS_PATH", "")
+PROFILE_PIPELINE = os.environ.get("PROFILE_PIPELINE", "0") == "1"  # per-step histograms on /metrics
 
+profiler = StepProfiler() if PROFILE_PIPELINE else None
+model_manager = ModelManager(
+    MODEL_URI,
+    mmap_mode=MODEL_MMAP_MODE,
+    reload_interval=MODEL_RELOAD_INTERVAL,
+    on_load=(lambda model: instrument(model, profiler)) if PROFILE_PIPELINE else None,
+)
+model_manager.load()
 
-app = FastAPI(title="AirBnB price prediction")
-model = joblib.load("../models/model.joblib")
+prediction_cache = None
+if PREDICTION_CACHE == "memory":
+    prediction_cache = PredictionCache(
+        InMemoryBackend(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL), PREDICTION_CACHE_PRECISION
+    )
+elif PREDICTION_CACHE:
+    prediction_cache = PredictionCache(RedisBackend(PREDICTION_CACHE, PREDICTION_CACHE_TTL), PREDICTION_CACHE_PRECISION)
 
-city_centers = {"Paris": {"lon": 2.320041, "lat": 48.85889}}  # very dirty, should load from DB
+if CITY_CENTERS_PATH:
+    city_store = CityStore()
+    with open(CITY_CENTERS_PATH, "r") as f:
+        city_store.load([(city, *center) for city, center in json.load(f).items()])
+else:
+    city_store = CityStore(connection_pool(), refresh_interval=CITY_REFRESH_INTERVAL)
+    city_store.refresh()
 
 
 class InputData(pydantic.BaseModel):
-    city: str
+    city: Optional[str] = None  # the nearest city center is used if not given
     neighbourhood_name: str
     property_type_name: str
     room_type_name: str
@@ -31,14 +83,105 @@ class OutputData(pydantic.BaseModel):
     predicted_price: float
 
 
+class BatchInputData(pydantic.BaseModel):
+    instances: list[InputData] = pydantic.Field(min_length=1, max_length=MAX_REQUEST_INSTANCES)
+
+
+class BatchOutputData(pydantic.BaseModel):
+    predicted_prices: list[float]
+
+
+def _model_rows(records: list[InputData]) -> list[dict[str, Any]]:
+    """Model input rows with the city centers resolved, raises a 422 for unknown cities.
+
+    Centers are looked up here, before batching, so a city store refresh can't remove a city between the check and
+    the prediction and one bad listing can't fail a whole micro-batch.
+    """
+    # the nearest city center is used for records without a city
+    cities = [record.city for record in records]
+    missing = [i for i, city in enumerate(cities) if city is None]
+    if missing:
+        nearest, _ = city_store.nearest([records[i].longitude for i in missing], [records[i].latitude for i in missing])
+        for i, city in zip(missing, nearest):
+            cities[i] = city
+
+    rows, unknown = [], set()
+    for record, city in zip(records, cities):
+        row = record.model_dump(exclude={"city"})
+        try:
+            row["center_longitude"], row["center_latitude"] = city_store.center(city)
+        except KeyError:
+            unknown.add(city)
+        rows.append(row)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown cities: {sorted(unknown)}")
+
+    return rows
+
+
+def _predict_rows(rows: list[dict[str, Any]]) -> list[float]:
+    model, info = model_manager.active
+    if prediction_cache is not None:
+        return prediction_cache.predict(rows, model.predict, info["version"])
+
+    prediction = model.predict(rows)
+
+    return prediction.tolist()
+
+
+batcher = MicroBatcher(_predict_rows, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=BATCH_WINDOW_MS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    model_manager.start()
+    city_store.start()
+    if BATCH_WINDOW_MS > 0:
+        await batcher.start()
+    yield
+    await batcher.stop()
+    city_store.stop()
+    model_manager.stop()
+    if city_store.pool is not None:
+        city_store.pool.close()
+
+
+app = FastAPI(title="AirBnB price prediction", lifespan=lifespan)
+
+
 @app.post("/predict", response_model=OutputData)
 async def predict(data: InputData):
-    data_dict = jsonable_encoder(data)
-    data_dict["center_longitude"] = city_centers[data_dict["city"]]["lon"]
-    data_dict["center_latitude"] = city_centers[data_dict["city"]]["lat"]
-    del data_dict["city"]
-
-    input_data = pd.DataFrame([data_dict])
-    prediction = model.predict(input_data)
+    (row,) = _model_rows([data])
+    if BATCH_WINDOW_MS > 0:
+        prediction = await batcher.submit(row)
+    else:
+        prediction = (await run_in_threadpool(_predict_rows, [row]))[0]
 
     return {"predicted_price": prediction}
+
+
+@app.post("/predict/batch", response_model=BatchOutputData)
+async def predict_batch(data: BatchInputData):
+    rows = _model_rows(data.instances)
+    predictions = await run_in_threadpool(_predict_rows, rows)
+
+    return {"predicted_prices": predictions}
+
+
+@app.get("/model")
+async def model_info():
+    return model_manager.info
+
+
+@app.get("/cache")
+async def cache_stats():
+    if prediction_cache is None:
+        return {"enabled": False}
+
+    # the backend may be a remote Redis, keep its round trip off the event loop
+    return {"enabled": True, **(await run_in_threadpool(prediction_cache.stats))}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return profiler.prometheus() if profiler is not None else ""
@@ -0,0 +1,32 @@
+import argparse
+import warnings
+
+import joblib
+import numpy as np
+
+from airbnb_model.compiled import compile_model_pipeline
+from airbnb_model.export import export_model, load_exported
+
+
+def _setup_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Exports a trained model for the lightweight inference runtime")
+
+    parser.add_argument("--model_path", type=str, default="models/model.joblib")
+    parser.add_argument("--output_path", type=str, default="models/model_export", help="directory of the export")
+
+    return parser
+
+
+if __name__ == "__main__":
+    warnings.filterwarnings("ignore", message="This Pipeline instance is not fitted yet", category=FutureWarning)
+    args = _setup_parser().parse_args()
+
+    compiled = compile_model_pipeline(joblib.load(args.model_path))
+    export_model(compiled, args.output_path)
+
+    # the export must predict exactly what the compiled pipeline predicts
+    record = compiled.example_record()
+    expected, exported = compiled.predict_one(record), load_exported(args.output_path).predict_one(record)
+    if not np.isclose(expected, exported, rtol=1e-9, atol=1e-9):
+        raise SystemExit(f"Exported model predicts {exported} instead of {expected}")
+    print(f"Exported {args.model_path} to {args.output_path}")
@@ -0,0 +1,27 @@
+import argparse
+
+from dotenv import load_dotenv
+
+from airbnb_model.data.db import connect
+from airbnb_model.data.ingest import CHUNK_SIZE, ingest
+
+
+def _setup_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Loads an Airbnb listings export into the database")
+
+    parser.add_argument("--csv_path", type=str, default="data/airbnb-listings.csv")
+    parser.add_argument("--city", type=str, default="Paris", help="city of the listings, must be in the city table")
+    parser.add_argument("--sep", type=str, default=";")
+    parser.add_argument("--chunk_size", type=int, default=CHUNK_SIZE, help="rows read, copied and merged at once")
+
+    return parser
+
+
+if __name__ == "__main__":
+    load_dotenv(".env")
+    args = _setup_parser().parse_args()
+
+    with connect() as conn:
+        stats = ingest(conn, args.csv_path, args.city, args.chunk_size, args.sep)
+
+    print(f"Loaded {stats['rows']} rows in {stats['seconds']:.1f} s ({stats['rows_per_second']:,.0f} rows/s)")
@@ -1,12 +1,24 @@
 import argparse
 import itertools
+import multiprocessing
+import os
 
-import mlflow
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Optional
+
+import numpy as np
 import yaml
 import warnings
 
 from dotenv import load_dotenv
+from threadpoolctl import threadpool_limits
 
+from airbnb_model import tracking
+from airbnb_model.data.feature_cache import load_features
+from airbnb_model.data.make_dataset import make_dataset
+from airbnb_model.incremental import read_state, write_state
+from airbnb_model.model import copy_model, create_model_pipeline
+from airbnb_model.search import successive_halving
 from train import train
 
 
@@ -15,15 +27,108 @@ def _setup_parser() -> argparse.ArgumentParser:
 
     parser.add_argument("--grid_config_path", type=str, default="config/grid_search.yaml")
     parser.add_argument("--features_config_path", type=str, default="config/features.yaml")
+    parser.add_argument("--n_workers", type=int, default=1, help="number of grid configurations trained in parallel")
 
     return parser
 
 
+def _expand_grid(grid_config: dict[str, Any]) -> list[tuple[str, str, dict[str, Any]]]:
+    runs = []
+    for model in grid_config["models"]:
+        model_grid = dict(grid_config[model])
+        type_ = model_grid.pop("type")
+        feature_slots = model_grid.pop("feature_slots")
+
+        keys, values = zip(*model_grid.items())
+        all_configs = [dict(zip(keys, v)) for v in itertools.product(*values)]
+
+        for i, model_config in enumerate(all_configs):
+            run_name = f"{model}_{i+1}_" + "_".join([f"{k}={v}" for k, v in model_config.items()])
+            model_config["type"] = type_
+            model_config["feature_slots"] = feature_slots
+
+            # Create unique model path for each run
+            runs.append((run_name, f"models/model_{model}_{i+1}.joblib", model_config))
+
+    return runs
+
+
+def _run_config(
+    run_name: str,
+    model_path: str,
+    model_config: dict[str, Any],
+    train_params: dict[str, Any],
+    features_config: dict[str, Any],
+    dataset_version: str,
+    experiment_id: str,
+    parent_run_id: str,
+    n_threads: Optional[int] = None,
+) -> tuple[float, str, str]:
+    warnings.filterwarnings("ignore", message="This Pipeline instance is not fitted yet", category=FutureWarning)
+
+    temp_params = train_params.copy()
+    temp_params["output_path"] = model_path
+    if n_threads is not None and model_config["type"] == "xgboost":
+        model_config = {"n_jobs": n_threads, **model_config}
+
+    # BLAS / OpenMP threads of the model share the cores with the other workers
+    with threadpool_limits(limits=n_threads), tracking.start_run(
+        experiment_id=experiment_id, run_name=run_name, nested=True, parent_run_id=parent_run_id
+    ) as run_logger:
+        # workers only read the parent's snapshot, the source may have changed since it was extracted
+        train(temp_params, model_config, features_config, dataset_version)
+
+    # the logger keeps the logged values, no need to read the run back from the tracking server
+    return run_logger.metrics.get("mae", float("inf")), run_logger.run_id, model_path
+
+
+def _evaluate_rung(
+    run: tuple[str, str, dict[str, Any]],
+    fraction: float,
+    rung: int,
+    search_config: dict[str, Any],
+    train_params: dict[str, Any],
+    features_config: dict[str, Any],
+    dataset_version: str,
+) -> float:
+    run_name, _, model_config = run
+    # rungs are ranked on a validation part of the training split, the test split is kept for the final runs; the
+    # data pipeline is fitted without the validation rows, so their prices don't leak into the neighbourhood features
+    _, X_fit, X_val, y_fit, y_val = load_features(
+        dataset_version,
+        train_params,
+        model_config,
+        features_config,
+        train_params.get("feature_cache_dir"),
+        validation_fraction=search_config["validation_fraction"],
+    )
+
+    resource = search_config["resources"][model_config["type"]]
+    model_config = dict(model_config)
+    n_fit = len(y_fit)
+    if resource == "data_fraction":
+        # the split shuffled the rows, the first ones are a random subset
+        n_fit = max(1, int(n_fit * fraction))
+        resource_value = fraction
+    else:
+        resource_value = max(1, round(model_config[resource] * fraction))
+        model_config[resource] = resource_value
+
+    with tracking.start_run(nested=True, run_name=f"{run_name}_rung{rung}"):
+        tracking.log_params({"rung": rung, "resource": resource, "resource_value": resource_value})
+        model = create_model_pipeline(model_config, features_config, model_config["feature_slots"]).named_steps["model"]
+        model.fit(X_fit[:n_fit], y_fit[:n_fit])
+        val_mae = float(np.mean(np.abs(y_val - model.predict(X_val))))
+        tracking.log_metrics({"val_mae": val_mae, "resource_fraction": fraction})
+
+    return val_mae
+
+
 if __name__ == "__main__":
     # setup
     load_dotenv(".env")
     args = _setup_parser().parse_args()
-    
+
     # Filter sklearn pipeline warnings
     warnings.filterwarnings("ignore", message="This Pipeline instance is not fitted yet", category=FutureWarning)
 
@@ -34,49 +139,71 @@ if __name__ == "__main__":
         features_config = yaml.load(f, Loader=yaml.FullLoader)
 
     # Parent run for the entire grid search experiment
-    with mlflow.start_run(run_name="Grid_Search_Experiment") as parent_run:
-        mlflow.log_params({"experiment_type": "grid_search", "models": grid_config["models"]})
-        
-        best_mae = float('inf')
-        best_run_id = None
-        best_model_path = None
-        
-        for model in grid_config["models"]:
-            type_ = grid_config[model]["type"]
-            feature_slots = grid_config[model]["feature_slots"]
-            del grid_config[model]["type"], grid_config[model]["feature_slots"]
-
-            keys, values = zip(*grid_config[model].items())
-            all_configs = [dict(zip(keys, v)) for v in itertools.product(*values)]
-            
-            for i, model_config in enumerate(all_configs):
-                model_config["type"] = type_
-                model_config["feature_slots"] = feature_slots
-                
-                run_name = f"{model}_{i+1}_" + "_".join([f"{k}={v}" for k, v in model_config.items() if k not in ["type", "feature_slots"]])
-                
-                # Create unique model path for each run
-                model_path = f"models/model_{model}_{i+1}.joblib"
-                temp_params = grid_config["params"].copy()
-                temp_params["output_path"] = model_path
-                
-                with mlflow.start_run(nested=True, run_name=run_name) as child_run:
-                    train(temp_params, model_config, features_config)
-                    
-                    # Track best model
-                    current_mae = mlflow.get_run(child_run.info.run_id).data.metrics.get("mae", float('inf'))
-                    if current_mae < best_mae:
-                        best_mae = current_mae
-                        best_run_id = child_run.info.run_id
-                        best_model_path = model_path
-        
+    with tracking.start_run(run_name="Grid_Search_Experiment") as parent_run:
+        tracking.log_params(
+            {"experiment_type": "grid_search", "models": grid_config["models"], "n_workers": args.n_workers}
+        )
+        # extract the dataset once, before any worker needs it
+        dataset_version = make_dataset(grid_config["params"]["data_path"], features_config)
+        tracking.log_param("dataset_version", dataset_version)
+
+        runs = _expand_grid(grid_config)
+        search_config = grid_config.get("search", {"strategy": "grid"})
+        tracking.log_param("search_strategy", search_config["strategy"])
+        if search_config["strategy"] == "successive_halving":
+            runs = successive_halving(
+                runs,
+                lambda run, fraction, rung: _evaluate_rung(
+                    run, fraction, rung, search_config, grid_config["params"], features_config, dataset_version
+                ),
+                eta=search_config["eta"],
+                min_fraction=search_config["min_fraction"],
+            )
+            tracking.log_param("n_full_runs", len(runs))
+        elif search_config["strategy"] != "grid":
+            raise NotImplementedError(f"Unknown search strategy '{search_config['strategy']}'")
+
+        if not runs:
+            print("No configurations to train, check the grid and the search settings.")
+            exit(1)
+
+        run_args = (
+            grid_config["params"],
+            features_config,
+            dataset_version,
+            parent_run.experiment_id,
+            parent_run.run_id,
+        )
+
+        if args.n_workers > 1:
+            # fit every distinct data pipeline once here, workers load the transformed features from disk
+            for _, _, model_config in runs:
+                load_features(
+                    dataset_version,
+                    grid_config["params"],
+                    model_config,
+                    features_config,
+                    grid_config["params"].get("feature_cache_dir"),
+                )
+
+            n_threads = max(1, (os.cpu_count() or 1) // args.n_workers)
+            # spawn -> workers don't inherit OpenMP / MLflow state of this process
+            with ProcessPoolExecutor(args.n_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                futures = [executor.submit(_run_config, *run, *run_args, n_threads) for run in runs]
+                results = [future.result() for future in futures]
+        else:
+            results = [_run_config(*run, *run_args) for run in runs]
+
+        # Track best model
+        best_mae, best_run_id, best_model_path = min(results, key=lambda result: result[0])
+
         # Copy the best model to the standard location
-        if best_model_path:
-            import shutil
-            shutil.copy2(best_model_path, "models/model.joblib")
-            print(f"Best model copied to models/model.joblib")
-        
+        copy_model(best_model_path, "models/model.joblib")
+        # the watermark of the copied model, so `train.py --incremental` can continue from it
+        write_state("models/model.joblib", read_state(best_model_path))
+        print(f"Best model copied to models/model.joblib")
+
         # Log best model info to parent run
-        mlflow.log_metrics({"best_mae": best_mae})
-        mlflow.log_params({"best_run_id": best_run_id, "best_model_path": best_model_path})
+        tracking.log_metrics({"best_mae": best_mae})
+        tracking.log_params({"best_run_id": best_run_id, "best_model_path": best_model_path})
         print(f"Best model MAE: {best_mae:.4f} (Run ID: {best_run_id})")
@@ -0,0 +1,177 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+import warnings
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Optional
+
+import joblib
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from threadpoolctl import threadpool_limits
+
+from airbnb_model.compiled import compile_model_pipeline
+
+
+MANIFEST_NAME = "_manifest.json"
+
+# set in the parent before the pool forks, workers share the loaded model copy-on-write
+_model = None
+
+
+def _setup_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Scores a Parquet dataset with a trained model")
+
+    parser.add_argument("--model_path", type=str, default="models/model.joblib")
+    parser.add_argument("--data_path", type=str, default="data/raw.parquet", help="Parquet file or directory")
+    parser.add_argument("--output_dir", type=str, default="data/predictions")
+    parser.add_argument("--keep_columns", type=str, nargs="*", default=[], help="input columns copied to the output")
+    parser.add_argument("--n_workers", type=int, default=os.cpu_count() or 1)
+
+    return parser
+
+
+def _input_files(data_path: str) -> list[str]:
+    if os.path.isdir(data_path):
+        return sorted(glob.glob(os.path.join(data_path, "**", "*.parquet"), recursive=True))
+
+    return [data_path]
+
+
+def _tasks(files: list[str]) -> list[tuple[str, int, int, str]]:
+    """One task per row group: (input file, row group, index of its first row, output part name)"""
+    tasks, first_row = [], 0
+    for i, path in enumerate(files):
+        metadata = pq.ParquetFile(path).metadata
+        for row_group in range(metadata.num_row_groups):
+            tasks.append((path, row_group, first_row, f"part-{i:05d}-{row_group:05d}.parquet"))
+            first_row += metadata.row_group(row_group).num_rows
+
+    return tasks
+
+
+def _check_manifest(output_dir: str, manifest: dict[str, Any]) -> None:
+    """Parts of an earlier run are only reused if they were scored by the same model on the same input"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            previous = json.load(f)
+        if previous != manifest:
+            raise SystemExit(f"{output_dir} holds predictions of another model or input, use a new --output_dir")
+    else:
+        with open(path, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+
+def _file_version(path: str) -> str:
+    stat = os.stat(path)
+
+    return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+
+def _predict(data):
+    if hasattr(_model, "predict_columns"):
+        return _model.predict_columns(data)
+
+    return _model.predict(data)
+
+
+def _init_worker(n_threads: int) -> None:
+    warnings.filterwarnings("ignore", message="This Pipeline instance is not fitted yet", category=FutureWarning)
+    threadpool_limits(limits=n_threads)
+    if getattr(_model, "model_kind", None) == "xgboost":
+        _model.model_params["booster"].set_param({"nthread": n_threads})
+
+
+def _score_row_group(
+    path: str, row_group: int, first_row: int, part_name: str, output_dir: str, keep_columns: list[str]
+) -> int:
+    data = pq.ParquetFile(path).read_row_group(row_group).to_pandas()
+    predictions = _predict(data)
+
+    table = pa.table(
+        {
+            "row": np.arange(first_row, first_row + len(data), dtype=np.int64),
+            **{column: data[column].to_numpy() for column in keep_columns},
+            "predicted_price": np.asarray(predictions, dtype=np.float64),
+        }
+    )
+    # write-then-rename, so a crash never leaves a partial part behind for the resume to trust
+    tmp_path = os.path.join(output_dir, f".{part_name}.tmp")
+    pq.write_table(table, tmp_path)
+    os.replace(tmp_path, os.path.join(output_dir, part_name))
+
+    return len(data)
+
+
+def score(
+    model_path: str, data_path: str, output_dir: str, keep_columns: Optional[list[str]] = None, n_workers: int = 1
+) -> int:
+    """Scores every row group of `data_path` into its own part file in `output_dir`, returns the scored rows.
+
+    Parts that already exist are skipped, so an interrupted run continues where it stopped. Each worker holds a
+    single row group at a time, so memory does not grow with the input size.
+    """
+    global _model
+
+    keep_columns = keep_columns or []
+    os.makedirs(output_dir, exist_ok=True)
+    files = _input_files(data_path)
+    _check_manifest(
+        output_dir,
+        {
+            "model_path": os.path.abspath(model_path),
+            "model_version": _file_version(model_path),
+            "inputs": {os.path.abspath(path): _file_version(path) for path in files},
+            "keep_columns": keep_columns,
+        },
+    )
+
+    tasks = _tasks(files)
+    pending = [task for task in tasks if not os.path.exists(os.path.join(output_dir, task[3]))]
+    print(f"{len(tasks)} row groups, {len(tasks) - len(pending)} already scored")
+    if not pending:
+        return 0
+
+    model_pipeline = joblib.load(model_path)
+    try:
+        _model = compile_model_pipeline(model_pipeline)
+    except NotImplementedError:
+        _model = model_pipeline
+
+    n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+    start, num_rows = time.perf_counter(), 0
+
+    def _report(done: int) -> None:
+        elapsed = time.perf_counter() - start
+        print(f"{done}/{len(pending)} row groups, {num_rows} rows, {num_rows / elapsed:,.0f} rows/s")
+
+    if n_workers > 1:
+        # fork -> the workers inherit the loaded model instead of unpickling their own copy
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(
+            n_workers, mp_context=context, initializer=_init_worker, initargs=(n_threads,)
+        ) as pool:
+            futures = [pool.submit(_score_row_group, *task, output_dir, keep_columns) for task in pending]
+            for done, future in enumerate(as_completed(futures), start=1):
+                num_rows += future.result()
+                _report(done)
+    else:
+        _init_worker(n_threads)
+        for done, task in enumerate(pending, start=1):
+            num_rows += _score_row_group(*task, output_dir, keep_columns)
+            _report(done)
+
+    return num_rows
+
+
+if __name__ == "__main__":
+    args = _setup_parser().parse_args()
+
+    score(args.model_path, args.data_path, args.output_dir, args.keep_columns, args.n_workers)
@@ -1,63 +1,152 @@
 import argparse
 import warnings
 
-from typing import Any
+from typing import Any, Optional
 
 import joblib
 import mlflow
 import numpy as np
-import pandas as pd
 import yaml
 
 from dotenv import load_dotenv
-from scipy.stats import bootstrap
 from sklearn.model_selection import train_test_split
 
-from airbnb_model.data.make_dataset import make_dataset
+from airbnb_model import tracking
+from airbnb_model.data.feature_cache import load_features
 from airbnb_model.data.feature_pipeline import parse_target_from_config
+from airbnb_model.data.make_dataset import make_dataset, new_listings, read_manifest
+from airbnb_model.evaluation import bootstrap_metrics
+from airbnb_model.incremental import UPDATABLE_MODELS, read_state, update_model, update_scaler, write_state
+from airbnb_model.profiling import StepProfiler, log_profile, profile
 
-from airbnb_model.model import create_model_pipeline
+from airbnb_model.model import create_model_pipeline, save_model_pipeline
 
 
-def train(train_config: dict[str, Any], model_config: dict[str, Any], features_config: dict[str, Any]) -> None:
-    mlflow.log_params(model_config)
-    mlflow.log_params(train_config)
-    mlflow.log_params(features_config)
+def train(
+    train_config: dict[str, Any],
+    model_config: dict[str, Any],
+    features_config: dict[str, Any],
+    dataset_version: Optional[str] = None,
+) -> None:
+    """Trains, evaluates and saves a model; pass the `dataset_version` of an already extracted snapshot to reuse it"""
+    tracking.log_params(model_config)
+    tracking.log_params(train_config)
+    tracking.log_params(features_config)
 
     # READ DATA
-    make_dataset(train_config["data_path"], features_config)
-    data = pd.read_parquet(train_config["data_path"])
-
-    target_col = parse_target_from_config(features_config)
-    df = data.drop(target_col, axis=1)
-    target = data[target_col]
-    X_train, X_test, y_train, y_test = train_test_split(
-        df, target, test_size=train_config["test_size"], random_state=train_config["seed"]
+    if dataset_version is None:
+        dataset_version = make_dataset(train_config["data_path"], features_config)
+    tracking.log_param("dataset_version", dataset_version)
+    profiler = StepProfiler(track_memory=True) if train_config.get("profile", False) else None
+    data_pipeline, X_train, X_test, y_train, y_test = load_features(
+        dataset_version, train_config, model_config, features_config, train_config.get("feature_cache_dir"), profiler
     )
 
-    model_pipeline = create_model_pipeline(model_config, features_config, model_config["feature_slots"])
-    model_pipeline.fit(X_train, y_train)
+    # only the model is fitted here, the data pipeline comes fitted from the feature cache
+    model_pipeline = create_model_pipeline(
+        model_config, features_config, model_config["feature_slots"], data_pipeline=data_pipeline
+    )
+    model = model_pipeline.named_steps["model"]
+    with profile(model_pipeline, profiler):
+        model.fit(X_train, y_train)
 
-    y_pred = model_pipeline.predict(X_test)
+        y_pred = model.predict(X_test)
+    if profiler is not None:
+        log_profile(profiler)
 
     # EVALUATION
     maes = np.abs(y_test - y_pred)
-    res = bootstrap((maes,), np.mean, n_resamples=train_config["num_bootstrap"])
-    print(f"MAE: {np.mean(maes):.4f}, ({res.confidence_interval.low:.4f}, {res.confidence_interval.high:.4f})")
-    mlflow.log_metric("mae", np.mean(maes))
-    mlflow.log_metric("mae-low", res.confidence_interval.low)
-    mlflow.log_metric("mae-high", res.confidence_interval.high)
-
-    mses = maes**2
-    res = bootstrap((mses,), np.mean, n_resamples=train_config["num_bootstrap"])
-    print(f"MSE: {np.mean(mses):.4f}, ({res.confidence_interval.low:.4f}, {res.confidence_interval.high:.4f})")
-    mlflow.log_metric("mse", np.mean(mses))
-    mlflow.log_metric("mse-low", res.confidence_interval.low)
-    mlflow.log_metric("mse-high", res.confidence_interval.high)
+    results = bootstrap_metrics(
+        {"mae": maes, "mse": maes**2},
+        n_resamples=train_config["num_bootstrap"],
+        method=train_config.get("ci_method", "bca"),
+        random_state=train_config["seed"],
+    )
+    for metric, (estimate, low, high) in results.items():
+        print(f"{metric.upper()}: {estimate:.4f}, ({low:.4f}, {high:.4f})")
+        tracking.log_metrics({metric: estimate, f"{metric}-low": low, f"{metric}-high": high})
 
     # SAVE MODEL
-    joblib.dump(model_pipeline, train_config["output_path"])
+    save_model_pipeline(model_pipeline, train_config["output_path"])
     mlflow.log_artifact(train_config["output_path"])
+    write_state(
+        train_config["output_path"],
+        {
+            "watermark": read_manifest(train_config["data_path"])["fingerprint"]["max_listing_id"],
+            "dataset_version": dataset_version,
+            "run_id": mlflow.active_run().info.run_id,
+            "updates": [],
+        },
+    )
+
+
+def retrain(train_config: dict[str, Any], model_config: dict[str, Any], features_config: dict[str, Any]) -> None:
+    """Updates the saved model with the listings stored since it was last trained, see `update_model`.
+
+    The new listings are split into update and holdout rows; the updated model replaces the saved one only if its
+    holdout MAE is not worse than the previous model's, otherwise the watermark stays and the rows are used next time.
+    """
+    if model_config["type"] not in UPDATABLE_MODELS:
+        raise NotImplementedError(f"{model_config['type']} models can't be updated incrementally, retrain them")
+
+    tracking.log_params(model_config)
+    tracking.log_params(train_config)
+    tracking.log_param("incremental", True)
+
+    model_path = train_config["output_path"]
+    state = read_state(model_path)
+    if state is None:
+        print(f"No training state next to {model_path}, train a full model first.")
+        return
+
+    # READ NEW DATA
+    data, watermark = new_listings(features_config, state["watermark"])
+    tracking.log_params({"previous_watermark": state["watermark"], "watermark": watermark, "new_rows": len(data)})
+    if len(data) < train_config.get("min_new_rows", 100):
+        print(f"Only {len(data)} new listings since listing_id {state['watermark']}, nothing to update.")
+        return
+
+    target_col = parse_target_from_config(features_config)
+    X_update, X_holdout, y_update, y_holdout = train_test_split(
+        data.drop(target_col, axis=1),
+        data[target_col],
+        test_size=train_config["test_size"],
+        random_state=train_config["seed"],
+    )
+
+    # UPDATE MODEL
+    previous_pipeline = joblib.load(model_path)
+    model_pipeline = joblib.load(model_path)
+    data_pipeline, model = model_pipeline.named_steps["data_pipeline"], model_pipeline.named_steps["model"]
+    if model_config["type"] != "xgboost":
+        # trees split on the scaled values, moving the scaler would shift every threshold the booster learned
+        update_scaler(data_pipeline, X_update)
+    update_model(model, model_config, data_pipeline.transform(X_update), y_update.to_numpy())
+
+    # EVALUATION
+    previous_maes = np.abs(y_holdout - previous_pipeline.predict(X_holdout))
+    maes = np.abs(y_holdout - model_pipeline.predict(X_holdout))
+    results = bootstrap_metrics(
+        {"mae": maes, "previous_mae": previous_maes, "mae_change": maes - previous_maes},
+        n_resamples=train_config["num_bootstrap"],
+        method=train_config.get("ci_method", "bca"),
+        random_state=train_config["seed"],
+    )
+    for metric, (estimate, low, high) in results.items():
+        print(f"{metric.upper()}: {estimate:.4f}, ({low:.4f}, {high:.4f})")
+        tracking.log_metrics({metric: estimate, f"{metric}-low": low, f"{metric}-high": high})
+
+    accepted = results["mae"][0] <= results["previous_mae"][0]
+    tracking.log_param("accepted", accepted)
+    if not accepted:
+        print(f"The updated model is worse on the holdout, keeping {model_path}.")
+        return
+
+    # SAVE MODEL
+    save_model_pipeline(model_pipeline, model_path)
+    mlflow.log_artifact(model_path)
+    state["updates"].append({"run_id": mlflow.active_run().info.run_id, "watermark": watermark, "rows": len(data)})
+    write_state(model_path, {**state, "watermark": watermark})
 
 
 def _setup_parser() -> argparse.ArgumentParser:
@@ -65,6 +154,9 @@ def _setup_parser() -> argparse.ArgumentParser:
 
     parser.add_argument("--train_config_path", type=str, default="config/train.yaml")
     parser.add_argument("--features_config_path", type=str, default="config/features.yaml")
+    parser.add_argument(
+        "--incremental", action="store_true", help="update the saved model with the listings added since its training"
+    )
 
     return parser
 
@@ -88,5 +180,8 @@ if __name__ == "__main__":
     with open(args.features_config_path, "r") as f:
         features_config = yaml.load(f, Loader=yaml.FullLoader)
 
-    with mlflow.start_run():
-        train(run_config["params"], model_config, features_config)
+    with tracking.start_run():
+        if args.incremental:
+            retrain(run_config["params"], model_config, features_config)
+        else:
+            train(run_config["params"], model_config, features_config)
@@ -0,0 +1,97 @@
+import os
+import warnings
+
+import mlflow
+import pandas as pd
+import pytest
+import yaml
+
+from sklearn.exceptions import ConvergenceWarning
+
+from airbnb_model.data.synthetic import make_listings
+from airbnb_model.model import create_model_pipeline
+
+
+CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config")
+
+FEATURE_SLOTS = [
+    "neighbourhood_name",
+    "property_type_name",
+    "room_type_name",
+    "bed_type_name",
+    "accommodates",
+    "bathrooms",
+    "bedrooms",
+    "beds",
+    "minimum_nights",
+    "longitude_to_center",
+    "latitude_to_center",
+    "distance_to_center",
+]
+KNN_SLOTS = ["knn_median_price", "knn_density"]
+
+MODEL_CONFIGS = {
+    "ridge-onehot": {"type": "ridge", "categorical_encoding": "onehot"},
+    "ridge-sparse": {"type": "ridge", "categorical_encoding": "sparse"},
+    "mlp-sparse": {"type": "mlp", "categorical_encoding": "sparse", "hidden_layer_sizes": [16], "max_iter": 20},
+    "mlp-streaming": {
+        "type": "mlp",
+        "backend": "streaming",
+        "categorical_encoding": "onehot",
+        "hidden_layer_sizes": [16, 8],
+        "max_iter": 5,
+        "log_training": False,
+    },
+    "xgboost-native": {"type": "xgboost", "categorical_encoding": "native", "n_estimators": 20},
+    "xgboost-sparse": {"type": "xgboost", "categorical_encoding": "sparse", "n_estimators": 20},
+}
+
+
+@pytest.fixture(autouse=True)
+def mlflow_tracking(tmp_path, monkeypatch):
+    """Keeps the training metrics that models log to MLflow in a temporary file store"""
+    monkeypatch.setenv("MLFLOW_ALLOW_FILE_STORE", "true")
+    mlflow.set_tracking_uri(f"file://{tmp_path}/mlruns")
+    yield
+    mlflow.end_run()
+
+
+@pytest.fixture(scope="session")
+def features_config() -> dict:
+    with open(os.path.join(CONFIG_DIR, "features.yaml"), "r") as f:
+        return yaml.safe_load(f)
+
+
+@pytest.fixture(scope="session")
+def listings() -> pd.DataFrame:
+    return make_listings(400, n_neighbourhoods=12, seed=0)
+
+
+@pytest.fixture
+def fit_pipeline(features_config, listings):
+    """Fits a `create_model_pipeline` pipeline of a model config on the listings"""
+
+    def fit(model_config: dict, feature_slots: list[str] = FEATURE_SLOTS):
+        pipeline = create_model_pipeline({**model_config, "random_state": 0}, features_config, feature_slots)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            pipeline.fit(listings.drop(columns="price"), listings["price"])
+
+        return pipeline
+
+    return fit
+
+
+@pytest.fixture(params=list(MODEL_CONFIGS))
+def model_config(request) -> dict:
+    return MODEL_CONFIGS[request.param]
+
+
+@pytest.fixture
+def feature_slots() -> list[str]:
+    return FEATURE_SLOTS + KNN_SLOTS
+
+
+@pytest.fixture
+def fitted_pipeline(fit_pipeline, model_config, feature_slots):
+    return fit_pipeline(model_config, feature_slots)
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+import pytest
+
+from airbnb_model.batching import MicroBatcher
+
+
+class RecordingModel:
+    """predict_fn that doubles its items and records the batches it was called with"""
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        time.sleep(self.delay)
+
+        return [item * 2 for item in items]
+
+
+async def _submit_all(batcher: MicroBatcher, items, **kwargs):
+    return await asyncio.gather(*[batcher.submit(item) for item in items], **kwargs)
+
+
+def test_batches_up_to_max_batch_size():
+    model = RecordingModel()
+
+    async def run():
+        batcher = MicroBatcher(model, max_batch_size=4, max_wait_ms=50)
+        await batcher.start()
+        results = await _submit_all(batcher, range(10))
+        await batcher.stop()
+        return results
+
+    assert asyncio.run(run()) == [item * 2 for item in range(10)]
+    assert [len(batch) for batch in model.batches] == [4, 4, 2]
+
+
+def test_flushes_after_max_wait():
+    model = RecordingModel()
+
+    async def run():
+        batcher = MicroBatcher(model, max_batch_size=64, max_wait_ms=30)
+        await batcher.start()
+        start = time.perf_counter()
+        result = await batcher.submit(1)
+        elapsed = time.perf_counter() - start
+        await batcher.stop()
+        return result, elapsed
+
+    result, elapsed = asyncio.run(run())
+    assert result == 2
+    assert 0.025 <= elapsed < 1.0
+    assert model.batches == [[1]]
+
+
+def test_results_go_to_their_callers():
+    model = RecordingModel()
+
+    async def run():
+        batcher = MicroBatcher(model, max_batch_size=8, max_wait_ms=20)
+        await batcher.start()
+        items = [5, 3, 9, 1, 7, 2, 8, 4, 6, 0]
+        results = await _submit_all(batcher, items)
+        await batcher.stop()
+        return items, results
+
+    items, results = asyncio.run(run())
+    assert results == [item * 2 for item in items]
+    assert len(model.batches) == 2
+
+
+def test_exception_reaches_every_waiter():
+    error = ValueError("model failed")
+    calls = []
+
+    def predict_fn(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise error
+        return items
+
+    async def run():
+        batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=20)
+        await batcher.start()
+        failed = await _submit_all(batcher, range(3), return_exceptions=True)
+        # the batcher keeps serving after a failed batch
+        recovered = await batcher.submit(42)
+        await batcher.stop()
+        return failed, recovered
+
+    failed, recovered = asyncio.run(run())
+    assert failed == [error, error, error]
+    assert recovered == 42
+
+
+def test_stop_drains_the_queue():
+    model = RecordingModel(delay=0.02)
+
+    async def run():
+        batcher = MicroBatcher(model, max_batch_size=2, max_wait_ms=1000)
+        await batcher.start()
+        tasks = [asyncio.create_task(batcher.submit(item)) for item in range(7)]
+        await asyncio.sleep(0)  # let every submit reach the queue
+        await batcher.stop()
+        assert all(task.done() for task in tasks)
+        with pytest.raises(RuntimeError, match="not running"):
+            await batcher.submit(100)
+        return [task.result() for task in tasks]
+
+    assert asyncio.run(run()) == [item * 2 for item in range(7)]
+    assert sorted(item for batch in model.batches for item in batch) == list(range(7))
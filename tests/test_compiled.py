@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from airbnb_model.compiled import compile_model_pipeline
+
+
+@pytest.fixture(params=[False, True], ids=["no-knn", "knn"])
+def feature_slots(request, feature_slots):
+    knn_slots = ["knn_median_price", "knn_density"]
+
+    return feature_slots if request.param else [slot for slot in feature_slots if slot not in knn_slots]
+
+
+def test_compiled_matches_pipeline(fitted_pipeline, listings):
+    compiled = compile_model_pipeline(fitted_pipeline)
+    assert compiled.model_kind != "estimator"
+
+    X = listings.drop(columns="price")
+    np.testing.assert_allclose(compiled.predict_columns(X), fitted_pipeline.predict(X), rtol=1e-9, atol=1e-9)
+
+
+def test_compiled_records_match_columns(fitted_pipeline, listings):
+    compiled = compile_model_pipeline(fitted_pipeline)
+
+    X = listings.drop(columns="price").head(20)
+    records = X.astype({column: object for column in X.select_dtypes("category")}).to_dict("records")
+    np.testing.assert_allclose(compiled.predict(records), compiled.predict_columns(X), rtol=1e-12)
+    assert compiled.predict_one(records[0]) == pytest.approx(compiled.predict(records[:1])[0], rel=1e-12)
+
+
+def test_compiled_handles_unknown_categories(fitted_pipeline, listings):
+    compiled = compile_model_pipeline(fitted_pipeline)
+
+    X = listings.drop(columns="price").head(20).astype({"neighbourhood_name": object, "property_type_name": object})
+    X.loc[:4, "neighbourhood_name"] = "Unknown neighbourhood"
+    X.loc[3:7, "property_type_name"] = "Castle"
+    X = X.astype({"neighbourhood_name": "category", "property_type_name": "category"})
+    np.testing.assert_allclose(compiled.predict_columns(X), fitted_pipeline.predict(X), rtol=1e-9, atol=1e-9)
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from scipy import stats
+
+from airbnb_model.evaluation import CI_METHODS, PoissonBootstrap, _acceleration, bootstrap_metrics
+
+
+N_RESAMPLES = 5000
+
+
+@pytest.fixture(scope="module")
+def losses() -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(0)
+    errors = rng.gamma(2.0, 15.0, 300) * rng.choice([-1, 1], 300)
+
+    return {"mae": np.abs(errors), "mse": errors**2}
+
+
+def scipy_interval(losses: np.ndarray, method: str) -> tuple[float, float]:
+    result = stats.bootstrap((losses,), np.mean, n_resamples=N_RESAMPLES, method=method, random_state=1)
+
+    return result.confidence_interval.low, result.confidence_interval.high
+
+
+@pytest.mark.parametrize("method", CI_METHODS)
+def test_bootstrap_matches_scipy(losses, method):
+    intervals = bootstrap_metrics(losses, n_resamples=N_RESAMPLES, method=method, random_state=0)
+
+    for name, values in losses.items():
+        estimate, low, high = intervals[name]
+        expected_low, expected_high = scipy_interval(values, method)
+        assert estimate == pytest.approx(values.mean())
+        # different resamples, so the endpoints agree up to Monte Carlo error
+        tolerance = 0.05 * (expected_high - expected_low)
+        assert low == pytest.approx(expected_low, abs=tolerance)
+        assert high == pytest.approx(expected_high, abs=tolerance)
+
+
+def test_bootstrap_chunks_do_not_change_result(losses):
+    expected = bootstrap_metrics(losses, n_resamples=500, random_state=0)
+
+    assert bootstrap_metrics(losses, n_resamples=500, chunk_size=7, random_state=0) == expected
+    assert bootstrap_metrics(losses, n_resamples=500, chunk_size=500, random_state=0) == expected
+
+
+def test_bootstrap_metrics_share_resamples(losses):
+    both = bootstrap_metrics(losses, n_resamples=500, random_state=0)
+
+    mae = bootstrap_metrics({"mae": losses["mae"]}, n_resamples=500, random_state=0)["mae"]
+    assert mae == pytest.approx(both["mae"], rel=1e-12)
+
+
+def test_acceleration_matches_jackknife(losses):
+    values = losses["mse"]
+    # jackknife estimate of the acceleration, as in scipy.stats.bootstrap's BCa
+    theta_jack = (values.sum() - values) / (len(values) - 1)
+    centered = theta_jack.mean() - theta_jack
+    expected = (centered**3).sum() / (6 * (centered**2).sum() ** 1.5)
+
+    centered_losses = values - values.mean()
+    moments = (np.array([(centered_losses**2).sum()]), np.array([(centered_losses**3).sum()]))
+    assert _acceleration(moments)[0] == pytest.approx(expected)
+
+
+def test_bootstrap_constant_losses():
+    estimate, low, high = bootstrap_metrics({"mae": np.full(50, 3.0)}, n_resamples=200, random_state=0)["mae"]
+
+    assert estimate == low == high == 3.0
+
+
+def test_bootstrap_unknown_method(losses):
+    with pytest.raises(ValueError, match="Unknown CI method"):
+        bootstrap_metrics(losses, n_resamples=10, method="studentized")
+
+
+@pytest.mark.parametrize("method", CI_METHODS)
+def test_poisson_bootstrap_matches_scipy(losses, method):
+    bootstrap = PoissonBootstrap(list(losses), n_resamples=N_RESAMPLES, random_state=0)
+    for start in range(0, 300, 64):
+        bootstrap.update({name: values[start : start + 64] for name, values in losses.items()})
+    intervals = bootstrap.confidence_intervals(method=method)
+
+    for name, values in losses.items():
+        estimate, low, high = intervals[name]
+        expected_low, expected_high = scipy_interval(values, method)
+        assert estimate == pytest.approx(values.mean())
+        tolerance = 0.1 * (expected_high - expected_low)
+        assert low == pytest.approx(expected_low, abs=tolerance)
+        assert high == pytest.approx(expected_high, abs=tolerance)
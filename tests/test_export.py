@@ -0,0 +1,50 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from airbnb_model.compiled import compile_model_pipeline
+from airbnb_model.export import SPEC_NAME, export_model, is_exported, load_exported
+
+
+RIDGE_CONFIG = {"type": "ridge", "categorical_encoding": "sparse"}
+XGBOOST_CONFIG = {"type": "xgboost", "categorical_encoding": "native", "n_estimators": 20}
+
+
+def test_export_round_trip(fitted_pipeline, listings, tmp_path):
+    compiled = compile_model_pipeline(fitted_pipeline)
+
+    path = str(tmp_path / "export")
+    export_model(compiled, path)
+    assert is_exported(path)
+    exported = load_exported(path)
+
+    X = listings.drop(columns="price")
+    assert exported.model_kind == compiled.model_kind
+    np.testing.assert_allclose(exported.predict_columns(X), compiled.predict_columns(X), rtol=1e-12, atol=1e-12)
+    record = compiled.example_record()
+    assert exported.predict_one(record) == pytest.approx(compiled.predict_one(record), rel=1e-12)
+
+
+def test_export_replaces_existing(fit_pipeline, tmp_path):
+    path = str(tmp_path / "export")
+    export_model(compile_model_pipeline(fit_pipeline(RIDGE_CONFIG)), path)
+    export_model(compile_model_pipeline(fit_pipeline(XGBOOST_CONFIG)), path)
+
+    assert load_exported(path).model_kind == "xgboost"
+    assert [name for name in os.listdir(tmp_path) if name not in ("export", "mlruns")] == []
+
+
+def test_load_rejects_other_format(fit_pipeline, tmp_path):
+    path = str(tmp_path / "export")
+    export_model(compile_model_pipeline(fit_pipeline(RIDGE_CONFIG)), path)
+
+    with open(os.path.join(path, SPEC_NAME), "r") as f:
+        spec = json.load(f)
+    spec["format"] += 1
+    with open(os.path.join(path, SPEC_NAME), "w") as f:
+        json.dump(spec, f)
+
+    with pytest.raises(ValueError, match="export format"):
+        load_exported(path)
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from sklearn.model_selection import train_test_split
+
+from airbnb_model.data.feature_cache import load_features
+
+
+TRAIN_CONFIG = {"test_size": 0.2, "seed": 0}
+
+
+@pytest.fixture
+def model_config(feature_slots) -> dict:
+    return {"type": "ridge", "categorical_encoding": "onehot", "feature_slots": feature_slots}
+
+
+def _validation_rows(listings, validation_fraction):
+    train, _ = train_test_split(listings, test_size=TRAIN_CONFIG["test_size"], random_state=TRAIN_CONFIG["seed"])
+    _, validation = train_test_split(train, test_size=validation_fraction, random_state=TRAIN_CONFIG["seed"])
+
+    return validation.index
+
+
+@pytest.mark.parametrize("validation_fraction", [0.25, 0.5])
+def test_validation_prices_dont_leak_into_fit_features(
+    features_config, model_config, listings, tmp_path, validation_fraction
+):
+    changed = listings.copy()
+    changed.loc[_validation_rows(listings, validation_fraction), "price"] *= 10
+    feature_sets = []
+    for name, data in [("original", listings), ("changed", changed)]:
+        data.to_parquet(tmp_path / f"{name}.parquet")
+        train_config = {**TRAIN_CONFIG, "data_path": str(tmp_path / f"{name}.parquet")}
+        feature_sets.append(
+            load_features(name, train_config, model_config, features_config, validation_fraction=validation_fraction)
+        )
+
+    (_, X_fit, X_val, y_fit, y_val), (_, X_fit_changed, X_val_changed, y_fit_changed, y_val_changed) = feature_sets
+    assert len(y_val) == len(_validation_rows(listings, validation_fraction))
+    np.testing.assert_array_equal(y_fit, y_fit_changed)
+    np.testing.assert_allclose(X_fit, X_fit_changed)
+    np.testing.assert_allclose(X_val, X_val_changed)
+    np.testing.assert_allclose(y_val_changed, y_val * 10)
+
+
+def test_validation_split_has_its_own_cache_entry(features_config, model_config, listings, tmp_path):
+    listings.to_parquet(tmp_path / "listings.parquet")
+    train_config = {**TRAIN_CONFIG, "data_path": str(tmp_path / "listings.parquet")}
+
+    _, X_train, X_test, _, _ = load_features("cached", train_config, model_config, features_config)
+    _, X_fit, X_val, _, _ = load_features(
+        "cached", train_config, model_config, features_config, validation_fraction=0.25
+    )
+
+    assert X_fit.shape[0] + X_val.shape[0] == X_train.shape[0]
+    assert X_test.shape[0] == int(np.ceil(len(listings) * TRAIN_CONFIG["test_size"]))
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from geopy.distance import geodesic, great_circle
+
+from airbnb_model.data.geodesic import ellipsoidal_distance, geodesic_distance, haversine_distance
+
+
+# (lat1, lon1, lat2, lon2)
+POINTS = {
+    "paris-short": (48.8566, 2.3522, 48.8606, 2.3376),
+    "paris-london": (48.8566, 2.3522, 51.5074, -0.1278),
+    "new-york-sydney": (40.7128, -74.0060, -33.8688, 151.2093),
+    "equator-quarter": (0.0, 0.0, 0.0, 90.0),
+    "meridian": (-60.0, 10.0, 75.0, 10.0),
+    "near-pole": (89.9, 0.0, 89.9, 180.0),
+    "date-line": (10.0, 179.9, -10.0, -179.9),
+    "coincident": (45.0, 10.0, 45.0, 10.0),
+}
+ANTIPODAL_POINTS = {
+    "antipodal": (10.0, 20.0, -10.0, -160.0),
+    "equatorial-antipodal": (0.0, 0.0, 0.0, 179.5),
+    "near-antipodal": (0.0, 0.0, 0.5, 179.7),
+}
+
+
+@pytest.mark.parametrize(
+    "points", list(POINTS.values()) + list(ANTIPODAL_POINTS.values()), ids=[*POINTS, *ANTIPODAL_POINTS]
+)
+def test_haversine_matches_geopy_great_circle(points):
+    lat1, lon1, lat2, lon2 = points
+
+    assert haversine_distance(lat1, lon1, lat2, lon2) == pytest.approx(
+        great_circle((lat1, lon1), (lat2, lon2)).km, abs=1e-9
+    )
+
+
+@pytest.mark.parametrize("points", POINTS.values(), ids=POINTS)
+def test_ellipsoidal_matches_geopy_geodesic(points):
+    lat1, lon1, lat2, lon2 = points
+
+    assert ellipsoidal_distance(lat1, lon1, lat2, lon2) == pytest.approx(
+        geodesic((lat1, lon1), (lat2, lon2)).km, abs=1e-6
+    )
+
+
+@pytest.mark.parametrize("points", ANTIPODAL_POINTS.values(), ids=ANTIPODAL_POINTS)
+def test_ellipsoidal_near_antipodal_points_are_bounded(points):
+    lat1, lon1, lat2, lon2 = points
+    distance = ellipsoidal_distance(lat1, lon1, lat2, lon2)
+
+    assert np.isfinite(distance)
+    assert distance == pytest.approx(geodesic((lat1, lon1), (lat2, lon2)).km, abs=100)
+
+
+def test_ellipsoidal_near_antipodal_error():
+    # Vincenty doesn't converge here, the last iterate is ~3.7 km too long
+    error = ellipsoidal_distance(0.0, 0.0, 0.5, 179.7) - geodesic((0.0, 0.0), (0.5, 179.7)).km
+
+    assert error == pytest.approx(3.69, abs=0.01)
+
+
+@pytest.mark.parametrize("method, reference", [("haversine", great_circle), ("ellipsoidal", geodesic)])
+def test_vectorized_over_arrays(method, reference):
+    rng = np.random.default_rng(0)
+    lat1, lat2 = rng.uniform(-80, 80, (2, 50))
+    lon1, lon2 = rng.uniform(-180, 180, (2, 50))
+    # keep the pairs away from the antipodes, where the ellipsoidal method doesn't converge
+    lon2 = np.where(np.abs(np.abs(lon2 - lon1) - 180) < 5, lon2 + 20, lon2)
+
+    distances = geodesic_distance(lat1, lon1, lat2, lon2, method=method)
+
+    expected = [reference((a, b), (c, d)).km for a, b, c, d in zip(lat1, lon1, lat2, lon2)]
+    np.testing.assert_allclose(distances, expected, rtol=0, atol=1e-6)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError, match="Unknown geodesic method"):
+        geodesic_distance(0.0, 0.0, 1.0, 1.0, method="manhattan")
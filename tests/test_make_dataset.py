@@ -0,0 +1,116 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from airbnb_model.data import make_dataset
+from airbnb_model.data.make_dataset import (
+    _clean_chunk,
+    _dataset_version,
+    _extract,
+    _features_hash,
+    _parse_money,
+    _write_manifest,
+    manifest_path,
+    read_manifest,
+)
+
+
+COLUMN_TYPES = {
+    "listing_id": "int64",
+    "price": "float64",
+    "accommodates": "int64",
+    "neighbourhood_name": "category",
+    "host_name": "category",
+}
+COLUMNS = ["price", "accommodates", "neighbourhood_name"]
+FINGERPRINT = {"num_rows": 3, "max_listing_id": 12, "checksum": "-123456"}
+
+
+def _raw_chunk() -> pd.DataFrame:
+    """Rows as psycopg returns them: money as text, -1 for a missing number"""
+    return pd.DataFrame(
+        {
+            "listing_id": [10, 11, 12, 13, 14],
+            "price": ["$1,250.00", "$80.50", None, "$95.00", "$60.00"],
+            "accommodates": [4, -1, 2, 3, 2],
+            "neighbourhood_name": ["Louvre", "Opera", "Louvre", "Temple", "Opera"],
+            "host_name": ["Ann", "Bob", "Cid", None, "Eve"],
+        }
+    )
+
+
+def test_parse_money():
+    parsed = _parse_money(pd.Series(["$1,234.00", "$0.99", "free", None]))
+
+    np.testing.assert_array_equal(parsed, [1234.0, 0.99, np.nan, np.nan])
+
+
+def test_clean_chunk_drops_rows_with_a_missing_value_in_any_column():
+    chunk = _clean_chunk(_raw_chunk(), COLUMNS, COLUMN_TYPES)
+
+    # 11: accommodates is -1, 12: no price, 13: no host name, even though it isn't a selected column
+    assert list(chunk.columns) == COLUMNS
+    assert chunk.index.tolist() == [0, 4]
+    assert chunk["price"].tolist() == [1250.0, 60.0]
+    assert chunk.dtypes.astype(str).to_dict() == {
+        "price": "float64",
+        "accommodates": "int64",
+        "neighbourhood_name": "category",
+    }
+
+
+def test_clean_chunk_keeps_numeric_columns():
+    chunk = _raw_chunk().assign(price=[1250.0, 80.5, 70.0, 95.0, 60.0], host_name="Ann")
+
+    assert _clean_chunk(chunk, COLUMNS, COLUMN_TYPES)["price"].tolist() == [1250.0, 70.0, 95.0, 60.0]
+
+
+def test_features_hash_and_version_are_stable():
+    config = {"price": {"target": True}, "accommodates": {}}
+    reordered = dict(reversed(list(config.items())))
+
+    assert _features_hash(reordered) == _features_hash(config)
+    assert _features_hash({**config, "bedrooms": {}}) != _features_hash(config)
+    assert _dataset_version(FINGERPRINT, "a") == _dataset_version(dict(reversed(list(FINGERPRINT.items()))), "a")
+    assert _dataset_version({**FINGERPRINT, "num_rows": 4}, "a") != _dataset_version(FINGERPRINT, "a")
+    assert _dataset_version(FINGERPRINT, "b") != _dataset_version(FINGERPRINT, "a")
+
+
+def test_manifest_round_trip(tmp_path):
+    out_path = str(tmp_path / "dataset.parquet")
+    manifest = {"version": _dataset_version(FINGERPRINT, "a"), "fingerprint": FINGERPRINT, "num_rows": 3}
+
+    _write_manifest(out_path, manifest)
+    # a manifest without its snapshot doesn't count
+    assert read_manifest(out_path) is None
+
+    open(out_path, "wb").close()
+    assert read_manifest(out_path) == manifest
+    assert sorted(os.listdir(tmp_path)) == ["dataset.parquet", os.path.basename(manifest_path(out_path))]
+
+
+def test_extract_appends_new_rows_to_the_snapshot(tmp_path, monkeypatch):
+    chunks = [_clean_chunk(_raw_chunk(), COLUMNS, COLUMN_TYPES)]
+    monkeypatch.setattr(make_dataset, "_stream_chunks", lambda *args: ((chunk, COLUMN_TYPES) for chunk in chunks))
+    base_path = str(tmp_path / "base.parquet")
+    assert _extract(None, base_path, COLUMNS, 10) == 2
+
+    new_rows = _raw_chunk().assign(neighbourhood_name="Marais", host_name="Ann")
+    chunks = [_clean_chunk(new_rows, COLUMNS, COLUMN_TYPES)]
+    out_path = str(tmp_path / "appended.parquet")
+    assert _extract(None, out_path, COLUMNS, 10, base_path, 12, 14) == 5
+
+    table = pq.read_table(out_path)
+    assert table.num_rows == 5
+    assert table.column("neighbourhood_name").to_pylist() == ["Louvre", "Opera", "Marais", "Marais", "Marais"]
+    assert not os.path.exists(f"{out_path}.tmp")
+
+
+def test_extract_without_rows_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(make_dataset, "_stream_chunks", lambda *args: iter([]))
+
+    with pytest.raises(ValueError, match="returned no rows"):
+        _extract(None, str(tmp_path / "empty.parquet"), COLUMNS, 10)
@@ -0,0 +1,151 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.model_selection import GridSearchCV
+
+from airbnb_model.mlp import StreamingMLPRegressor, array_chunks
+
+
+@pytest.fixture(scope="module")
+def data() -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 6))
+    X[:, 3:] = rng.random((300, 3)) < 0.2  # one-hot like columns, mostly zeros
+    y = X @ rng.normal(size=6) + 0.5 * np.sin(3 * X[:, 0]) + rng.normal(0, 0.1, 300)
+
+    return X, y
+
+
+def make_model(**params) -> StreamingMLPRegressor:
+    params = {"hidden_layer_sizes": (8, 4), "max_iter": 10, "batch_size": 32, "random_state": 0, **params}
+
+    return StreamingMLPRegressor(log_training=False, **params)
+
+
+@pytest.mark.parametrize("activation", ["relu", "tanh", "logistic", "identity"])
+@pytest.mark.parametrize("sparse_input", [False, True], ids=["dense", "sparse"])
+def test_gradients_match_finite_differences(data, activation, sparse_input):
+    X, y = data[0][:40], data[1][:40]
+    X = sparse.csr_matrix(X) if sparse_input else X
+    model = make_model(activation=activation, alpha=0.1, learning_rate_init=0.0)
+    model._initialize(X.shape[1])
+
+    # a zero learning rate keeps the weights, the first Adam moment is then (1 - beta_1) * gradient
+    model._batch_step(X, y)
+    gradients = [m / (1 - model.beta_1) for m in model._moments]
+
+    eps = 1e-6
+    for param, gradient in zip(model._parameters(), gradients):
+        for index in np.ndindex(param.shape):
+            value = param[index]
+            param[index] = value + eps
+            loss_plus = model._batch_step(X, y)
+            param[index] = value - eps
+            loss_minus = model._batch_step(X, y)
+            param[index] = value
+            assert gradient[index] == pytest.approx((loss_plus - loss_minus) / (2 * eps), rel=1e-4, abs=1e-7)
+
+
+def test_clone_and_params():
+    model = make_model(alpha=0.01, checkpoint_path="model.npz")
+
+    cloned = clone(model)
+    assert cloned.get_params() == model.get_params()
+    assert not hasattr(cloned, "coefs_")
+
+
+def test_fit_is_deterministic_and_learns(data):
+    X, y = data
+    first, second = make_model(max_iter=100).fit(X, y), make_model(max_iter=100).fit(X, y)
+
+    np.testing.assert_array_equal(first.predict(X), second.predict(X))
+    assert first.loss_curve_[-1] < first.loss_curve_[0]
+    assert first.score(X, y) > 0.8
+    assert first.n_iter_ == len(first.loss_curve_)
+
+
+def test_sparse_and_memmap_match_dense(data, tmp_path):
+    X, y = data
+    expected = make_model(chunk_size=64).fit(X, y).predict(X)
+
+    np.testing.assert_allclose(make_model(chunk_size=64).fit(sparse.csr_matrix(X), y).predict(X), expected, rtol=1e-10)
+
+    X_memmap = np.lib.format.open_memmap(tmp_path / "X.npy", mode="w+", dtype=np.float64, shape=X.shape)
+    X_memmap[:] = X
+    np.testing.assert_allclose(make_model(chunk_size=64).fit(X_memmap, y).predict(X), expected, rtol=1e-10)
+
+
+def test_predict_in_chunks(data):
+    X, y = data
+    model = make_model().fit(X, y)
+    expected = model.predict(X)
+
+    model.chunk_size = 7
+    np.testing.assert_allclose(model.predict(X), expected, rtol=1e-12)
+    np.testing.assert_allclose(model.predict(sparse.csr_matrix(X)), expected, rtol=1e-12)
+
+
+def test_partial_fit_continues(data):
+    X, y = data
+    model = make_model(max_iter=5).fit(X, y)
+    coefs = [coef.copy() for coef in model.coefs_]
+
+    model.partial_fit(X, y)
+
+    assert model.n_iter_ == 6
+    assert len(model.loss_curve_) == 6
+    assert any(not np.array_equal(coef, new_coef) for coef, new_coef in zip(coefs, model.coefs_))
+
+
+def test_partial_fit_from_scratch(data):
+    X, y = data
+    model = make_model()
+    for _ in range(3):
+        model.partial_fit(X, y)
+
+    assert model.n_iter_ == 3
+    assert model.predict(X).shape == (len(y),)
+
+
+def test_early_stopping_keeps_best_weights_and_checkpoints(data, tmp_path):
+    X, y = data
+    path = str(tmp_path / "checkpoint.npz")
+    model = make_model(early_stopping=True, max_iter=40, n_iter_no_change=3, checkpoint_path=path).fit(X, y)
+
+    assert model.best_validation_score_ == max(model.validation_scores_)
+    restored = make_model().load_checkpoint(path)
+    np.testing.assert_array_equal(restored.predict(X), model.predict(X))
+
+
+def test_fit_chunks(data):
+    X, y = data
+    chunks = array_chunks(X, y, chunk_size=50)
+
+    model = make_model().fit_chunks(chunks, X.shape[1])
+    assert model.predict(X).shape == (len(y),)
+
+    with pytest.raises(ValueError, match="validation_data"):
+        make_model(early_stopping=True).fit_chunks(chunks, X.shape[1])
+    make_model(early_stopping=True).fit_chunks(chunks, X.shape[1], validation_data=(X[:50], y[:50]))
+
+
+def test_pickle_round_trip(data):
+    X, y = data
+    model = make_model().fit(X, y)
+
+    restored = pickle.loads(pickle.dumps(model))
+    np.testing.assert_array_equal(restored.predict(X), model.predict(X))
+    restored.partial_fit(X, y)
+
+
+def test_grid_search(data):
+    X, y = data
+    search = GridSearchCV(make_model(max_iter=5), {"alpha": [0.0001, 0.1], "hidden_layer_sizes": [(4,), (8,)]}, cv=3)
+    search.fit(X, y)
+
+    assert set(search.best_params_) == {"alpha", "hidden_layer_sizes"}
+    assert search.predict(X).shape == (len(y),)
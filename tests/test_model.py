@@ -0,0 +1,43 @@
+import os
+
+import pytest
+import yaml
+
+from sklearn.base import clone
+from xgboost import XGBModel
+
+from airbnb_model.model import MLPRegressorWithLogging, _create_model
+from airbnb_model.utils import _filter_config
+
+
+GRID_SEARCH_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "grid_search.yaml"
+)
+
+
+def test_filter_config_keeps_keyword_only_params():
+    config = {"type": "xgboost", "n_jobs": 2, "reg_lambda": 1.0, "reg_alpha": 0.2, "max_depth": 4, "lambda": 1.0}
+
+    assert _filter_config(config, XGBModel) == {"n_jobs": 2, "reg_lambda": 1.0, "reg_alpha": 0.2, "max_depth": 4}
+
+
+def test_mlp_params_reach_the_model():
+    model = _create_model({"type": "mlp", "hidden_layer_sizes": [16], "alpha": 0.01, "max_iter": 5})
+
+    assert isinstance(model, MLPRegressorWithLogging)
+    assert model.get_params()["hidden_layer_sizes"] == [16]
+    assert clone(model).get_params() == model.get_params()
+
+
+@pytest.mark.parametrize("model", ["ridge", "xgboost", "mlp"])
+def test_grid_search_params_reach_the_model(model):
+    with open(GRID_SEARCH_PATH, "r") as f:
+        grid = yaml.safe_load(f)[model]
+
+    model_config = {key: values[0] for key, values in grid.items() if key not in ("type", "feature_slots")}
+    params = _create_model({**model_config, "type": grid["type"]}).get_params()
+
+    # categorical_encoding configures the data pipeline, every other entry is a model param
+    for key, value in model_config.items():
+        if key != "categorical_encoding":
+            assert params[key] == value, key
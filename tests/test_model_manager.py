@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+
+from airbnb_model.model import copy_model, save_model_pipeline
+from airbnb_model.model_manager import ModelManager
+
+
+RIDGE_CONFIG = {"type": "ridge", "categorical_encoding": "sparse"}
+
+
+def test_save_model_pipeline_replaces_atomically(fit_pipeline, tmp_path):
+    path = str(tmp_path / "model.joblib")
+    save_model_pipeline(fit_pipeline(RIDGE_CONFIG), path)
+    copy_model(path, str(tmp_path / "best.joblib"))
+
+    assert sorted(name for name in os.listdir(tmp_path) if name != "mlruns") == ["best.joblib", "model.joblib"]
+
+
+def test_mapped_model_survives_overwritten_file(fit_pipeline, listings, tmp_path):
+    path = str(tmp_path / "model.joblib")
+    pipeline = fit_pipeline(RIDGE_CONFIG)
+    save_model_pipeline(pipeline, path)
+    manager = ModelManager(path, mmap_mode="r", reload_interval=0)
+    manager.load()
+    X = listings.drop(columns="price")
+
+    # a writer that truncates the file in place would crash a mapping of it with SIGBUS
+    with open(path, "wb") as f:
+        f.write(b"not a model")
+    np.testing.assert_allclose(manager.model.predict_columns(X), pipeline.predict(X), rtol=1e-9)
+
+
+def test_reload_on_new_file(fit_pipeline, tmp_path):
+    path = str(tmp_path / "model.joblib")
+    save_model_pipeline(fit_pipeline(RIDGE_CONFIG), path)
+    manager = ModelManager(path, reload_interval=0)
+
+    assert manager.load()
+    assert not manager.load()
+    save_model_pipeline(fit_pipeline({**RIDGE_CONFIG, "alpha": 10.0}), path)
+    assert manager.load()
+    assert manager.model.model_kind == "linear"
@@ -0,0 +1,121 @@
+import pytest
+
+from airbnb_model import prediction_cache
+from airbnb_model.prediction_cache import InMemoryBackend, PredictionCache, canonical_key, quantize
+
+
+RECORD = {"neighbourhood_name": "Louvre", "accommodates": 2, "longitude": 2.3368671, "latitude": 48.8941873}
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache.time, "monotonic", clock)
+
+    return clock
+
+
+class CountingModel:
+    """predict_fn that records the records it was asked for"""
+
+    def __init__(self) -> None:
+        self.calls = []
+
+    def __call__(self, records):
+        self.calls.append(records)
+
+        return [record["accommodates"] * 10 + record["longitude"] for record in records]
+
+
+def test_canonical_key_ignores_field_order():
+    reordered = dict(reversed(list(RECORD.items())))
+
+    assert canonical_key(reordered, "v1") == canonical_key(RECORD, "v1")
+    assert canonical_key(RECORD, "v1") != canonical_key(RECORD, "v2")
+
+
+def test_canonical_key_is_exact_without_precision():
+    moved = {**RECORD, "longitude": RECORD["longitude"] + 1e-9}
+
+    assert canonical_key(moved, "v1") != canonical_key(RECORD, "v1")
+    assert quantize(RECORD) == RECORD
+
+
+def test_canonical_key_rounds_coordinates_with_precision():
+    moved = {**RECORD, "longitude": RECORD["longitude"] + 1e-6, "latitude": RECORD["latitude"] - 1e-6}
+
+    assert canonical_key(moved, "v1", precision=4) == canonical_key(RECORD, "v1", precision=4)
+    assert quantize(RECORD, 4) == {**RECORD, "longitude": 2.3369, "latitude": 48.8942}
+
+
+def test_lru_eviction(clock):
+    backend = InMemoryBackend(max_size=2, ttl=60)
+    backend.set_many({"a": 1.0, "b": 2.0})
+    assert backend.get_many(["a"]) == [1.0]  # "b" is now the least recently used
+
+    backend.set_many({"c": 3.0})
+
+    assert len(backend) == 2
+    assert backend.get_many(["a", "b", "c"]) == [1.0, None, 3.0]
+
+
+def test_ttl_expiry(clock):
+    backend = InMemoryBackend(max_size=10, ttl=60)
+    backend.set_many({"a": 1.0})
+
+    clock.now += 59
+    assert backend.get_many(["a"]) == [1.0]
+    clock.now += 2
+    assert backend.get_many(["a"]) == [None]
+
+
+def test_predicts_only_misses():
+    model = CountingModel()
+    cache = PredictionCache(InMemoryBackend())
+    other = {**RECORD, "accommodates": 4}
+
+    first = cache.predict([RECORD], model, "v1")
+    second = cache.predict([RECORD, other], model, "v1")
+
+    assert model.calls == [[RECORD], [other]]
+    assert second == [first[0], 40 + RECORD["longitude"]]
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert cache.stats()["size"] == 2
+
+
+def test_predicts_on_the_exact_record_without_precision():
+    model = CountingModel()
+    values = PredictionCache(InMemoryBackend()).predict([RECORD], model, "v1")
+
+    assert model.calls == [[RECORD]]
+    assert values == [20 + RECORD["longitude"]]
+
+
+def test_predicts_on_the_quantized_record_with_precision():
+    model = CountingModel()
+    cache = PredictionCache(InMemoryBackend(), precision=4)
+    moved = {**RECORD, "longitude": RECORD["longitude"] + 1e-6}
+
+    assert cache.predict([RECORD], model, "v1") == cache.predict([moved], model, "v1") == [20 + 2.3369]
+    assert model.calls == [[quantize(RECORD, 4)]]
+
+
+def test_model_reload_invalidates_entries():
+    model = CountingModel()
+    backend = InMemoryBackend()
+    cache = PredictionCache(backend)
+    cache.predict([RECORD], model, "v1")
+
+    cache.predict([RECORD], model, "v2")
+
+    assert len(model.calls) == 2
+    assert len(backend) == 1  # the entries of v1 were dropped
+    assert backend.get_many([canonical_key(RECORD, "v1")]) == [None]
@@ -0,0 +1,94 @@
+import os
+
+import joblib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import score
+
+
+RIDGE_CONFIG = {"type": "ridge", "categorical_encoding": "sparse"}
+ROW_GROUP_SIZE = 50
+
+
+class Interrupted(Exception):
+    pass
+
+
+@pytest.fixture
+def inputs(fit_pipeline, listings, tmp_path) -> tuple[str, str]:
+    model_path = str(tmp_path / "model.joblib")
+    joblib.dump(fit_pipeline(RIDGE_CONFIG), model_path)
+    data_path = str(tmp_path / "listings.parquet")
+    pq.write_table(pa.Table.from_pandas(listings, preserve_index=False), data_path, row_group_size=ROW_GROUP_SIZE)
+
+    return model_path, data_path
+
+
+def _read_parts(output_dir: str) -> pd.DataFrame:
+    parts = sorted(name for name in os.listdir(output_dir) if name.endswith(".parquet"))
+
+    return pd.concat([pd.read_parquet(os.path.join(output_dir, name)) for name in parts], ignore_index=True)
+
+
+def test_scores_every_row_group(inputs, listings, tmp_path):
+    model_path, data_path = inputs
+    output_dir = str(tmp_path / "predictions")
+
+    assert score.score(model_path, data_path, output_dir, keep_columns=["accommodates"]) == len(listings)
+
+    predictions = _read_parts(output_dir)
+    assert len(os.listdir(output_dir)) == len(listings) // ROW_GROUP_SIZE + 1  # parts and the manifest
+    assert predictions["row"].tolist() == list(range(len(listings)))
+    assert predictions["accommodates"].tolist() == listings["accommodates"].tolist()
+    pd.testing.assert_series_equal(
+        predictions["predicted_price"],
+        pd.Series(joblib.load(model_path).predict(listings.drop(columns="price")), name="predicted_price"),
+        check_exact=False,
+        rtol=1e-9,
+    )
+
+
+@pytest.mark.parametrize("n_finished, n_workers", [(1, 1), (5, 1), (5, 2)])
+def test_rerun_skips_finished_parts(inputs, listings, tmp_path, monkeypatch, n_finished, n_workers):
+    model_path, data_path = inputs
+    output_dir = str(tmp_path / "predictions")
+    score_row_group = score._score_row_group
+    calls = []
+
+    def interrupt_after_n(*args):
+        if len(calls) == n_finished:
+            raise Interrupted()
+        calls.append(args[3])
+        return score_row_group(*args)
+
+    monkeypatch.setattr(score, "_score_row_group", interrupt_after_n)
+    with pytest.raises(Interrupted):
+        score.score(model_path, data_path, output_dir)
+    monkeypatch.setattr(score, "_score_row_group", score_row_group)
+    finished = {name: os.stat(os.path.join(output_dir, name)).st_mtime_ns for name in calls}
+
+    assert (
+        score.score(model_path, data_path, output_dir, n_workers=n_workers)
+        == len(listings) - n_finished * ROW_GROUP_SIZE
+    )
+
+    assert {name: os.stat(os.path.join(output_dir, name)).st_mtime_ns for name in calls} == finished
+    assert not [name for name in os.listdir(output_dir) if name.endswith(".tmp")]
+    uninterrupted_dir = str(tmp_path / "uninterrupted")
+    score.score(model_path, data_path, uninterrupted_dir)
+    pd.testing.assert_frame_equal(_read_parts(output_dir), _read_parts(uninterrupted_dir))
+    # a third run has nothing left to do
+    assert score.score(model_path, data_path, output_dir) == 0
+
+
+def test_refuses_predictions_of_another_model(inputs, tmp_path):
+    model_path, data_path = inputs
+    output_dir = str(tmp_path / "predictions")
+    score.score(model_path, data_path, output_dir)
+
+    os.utime(model_path, ns=(0, 0))
+    with pytest.raises(SystemExit, match="another model or input"):
+        score.score(model_path, data_path, output_dir)
@@ -0,0 +1,78 @@
+import pytest
+
+from airbnb_model.search import halving_schedule, successive_halving
+
+
+@pytest.mark.parametrize(
+    "eta, min_fraction, expected",
+    [
+        (3, 0.1, [1 / 9, 1 / 3]),
+        (3, 1 / 9, [1 / 9, 1 / 3]),
+        (3, 1 / 27, [1 / 27, 1 / 9, 1 / 3]),
+        (2, 0.25, [0.25, 0.5]),
+        (2, 0.3, [0.5]),
+        (4, 0.5, []),
+        (3, 1.0, []),
+    ],
+)
+def test_halving_schedule(eta, min_fraction, expected):
+    assert halving_schedule(eta, min_fraction) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("eta, min_fraction", [(1, 0.1), (3, 0.0), (3, 1.5)])
+def test_halving_schedule_rejects_invalid_settings(eta, min_fraction):
+    with pytest.raises(AssertionError):
+        halving_schedule(eta, min_fraction)
+
+
+class StubScorer:
+    """Loss of a candidate from a table per rung, records every evaluation"""
+
+    def __init__(self, losses_by_rung: list[dict[str, float]]) -> None:
+        self.losses_by_rung = losses_by_rung
+        self.calls = []
+
+    def __call__(self, candidate: str, fraction: float, rung: int) -> float:
+        self.calls.append((candidate, fraction, rung))
+        return self.losses_by_rung[rung][candidate]
+
+
+def test_successive_halving_keeps_the_best_third_per_rung():
+    candidates = list("abcdefghi")
+    scorer = StubScorer(
+        [
+            {c: loss for c, loss in zip(candidates, [5, 1, 7, 3, 9, 2, 8, 6, 4])},  # keeps b, d, f
+            {"b": 3.0, "d": 1.0, "f": 2.0},  # keeps d
+        ]
+    )
+
+    survivors = successive_halving(candidates, scorer, eta=3, min_fraction=0.1)
+
+    assert survivors == ["d"]
+    assert [(candidate, rung) for candidate, _, rung in scorer.calls] == [(c, 0) for c in candidates] + [
+        ("b", 1),
+        ("d", 1),
+        ("f", 1),
+    ]
+    fractions = {rung: fraction for _, fraction, rung in scorer.calls}
+    assert fractions == {0: pytest.approx(1 / 9), 1: pytest.approx(1 / 3)}
+
+
+def test_successive_halving_rounds_survivors_up_and_keeps_their_order():
+    scorer = StubScorer([{"a": 4.0, "b": 1.0, "c": 3.0, "d": 2.0}])
+
+    assert successive_halving(list("abcd"), scorer, eta=3, min_fraction=1 / 3) == ["b", "d"]
+
+
+def test_successive_halving_stops_with_a_single_survivor():
+    scorer = StubScorer([{"a": 2.0, "b": 1.0}, {}])
+
+    assert successive_halving(["a", "b"], scorer, eta=2, min_fraction=0.25) == ["b"]
+    assert len(scorer.calls) == 2
+
+
+def test_successive_halving_without_rungs_keeps_everyone():
+    scorer = StubScorer([])
+
+    assert successive_halving(list("abc"), scorer, eta=3, min_fraction=1.0) == list("abc")
+    assert scorer.calls == []
@@ -0,0 +1,158 @@
+import logging
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from airbnb_model import tracking
+from airbnb_model.tracking import (
+    MAX_ENTITIES_PER_BATCH,
+    MAX_METRICS_PER_BATCH,
+    MAX_PARAMS_TAGS_PER_BATCH,
+    RunLogger,
+    start_run,
+)
+
+
+class FakeClient:
+    """Records the `log_batch` calls of a RunLogger, optionally failing them"""
+
+    def __init__(self, error: Exception = None) -> None:
+        self.error = error
+        self.batches = []
+        self.written = threading.Event()
+
+    def log_batch(self, run_id, metrics=(), params=(), tags=(), synchronous=True):
+        if self.error is not None:
+            raise self.error
+        self.batches.append((run_id, list(metrics), list(params), list(tags)))
+        self.written.set()
+
+    def logged(self, kind: int) -> dict:
+        return {entity.key: entity.value for batch in self.batches for entity in batch[kind]}
+
+
+@pytest.fixture
+def client(monkeypatch) -> FakeClient:
+    """Fake client of the loggers created by `start_run`"""
+    client = FakeClient()
+    monkeypatch.setattr(tracking, "MlflowClient", lambda: client)
+
+    return client
+
+
+def test_values_are_written_in_batches_within_the_limits():
+    client = FakeClient()
+    run_logger = RunLogger("run", client=client, flush_interval=60)
+
+    run_logger.log_metrics({f"metric_{i}": i for i in range(2500)})
+    run_logger.log_params({f"param_{i}": i for i in range(150)})
+    run_logger.set_tags({"stage": "test"})
+    run_logger.close()
+
+    assert len(client.batches) == 4
+    for run_id, metrics, params, tags in client.batches:
+        assert run_id == "run"
+        assert len(metrics) <= MAX_METRICS_PER_BATCH
+        assert len(params) <= MAX_PARAMS_TAGS_PER_BATCH and len(tags) <= MAX_PARAMS_TAGS_PER_BATCH
+        assert len(metrics) + len(params) + len(tags) <= MAX_ENTITIES_PER_BATCH
+    assert client.logged(1) == {f"metric_{i}": i for i in range(2500)}
+    assert client.logged(2) == {f"param_{i}": str(i) for i in range(150)}
+    assert client.logged(3) == {"stage": "test"}
+
+
+def test_flush_writes_the_buffer():
+    client = FakeClient()
+    run_logger = RunLogger("run", client=client, flush_interval=60)
+    run_logger.log_metric("mae", 1.5)
+    run_logger.log_param("alpha", 0.1)
+
+    run_logger.flush()
+
+    assert len(client.batches) == 1
+    assert client.logged(1) == {"mae": 1.5}
+    assert client.logged(2) == {"alpha": "0.1"}
+    assert run_logger.metrics == {"mae": 1.5} and run_logger.params == {"alpha": "0.1"}
+    run_logger.close()
+
+
+def test_buffer_is_written_after_the_flush_interval():
+    client = FakeClient()
+    run_logger = RunLogger("run", client=client, flush_interval=0.05)
+    start = time.monotonic()
+
+    run_logger.log_metric("mae", 1.5)
+
+    assert client.written.wait(timeout=5)
+    assert time.monotonic() - start >= 0.04
+    assert client.logged(1) == {"mae": 1.5}
+    run_logger.close()
+
+
+def test_conflicting_param_is_rejected():
+    run_logger = RunLogger("run", client=FakeClient(), flush_interval=60)
+    run_logger.log_param("alpha", 0.1)
+    run_logger.log_param("alpha", 0.1)
+
+    with pytest.raises(ValueError, match="already logged"):
+        run_logger.log_param("alpha", 0.2)
+    run_logger.close()
+
+
+def test_start_run_routes_module_calls_to_the_run(client):
+    with start_run() as run_logger:
+        assert tracking.active_logger() is run_logger
+        tracking.log_metrics({"mae": 1.5})
+        tracking.set_tags({"stage": "test"})
+
+    assert tracking.active_logger() is None
+    assert client.logged(1) == {"mae": 1.5}
+    assert client.logged(3) == {"stage": "test"}
+
+
+def test_exception_in_run_block_surfaces_over_logging_failure(monkeypatch, caplog):
+    client = FakeClient(error=ConnectionError("tracking server is down"))
+    monkeypatch.setattr(tracking, "MlflowClient", lambda: client)
+
+    with caplog.at_level(logging.ERROR, logger=tracking.__name__):
+        with pytest.raises(KeyError, match="missing column"):
+            with start_run():
+                tracking.log_metric("mae", 1.5)
+                raise KeyError("missing column")
+
+    assert "Writing the buffered values of MLflow run" in caplog.text
+    assert tracking.active_logger() is None
+
+
+def test_logging_failure_raises_at_the_end_of_the_run(monkeypatch):
+    client = FakeClient(error=ConnectionError("tracking server is down"))
+    monkeypatch.setattr(tracking, "MlflowClient", lambda: client)
+
+    with pytest.raises(RuntimeError, match="failed") as exc_info:
+        with start_run():
+            tracking.log_metric("mae", 1.5)
+
+    assert isinstance(exc_info.value.__cause__, ConnectionError)
+
+
+def test_buffer_is_written_at_exit(tmp_path):
+    output = tmp_path / "batches.txt"
+    script = f"""
+        from airbnb_model import tracking
+
+        class Client:
+            def log_batch(self, run_id, metrics, params, tags, synchronous):
+                with open({str(output)!r}, "a") as f:
+                    f.write(" ".join(f"{{m.key}}={{m.value}}" for m in metrics))
+
+        run_logger = tracking.RunLogger("run", client=Client(), flush_interval=60)
+        tracking._loggers.append(run_logger)
+        run_logger.log_metric("mae", 1.5)
+        # exits without closing the logger, like a run that skips the end of its `start_run` block
+    """
+    subprocess.run([sys.executable, "-c", textwrap.dedent(script)], check=True, timeout=60)
+
+    assert output.read_text() == "mae=1.5"